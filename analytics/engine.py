@@ -0,0 +1,192 @@
+# Columnar analytics engine
+"""
+Vectorized aggregates for the reports pages, computed with pandas / NumPy
+over columnar copies of crop_seasons, harvest_records and fields.
+
+Each table set is loaded into a DataFrame once and kept until its
+table_versions counter moves (database/table_versions.py); every result
+below is cached the same way, keyed by the versions of the tables it reads.
+A page view therefore costs one read of table_versions unless the data
+changed, in which case only the affected frames are reloaded. pandas itself
+is imported on first use (analytics.lazy), not at app start-up.
+
+Memory is roughly 60 bytes per loaded row: ~30 MB for the half million
+harvest records of a --scale 1 generated farm.
+"""
+
+import functools
+import threading
+
+from analytics import lazy
+from database import table_versions
+
+PERCENTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+ROLLING_WINDOW_YEARS = 3
+PH_BANDS = (0, 5.5, 6.0, 6.5, 7.0, 7.5, 14)
+SOIL_FACTORS = ('soil_ph', 'organic_matter_percent', 'slope_percent')
+TEXT_COLUMNS = {'field_id', 'field_name', 'soil_type', 'crop_type', 'harvest_date'}
+
+# name -> (SQL, tables it reads)
+FRAMES = {
+    'fields': ('''
+        SELECT field_id, field_name, size_hectares, soil_type,
+               soil_ph, organic_matter_percent, slope_percent
+        FROM fields
+    ''', ('fields',)),
+    'seasons': ('''
+        SELECT season_id, field_id, crop_year, crop_type,
+               yield_tonnes_per_ha, quality_percent, growth_days
+        FROM crop_seasons
+        WHERE yield_tonnes_per_ha IS NOT NULL
+    ''', ('crop_seasons',)),
+    'harvests': ('''
+        SELECT h.harvest_id, h.field_id, p.crop_type, h.harvest_date,
+               h.yield_per_hectare, h.total_yield_tonnes, h.harvested_area_ha,
+               h.moisture_percent, h.profit_per_hectare
+        FROM harvest_records h
+        JOIN planting_records p ON p.planting_id = h.planting_id
+    ''', ('harvest_records', 'planting_records')),
+}
+
+_frames = {}   # (database, frame name) -> (versions, DataFrame)
+_results = {}  # (database, function name, args) -> (versions, result)
+_load_lock = threading.Lock()
+
+
+def _stamp(versions, tables):
+    return tuple(versions.get(table) for table in tables)
+
+
+def _frame(conn, database, versions, name):
+    sql, tables = FRAMES[name]
+    stamp = _stamp(versions, tables)
+    cached = _frames.get((database, name))
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    with _load_lock:  # one thread loads, the others wait for its frame
+        cached = _frames.get((database, name))
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        cursor = conn.cursor()
+        cursor.row_factory = None  # plain tuples: no per-row sqlite3.Row objects
+        rows = cursor.execute(sql).fetchall()
+        columns = [column[0] for column in cursor.description]
+        pd = lazy.pandas()
+        frame = pd.DataFrame.from_records(rows, columns=columns)
+        for column in columns:
+            # Empty or all-NULL columns come back as object; stray text in a
+            # REAL column (SQLite does not enforce types) becomes NaN
+            if column not in TEXT_COLUMNS and frame[column].dtype == object:
+                frame[column] = pd.to_numeric(frame[column], errors='coerce')
+        # Versions were read before the rows, so a write racing the load only
+        # causes one extra reload, never a stale frame
+        _frames[(database, name)] = (stamp, frame)
+        return frame
+
+
+def versioned(*frame_names):
+    """Cache a function of the named frames until one of their tables changes"""
+    tables = sorted({table for name in frame_names for table in FRAMES[name][1]})
+
+    def decorate(compute):
+        @functools.wraps(compute)
+        def wrapper(conn, *args):
+            database, versions = table_versions.get_versions(conn)
+            stamp = _stamp(versions, tables)
+            key = (database, compute.__name__, args)
+            cached = _results.get(key)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+            frames = [_frame(conn, database, versions, name) for name in frame_names]
+            # pandas reshapes misbehave on empty groupbys; no rows, no aggregates
+            result = [] if any(frame.empty for frame in frames) else compute(*frames, *args)
+            _results[key] = (stamp, result)
+            return result
+        return wrapper
+    return decorate
+
+
+def clear_cache():
+    _frames.clear()
+    _results.clear()
+
+
+def _records(frame):
+    """DataFrame -> list of dicts for the templates, NaN as None"""
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict('records')
+
+
+def _percentile_columns(grouped):
+    pd = lazy.pandas()
+    quantiles = grouped.quantile(list(PERCENTILES)).unstack()
+    quantiles.columns = [f'p{round(q * 100)}' for q in quantiles.columns]
+    result = pd.concat([grouped.count().rename('count'), grouped.mean().rename('mean'), quantiles], axis=1)
+    result['iqr'] = result['p75'] - result['p25']
+    return result
+
+
+# =====================================================
+# AGGREGATES
+# =====================================================
+
+@versioned('seasons')
+def yield_percentiles(seasons):
+    """Per crop type: count, mean and P10/P25/P50/P75/P90 of yield (t/ha), highest median first"""
+    result = _percentile_columns(seasons.groupby('crop_type')['yield_tonnes_per_ha'])
+    return _records(result.sort_values('p50', ascending=False).reset_index())
+
+
+@versioned('seasons')
+def rolling_yields(seasons, window=ROLLING_WINDOW_YEARS):
+    """Per crop type and year: mean yield and its trailing `window`-year rolling mean"""
+    yearly = (seasons.groupby(['crop_type', 'crop_year'])['yield_tonnes_per_ha']
+              .agg(['count', 'mean']).reset_index())
+    yearly['rolling_mean'] = (yearly.groupby('crop_type')['mean']
+                              .transform(lambda s: s.rolling(window, min_periods=1).mean()))
+    return _records(yearly)
+
+
+@versioned('seasons', 'fields')
+def yield_correlations(seasons, fields):
+    """Per crop type: Pearson r of yield against soil pH, organic matter and slope"""
+    merged = seasons.merge(fields, on='field_id')
+    if merged.empty:
+        return []
+    columns = ['yield_tonnes_per_ha', *SOIL_FACTORS]
+    matrices = merged.groupby('crop_type')[columns].corr()
+    result = matrices.xs('yield_tonnes_per_ha', level=1)[list(SOIL_FACTORS)]
+    result.insert(0, 'seasons', merged.groupby('crop_type').size())
+    return _records(result.reset_index())
+
+
+@versioned('seasons', 'fields')
+def soil_normalized_yields(seasons, fields):
+    """Yield relative to each crop's overall mean (1.0 = average), by soil type and pH band"""
+    pd = lazy.pandas()
+    merged = seasons.merge(fields, on='field_id')
+    if merged.empty:
+        return []
+    crop_mean = merged.groupby('crop_type')['yield_tonnes_per_ha'].transform('mean')
+    merged['yield_index'] = merged['yield_tonnes_per_ha'] / crop_mean
+    merged['ph_band'] = pd.cut(merged['soil_ph'], PH_BANDS, right=False).astype(str)
+    merged['soil_type'] = merged['soil_type'].fillna('Unknown')
+
+    grouped = merged.groupby(['soil_type', 'ph_band'])
+    result = grouped.agg(seasons=('yield_index', 'size'),
+                         fields=('field_id', 'nunique'),
+                         yield_index=('yield_index', 'mean'),
+                         yield_index_p50=('yield_index', 'median'),
+                         avg_yield=('yield_tonnes_per_ha', 'mean'))
+    return _records(result.reset_index())
+
+
+@versioned('harvests')
+def harvest_percentiles(harvests):
+    """Per crop type: harvest count, yield per hectare percentiles and mean profit per hectare"""
+    grouped = harvests.groupby('crop_type')
+    result = _percentile_columns(grouped['yield_per_hectare'])
+    result['tonnes'] = grouped['total_yield_tonnes'].sum()
+    result['profit_per_ha'] = grouped['profit_per_hectare'].mean()
+    return _records(result.sort_values('p50', ascending=False).reset_index())
@@ -0,0 +1,29 @@
+# Lazy analytics imports
+"""
+On-demand access to pandas.
+
+Importing pandas or plotly costs well over a second and tens of MB per
+worker, and most requests never draw a chart. Call pandas() from inside a
+report function instead of importing at module level; the first call pays
+the import, every later call is a dict lookup.
+"""
+
+import functools
+import importlib
+import sys
+
+HEAVY_MODULES = ('pandas', 'plotly')
+
+
+@functools.lru_cache(maxsize=None)
+def _load(module_name):
+    return importlib.import_module(module_name)
+
+
+def pandas():
+    return _load('pandas')
+
+
+def loaded_heavy_modules():
+    """Which of the heavy libraries this process has imported so far"""
+    return sorted(name for name in HEAVY_MODULES if name in sys.modules)
@@ -4,15 +4,34 @@ FS25 Farming Database Web Application
 Complete Flask application for managing field performance data
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, stream_with_context
+from markupsafe import escape
 from datetime import datetime, date
 import sqlite3
 import os
 import json
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.utils import PlotlyJSONEncoder
+import threading
+from pprint import pformat
+
+from analytics import engine as analytics_engine
+from database import dashboard_stats
+from database import exporter
+from database import harvest as harvest_service
+from database import history as history_queries
+from database import importer
+from database import migrations
+from database import planting as planting_queries
+from database import prices as price_queries
+from database import reports as report_queries
+from database import search as search_index
+from database import storage as storage_queries
+from database.connection import DatabaseNotFoundError, get_db, init_db_pool
+from database.instrumentation import init_sql_instrumentation
+from database.conditional import conditional, init_conditional_requests
+from database.response_cache import init_response_cache, response_cache
+from database.savegame_watcher import init_savegame_watcher, savegame_directory, status_metric_series, stored_status
+from monitoring import metrics
+from monitoring.logger import get_logger, init_logging, ring_buffer
 
 app = Flask(__name__)
 app.secret_key = 'fs25-farming-secret-key-change-this'  # Change this in production!
@@ -20,24 +39,89 @@ app.secret_key = 'fs25-farming-secret-key-change-this'  # Change this in product
 app.jinja_env.globals.update(min=min, max=max)
 
 DATABASE_PATH = 'data/fs25_farming.db'
+app.config['DATABASE_PATH'] = os.environ.get('FS25_DATABASE_PATH', DATABASE_PATH)
+
+db_pool = init_db_pool(app)
+init_logging(app)
+init_sql_instrumentation(app, db_pool)
+metrics.init_metrics(app)
+if init_response_cache(app):
+    metrics.register_collector(response_cache.metric_series)
+init_conditional_requests(app)
+
+log = get_logger('app')
+storage_log = get_logger('storage')
+
+def run_migrations():
+    """Apply pending schema migrations (serving process, first request or `flask migrate`)"""
+    if not os.path.exists(app.config['DATABASE_PATH']):
+        return []  # reported by init_db_check / get_db_connection
+    conn = db_pool.acquire()
+    try:
+        applied = migrations.migrate(conn)
+        # The home page reads this year's stats row; build it here, not on a GET
+        if dashboard_stats.ensure_year(conn, datetime.now().year):
+            conn.commit()
+    finally:
+        conn.close()
+    for version, name in applied:
+        log.info('migration_applied', version=version, name=name)
+    return applied
+
+# Not at import: importing the app (tests, benchmarks, the flask CLI) must
+# not upgrade whatever database DATABASE_PATH points at
+migrations_checked = False
+migrations_lock = threading.Lock()
+
+@app.before_request
+def migrate_before_first_request():
+    """Bring the schema up to date once per process, before the first request uses it"""
+    global migrations_checked
+    if migrations_checked:
+        return
+    with migrations_lock:
+        if not migrations_checked:
+            run_migrations()
+            # A missing database is checked again once setup has created it
+            migrations_checked = os.path.exists(app.config['DATABASE_PATH'])
+
+# Started by the serving process only (see start_savegame_watcher)
+savegame_watcher = None
+
+def start_savegame_watcher():
+    """Start the savegame watcher in this process, after the migrations; its first sync runs right away"""
+    global savegame_watcher
+    savegame_watcher = init_savegame_watcher(app, db_pool)
+    return savegame_watcher
+
+def current_savegame_status():
+    """Live status of the watcher in this process, else the one its process last recorded"""
+    if savegame_watcher is not None:
+        return {'enabled': True, **savegame_watcher.status()}
+    directory = savegame_directory(app)
+    if not directory:
+        return {'enabled': False}
+    # running is unknown here: the watcher, if any, runs in another process
+    return {'enabled': True, 'running': None, **(stored_status(db_pool, directory) or {})}
+
+if savegame_directory(app):
+    metrics.register_collector(lambda: status_metric_series(current_savegame_status()))
 
 def get_db_connection():
-    """Get database connection with row factory for easier data access"""
-    if not os.path.exists(DATABASE_PATH):
+    """Get the pooled database connection for this request (row factory already set)"""
+    try:
+        return get_db()
+    except DatabaseNotFoundError:
         flash('Database not found! Please run database setup first.', 'error')
         return None
-    
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row  # This enables column access by name: row['field_name']
-    return conn
 
 def init_db_check():
     """Check if database exists and has data"""
-    if not os.path.exists(DATABASE_PATH):
+    if not os.path.exists(app.config['DATABASE_PATH']):
         return False
     
     try:
-        conn = get_db_connection()
+        conn = db_pool.acquire()
         cursor = conn.cursor()
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='fields'")
         result = cursor.fetchone()
@@ -58,59 +142,8 @@ def index():
         return redirect(url_for('setup_required'))
     
     try:
-        # Get dashboard statistics
-        stats = {}
-        
-        # Total fields and area
-        result = conn.execute('SELECT COUNT(*) as count, SUM(size_hectares) as total_area FROM fields').fetchone()
-        stats['total_fields'] = result['count']
-        stats['total_area'] = round(result['total_area'] or 0, 1)
-        
-        # Active crop seasons this year
-        current_year = datetime.now().year
-        result = conn.execute(
-            'SELECT COUNT(*) as count FROM crop_seasons WHERE crop_year = ?', 
-            (current_year,)
-        ).fetchone()
-        stats['active_seasons'] = result['count']
-        
-        # Total harvested yield this year
-        result = conn.execute('''
-            SELECT SUM(cs.yield_tonnes_per_ha * f.size_hectares) as total_yield
-            FROM crop_seasons cs
-            JOIN fields f ON cs.field_id = f.field_id
-            WHERE cs.crop_year = ? AND cs.yield_tonnes_per_ha IS NOT NULL
-        ''', (current_year,)).fetchone()
-        stats['total_yield'] = round(result['total_yield'] or 0, 1)
-        
-        # Recent operations (last 7 days)
-        recent_operations = conn.execute('''
-            SELECT fo.operation_date, fo.field_id, f.field_name, fo.operation_type, fo.hours_worked
-            FROM field_operations fo
-            JOIN fields f ON fo.field_id = f.field_id
-            WHERE fo.operation_date >= date('now', '-7 days')
-            ORDER BY fo.operation_date DESC, fo.created_date DESC
-            LIMIT 10
-        ''').fetchall()
-        
-        # Weather events this year
-        result = conn.execute('''
-            SELECT COUNT(*) as count FROM weather_events 
-            WHERE strftime('%Y', event_date) = ?
-        ''', (str(current_year),)).fetchone()
-        stats['weather_events'] = result['count']
-        
-        # Top performing fields (by average yield)
-        top_fields = conn.execute('''
-            SELECT f.field_name, ROUND(AVG(cs.yield_tonnes_per_ha), 2) as avg_yield, COUNT(cs.season_id) as seasons
-            FROM fields f
-            JOIN crop_seasons cs ON f.field_id = cs.field_id
-            WHERE cs.yield_tonnes_per_ha IS NOT NULL
-            GROUP BY f.field_id, f.field_name
-            HAVING seasons >= 1
-            ORDER BY avg_yield DESC
-            LIMIT 5
-        ''').fetchall()
+        # Every number on the page comes from one materialized row
+        stats, recent_operations, top_fields = dashboard_stats.get_stats(conn, datetime.now().year)
         
         conn.close()
         
@@ -129,6 +162,7 @@ def index():
 # =====================================================
 
 @app.route('/fields')
+@response_cache.cached('fields', 'crop_seasons')
 def fields_list():
     """List all fields with summary information"""
     conn = get_db_connection()
@@ -139,11 +173,12 @@ def fields_list():
         fields = conn.execute('''
             SELECT f.field_id, f.field_name, f.size_hectares, f.soil_type, 
                    f.drainage_rating, f.current_value,
+                   f.savegame_owned, f.savegame_crop, f.savegame_growth_state,
                    COUNT(cs.season_id) as total_seasons,
                    ROUND(AVG(cs.yield_tonnes_per_ha), 2) as avg_yield
             FROM fields f
             LEFT JOIN crop_seasons cs ON f.field_id = cs.field_id
-            GROUP BY f.field_id, f.field_name, f.size_hectares, f.soil_type, f.drainage_rating, f.current_value
+            GROUP BY f.field_id
             ORDER BY f.field_id
         ''').fetchall()
         
@@ -158,11 +193,10 @@ def fields_list():
 @app.route('/fields/add', methods=['GET', 'POST'])
 def add_field():
     """Add new field"""
-    print(f"Add field route called with method: {request.method}")  # Debug
+    log.debug('add field requested', method=request.method)
     
     if request.method == 'POST':
-        print("Form submitted!")  # Debug
-        print(f"Form data: {request.form}")  # Debug
+        log.debug('add field form submitted', form=lambda: request.form.to_dict())
         
         try:
             # Get form data with better error handling
@@ -170,9 +204,7 @@ def add_field():
             field_name = request.form.get('field_name', '').strip()
             size_hectares = request.form.get('size_hectares', '')
             
-            print(f"Field ID: {field_id}")  # Debug
-            print(f"Field Name: {field_name}")  # Debug
-            print(f"Size: {size_hectares}")  # Debug
+            log.debug('add field parsed', field_id=field_id, field_name=field_name, size_hectares=size_hectares)
             
             # Validate required fields
             if not field_id:
@@ -214,8 +246,6 @@ def add_field():
             stone_percent = float(request.form.get('stone_percent') or 0)
             notes = request.form.get('notes', '').strip()
             
-            print("About to insert into database...")  # Debug
-            
             conn = get_db_connection()
             if not conn:
                 flash('Database connection failed!', 'error')
@@ -233,22 +263,23 @@ def add_field():
                 organic_matter, drainage, slope, gps_lat, gps_lon, 
                 purchase_price, purchase_date, current_value, stone_percent, notes
             ))
+            dashboard_stats.on_field_added(conn, size_hectares)
             
             conn.commit()
             conn.close()
             
-            print("Field added successfully!")  # Debug
+            log.info('field added', field_id=field_id)
             flash(f'Field "{field_name}" added successfully!', 'success')
             return redirect(url_for('fields_list'))
             
         except sqlite3.IntegrityError as e:
-            print(f"Integrity error: {e}")  # Debug
+            log.warning('add field rejected', field_id=field_id, error=str(e))
             flash(f'Field ID "{field_id}" already exists!', 'error')
         except ValueError as e:
-            print(f"Value error: {e}")  # Debug
+            log.warning('add field invalid input', error=str(e))
             flash(f'Invalid input: {str(e)}', 'error')
         except Exception as e:
-            print(f"General error: {e}")  # Debug
+            log.exception('add field failed', error=str(e))
             flash(f'Error adding field: {str(e)}', 'error')
     
     return render_template('fields/add.html')
@@ -320,9 +351,10 @@ def delete_field(field_id):
             flash('Field not found!', 'error')
             return redirect(url_for('fields_list'))
         
-        # Delete only from tables that exist in your current database
-        # Delete crop seasons first (foreign key dependency)
-        conn.execute('DELETE FROM crop_seasons WHERE field_id = ?', (field_id,))
+        # Delete child rows first (foreign keys are enforced on pooled connections)
+        conn.execute('DELETE FROM harvest_records WHERE field_id = ?', (field_id,))
+        conn.execute('DELETE FROM field_maintenance WHERE field_id = ?', (field_id,))
+        conn.execute('DELETE FROM planting_records WHERE field_id = ?', (field_id,))
         
         # Delete field operations 
         conn.execute('DELETE FROM field_operations WHERE field_id = ?', (field_id,))
@@ -330,8 +362,12 @@ def delete_field(field_id):
         # Delete weather events
         conn.execute('DELETE FROM weather_events WHERE field_id = ?', (field_id,))
         
+        # Delete crop seasons once nothing references them
+        conn.execute('DELETE FROM crop_seasons WHERE field_id = ?', (field_id,))
+        
         # Finally delete the field itself
         conn.execute('DELETE FROM fields WHERE field_id = ?', (field_id,))
+        dashboard_stats.on_bulk_change(conn)
         
         conn.commit()
         conn.close()
@@ -352,13 +388,16 @@ def delete_all_sample_data():
         return redirect(url_for('index'))
     
     try:
-        # Delete all data from existing tables only
+        # Delete all data from existing tables only (children before parents)
+        conn.execute('DELETE FROM harvest_records')
+        conn.execute('DELETE FROM field_maintenance')
+        conn.execute('DELETE FROM planting_records')
         conn.execute('DELETE FROM weather_events')
         conn.execute('DELETE FROM field_operations')
         conn.execute('DELETE FROM crop_seasons')
         conn.execute('DELETE FROM equipment')
-        conn.execute('DELETE FROM crop_varieties')
         conn.execute('DELETE FROM fields')
+        dashboard_stats.on_bulk_change(conn)
         
         conn.commit()
         conn.close()
@@ -376,6 +415,7 @@ def delete_all_sample_data():
 # =====================================================
 
 @app.route('/crops')
+@response_cache.cached('crop_seasons', 'fields')
 def crops_list():
     """List all crop seasons"""
     conn = get_db_connection()
@@ -429,6 +469,7 @@ def add_crop_season():
                 crop_data['field_id'], crop_data['crop_year'], crop_data['season_name'],
                 crop_data['crop_type'], crop_data['variety_name'], crop_data['planting_date']
             ))
+            dashboard_stats.on_season_added(conn, crop_data['crop_year'])
             
             conn.commit()
             conn.close()
@@ -490,6 +531,7 @@ def record_harvest(season_id):
                 harvest_data['quality_percent'], harvest_data['weather_impact'],
                 harvest_data['disease_pest_notes'], growth_days, harvest_data['notes'], season_id
             ))
+            dashboard_stats.on_harvest_recorded(conn, season, harvest_data['yield_tonnes_per_ha'])
             
             conn.commit()
             conn.close()
@@ -527,8 +569,11 @@ def delete_crop_season(season_id):
             conn.close()
             return redirect(url_for('crops_list'))
         
-        # Delete the crop season
+        # Detach operations and weather events, then delete the crop season
+        conn.execute('UPDATE field_operations SET season_id = NULL WHERE season_id = ?', (season_id,))
+        conn.execute('UPDATE weather_events SET season_id = NULL WHERE season_id = ?', (season_id,))
         conn.execute('DELETE FROM crop_seasons WHERE season_id = ?', (season_id,))
+        dashboard_stats.on_bulk_change(conn)
         conn.commit()
         conn.close()
         
@@ -579,6 +624,7 @@ def add_weather_event():
                 weather_data['yield_impact_percent'], weather_data['insurance_claim'],
                 weather_data['lessons_learned']
             ))
+            dashboard_stats.on_weather_event_added(conn, weather_data['event_date'])
             
             conn.commit()
             conn.close()
@@ -597,6 +643,7 @@ def add_weather_event():
 # =====================================================
 
 @app.route('/storage')
+@conditional('crop_storage')
 def storage_dashboard():
     """Improved storage dashboard with search/filters using your working base"""
     conn = get_db_connection()
@@ -604,109 +651,73 @@ def storage_dashboard():
         return redirect(url_for('index'))
     
     try:
-        print("🔍 Starting storage dashboard query...")
-        
-        # First, let's check what data exists (your debug code)
-        raw_data = conn.execute('SELECT * FROM crop_storage LIMIT 5').fetchall()
-        print(f"📊 Sample raw data: {[dict(row) for row in raw_data]}")
-        
-        # Check for NULL values (your debug code)
-        null_check = conn.execute('''
-            SELECT 
-                COUNT(*) as total_rows,
-                COUNT(quantity_stored) as non_null_quantity,
-                COUNT(storage_capacity) as non_null_capacity,
-                COUNT(current_market_price) as non_null_price
-            FROM crop_storage
-        ''').fetchone()
-        print(f"🔍 NULL check: {dict(null_check)}")
-        
-        # Get all crops with storage data - your working query
-        print("🔍 Executing main query...")
-        crops = conn.execute('''
-            SELECT 
-                crop_name, 
-                COALESCE(crop_category, 'Other') as crop_category,
-                COALESCE(quantity_stored, 0.0) as quantity_stored,
-                COALESCE(storage_capacity, 1000.0) as storage_capacity,
-                COALESCE(current_market_price, 0.0) as current_market_price,
-                COALESCE(sale_location, 'Local Elevator') as sale_location
-            FROM crop_storage 
-            ORDER BY crop_name  -- Changed to name order for better searching
-        ''').fetchall()
-        
-        print(f"📊 Found {len(crops)} crops")
-        
-        # Process crops and calculate values - your working logic
-        processed_crops = []
-        for crop in crops:
-            try:
-                quantity = float(crop['quantity_stored']) if crop['quantity_stored'] is not None else 0.0
-                capacity = float(crop['storage_capacity']) if crop['storage_capacity'] is not None else 1000.0
-                price = float(crop['current_market_price']) if crop['current_market_price'] is not None else 0.0
-                
-                # Ensure capacity is never zero to avoid division by zero
-                if capacity <= 0:
-                    capacity = 1000.0
-                
-                total_value = quantity * price
-                capacity_used = round((quantity / capacity) * 100, 1) if capacity > 0 else 0.0
-                
-                processed_crop = {
-                    'crop_name': crop['crop_name'],
-                    'crop_category': crop['crop_category'] or 'Other',
-                    'quantity_stored': quantity,
-                    'storage_capacity': capacity,
-                    'current_market_price': price,
-                    'sale_location': crop['sale_location'] or 'Local Elevator',
-                    'total_value': total_value,
-                    'capacity_used': capacity_used
-                }
-                processed_crops.append(processed_crop)
-                
-            except Exception as e:
-                print(f"❌ Error processing crop {crop['crop_name']}: {e}")
-                print(f"   Crop data: {dict(crop)}")
-                continue
-        
-        print(f"✅ Processed {len(processed_crops)} crops successfully")
-        
-        # Calculate summary statistics - your working logic
-        total_value = sum(crop['total_value'] for crop in processed_crops)
-        total_capacity = sum(crop['storage_capacity'] for crop in processed_crops)
-        total_stored = sum(crop['quantity_stored'] for crop in processed_crops)
-        
-        print(f"📊 Summary: Value=${total_value:.2f}, Stored={total_stored:.1f}t, Capacity={total_capacity:.1f}t")
-        
-        # Get unique categories for filter dropdown (NEW)
-        categories = sorted(set(crop['crop_category'] for crop in processed_crops))
-        print(f"📂 Categories for filter: {categories}")
+        # Header totals and category list; the table itself is paged in via storage_crops_api
+        overview = storage_queries.query_storage_overview(conn)
+        storage_log.debug('storage overview loaded',
+                          crop_count=overview['crop_count'],
+                          total_value=round(overview['total_value'], 2),
+                          total_stored=round(overview['total_stored'], 1),
+                          total_capacity=round(overview['total_capacity'], 1))
         
         conn.close()
         
-        # Return data for the new template format
         return render_template('storage/dashboard.html', 
-                             crops=processed_crops,  # Changed from crops_by_category to crops
-                             categories=categories,   # NEW: for filter dropdown
-                             total_value=total_value,
-                             total_capacity=total_capacity,
-                             total_stored=total_stored)
+                             categories=overview['categories'],
+                             crop_count=overview['crop_count'],
+                             total_value=overview['total_value'],
+                             total_capacity=overview['total_capacity'],
+                             total_stored=overview['total_stored'],
+                             page_size=storage_queries.DEFAULT_PAGE_SIZE)
     
     except Exception as e:
-        print(f"❌ Storage dashboard error: {e}")
-        print(f"❌ Error type: {type(e)}")
-        import traceback
-        print(f"❌ Full traceback: {traceback.format_exc()}")
+        storage_log.exception('storage dashboard failed', error=str(e))
         
         flash(f'Error loading storage dashboard: {str(e)}', 'error')
         if conn:
             conn.close()
         return redirect(url_for('index'))
+
+@app.route('/storage/api/crops')
+@conditional('crop_storage')
+def storage_crops_api():
+    """One page of storage rows, filtered and sorted in SQL (keyset pagination)"""
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'success': False, 'error': 'Database connection failed'})
+    
+    filters = {
+        'search': request.args.get('search', '').strip() or None,
+        'category': request.args.get('category') or None,
+        'status': request.args.get('status') or None,
+    }
+    cursor = request.args.get('cursor') or None
+    
+    try:
+        crops, next_cursor = storage_queries.query_crop_page(
+            conn,
+            sort=request.args.get('sort', 'name'),
+            cursor=cursor,
+            limit=request.args.get('limit', storage_queries.DEFAULT_PAGE_SIZE),
+            **filters
+        )
+        
+        response = {'success': True, 'crops': crops, 'next_cursor': next_cursor}
+        
+        # Filtered totals only change when the filters do, so send them with the first page
+        if not cursor:
+            response['summary'] = storage_queries.query_filtered_summary(conn, **filters)
+        
+        conn.close()
+        return jsonify(response)
     
+    except ValueError as e:
+        conn.close()
+        return jsonify({'success': False, 'error': str(e)}), 400
+
 # Also add this route to check your data directly
 @app.route('/storage/debug')
 def storage_debug():
-    """Debug route to check storage data"""
+    """Debug route to check storage data and recent diagnostic log entries"""
     conn = get_db_connection()
     if not conn:
         return "No database connection"
@@ -715,8 +726,17 @@ def storage_debug():
         # Check table structure
         schema = conn.execute("PRAGMA table_info(crop_storage)").fetchall()
         
-        # Check all data
-        all_data = conn.execute("SELECT * FROM crop_storage").fetchall()
+        # NULL counts (moved here from the dashboard hot path)
+        null_check = conn.execute('''
+            SELECT 
+                COUNT(*) as total_rows,
+                COUNT(quantity_stored) as non_null_quantity,
+                COUNT(storage_capacity) as non_null_capacity,
+                COUNT(current_market_price) as non_null_price
+            FROM crop_storage
+        ''').fetchone()
+        
+        sample_data = conn.execute("SELECT * FROM crop_storage LIMIT 3").fetchall()
         
         # Check for problematic records
         problematic = conn.execute('''
@@ -731,15 +751,22 @@ def storage_debug():
         
         debug_info = {
             'table_schema': [dict(row) for row in schema],
-            'total_records': len(all_data),
-            'sample_data': [dict(row) for row in all_data[:3]],
-            'problematic_records': [dict(row) for row in problematic]
+            'total_records': null_check['total_rows'],
+            'null_check': dict(null_check),
+            'sample_data': [dict(row) for row in sample_data],
+            'problematic_records': [dict(row) for row in problematic],
+            'recent_log_entries': ring_buffer.recent(
+                limit=request.args.get('limit', 100, type=int),
+                logger=request.args.get('logger')
+            )
         }
         
-        return f"<pre>{str(debug_info)}</pre>"
+        if request.args.get('format') == 'json':
+            return jsonify(debug_info)
+        return f"<pre>{escape(pformat(debug_info))}</pre>"
         
     except Exception as e:
-        return f"Debug error: {e}"
+        return f"Debug error: {escape(str(e))}"
 
 @app.route('/storage/edit/<crop_name>', methods=['GET', 'POST'])
 def edit_crop_storage(crop_name):
@@ -792,8 +819,11 @@ def edit_crop_storage(crop_name):
         conn.close()
         return redirect(url_for('storage_dashboard'))
     
+    price_history = price_queries.recent_prices(conn, crop_name, limit=10)
+    
     conn.close()
-    return render_template('storage/edit.html', crop=crop, locations=locations)
+    return render_template('storage/edit.html', crop=crop, locations=locations,
+                         price_history=price_history)
 
 @app.route('/storage/update-quantity', methods=['POST'])
 def update_quantity():
@@ -837,26 +867,48 @@ def price_history(crop_name):
         return redirect(url_for('storage_dashboard'))
     
     try:
-        history = conn.execute('''
-            SELECT price, sale_location, price_date, notes
-            FROM price_history 
-            WHERE crop_name = ?
-            ORDER BY price_date DESC
-            LIMIT 50
-        ''', (crop_name,)).fetchall()
+        history = price_queries.recent_prices(conn, crop_name)
+        
+        # Seasonal OHLC comes from the price rollups, newest season first
+        seasons = price_queries.price_series(conn, [crop_name], resolution='season')['series']
         
         crop = conn.execute('SELECT * FROM crop_storage WHERE crop_name = ?', (crop_name,)).fetchone()
         
         conn.close()
         
         return render_template('storage/price_history.html', 
-                             crop=crop, history=history)
+                             crop=crop, crop_name=crop_name, history=history,
+                             seasons=list(reversed(seasons.get(crop_name, []))))
     
     except Exception as e:
         flash(f'Error loading price history: {str(e)}', 'error')
         conn.close()
         return redirect(url_for('storage_dashboard'))
 
+@app.route('/storage/api/prices')
+@conditional('price_history')
+def price_series_api():
+    """Bucketed price series (open/high/low/close/avg per bucket) for charts"""
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'success': False, 'error': 'Database connection failed'})
+    
+    try:
+        result = price_queries.price_series(
+            conn,
+            crop_names=request.args.getlist('crop') or None,
+            start=request.args.get('start') or None,
+            end=request.args.get('end') or None,
+            resolution=request.args.get('resolution') or None,
+            max_points=request.args.get('max_points', price_queries.DEFAULT_MAX_POINTS, type=int)
+        )
+        conn.close()
+        return jsonify({'success': True, **result})
+    
+    except ValueError as e:
+        conn.close()
+        return jsonify({'success': False, 'error': str(e)}), 400
+
 @app.route('/storage/update-field', methods=['POST'])
 def update_storage_field():
     """Update any field in crop storage via AJAX"""
@@ -866,12 +918,7 @@ def update_storage_field():
         new_value = request.json.get('value')
         
         # Validate field name for security
-        allowed_fields = [
-            'quantity_stored', 'storage_capacity', 'current_market_price', 
-            'sale_location', 'notes'
-        ]
-        
-        if field_name not in allowed_fields:
+        if field_name not in storage_queries.EDITABLE_FIELDS:
             return jsonify({'success': False, 'error': 'Invalid field'})
         
         conn = get_db_connection()
@@ -879,7 +926,7 @@ def update_storage_field():
             return jsonify({'success': False, 'error': 'Database connection failed'})
         
         # Convert numeric fields
-        if field_name in ['quantity_stored', 'storage_capacity', 'current_market_price']:
+        if field_name in storage_queries.NUMERIC_FIELDS:
             try:
                 new_value = float(new_value)
             except ValueError:
@@ -926,7 +973,39 @@ def update_storage_field():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/storage/batch-update', methods=['POST'])
+def batch_update_storage():
+    """Apply many inline storage edits in one transaction"""
+    payload = request.get_json(silent=True)
+    changes = payload.get('changes') if isinstance(payload, dict) else payload
+    
+    # Nothing is written unless every change is valid
+    changes, errors = storage_queries.validate_changes(changes)
+    if errors:
+        return jsonify({'success': False, 'error': 'Invalid changes', 'errors': errors}), 400
+    
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'success': False, 'error': 'Database connection failed'})
+    
+    try:
+        crops = storage_queries.apply_changes(conn, changes, datetime.now())
+        conn.commit()
+        conn.close()
+        
+        return jsonify({'success': True, 'updated': len(changes), 'crops': crops})
+        
+    except KeyError as e:
+        conn.rollback()
+        conn.close()
+        return jsonify({'success': False, 'error': 'Unknown crops: ' + ', '.join(e.args[0])}), 404
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        return jsonify({'success': False, 'error': str(e)})
+
 @app.route('/storage/get-locations', methods=['GET'])
+@conditional('crop_storage')
 def get_sale_locations():
     """Get list of sale locations for dropdown"""
     try:
@@ -964,6 +1043,7 @@ def get_sale_locations():
 # =====================================================
 
 @app.route('/storage/locations')
+@response_cache.cached('crop_storage', 'sale_locations')
 def manage_locations():
     """Manage sale locations"""
     conn = get_db_connection()
@@ -1065,19 +1145,6 @@ def add_location():
         if not conn:
             return redirect(url_for('manage_locations'))
         
-        # Create table if it doesn't exist
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS sale_locations (
-                location_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                location_name TEXT NOT NULL UNIQUE,
-                location_type TEXT,
-                distance_km REAL,
-                contact_info TEXT,
-                notes TEXT,
-                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
         # Insert new location
         conn.execute('''
             INSERT INTO sale_locations (location_name, location_type, distance_km, contact_info, notes)
@@ -1227,29 +1294,15 @@ def bulk_add_locations():
         if not conn:
             return redirect(url_for('manage_locations'))
         
-        # Create table if it doesn't exist
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS sale_locations (
-                location_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                location_name TEXT NOT NULL UNIQUE,
-                location_type TEXT,
-                distance_km REAL,
-                contact_info TEXT,
-                notes TEXT,
-                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
         added_count = 0
         for location in default_locations:
             try:
-                conn.execute('''
+                cursor = conn.execute('''
                     INSERT OR IGNORE INTO sale_locations 
                     (location_name, location_type, distance_km, contact_info)
                     VALUES (?, ?, ?, ?)
                 ''', location)
-                if conn.lastrowid:  # If a row was actually inserted
-                    added_count += 1
+                added_count += cursor.rowcount  # 0 when the name already exists
             except:
                 continue
         
@@ -1270,6 +1323,7 @@ def bulk_add_locations():
 # =====================================================
 
 @app.route('/reports')
+@response_cache.cached('crop_seasons', 'fields', 'weather_events')
 def reports_dashboard():
     """Reports dashboard with performance summaries"""
     conn = get_db_connection()
@@ -1277,44 +1331,15 @@ def reports_dashboard():
         return redirect(url_for('index'))
     
     try:
-        # Field performance summary
-        field_performance = conn.execute('''
-            SELECT f.field_id, f.field_name, f.size_hectares,
-                   COUNT(cs.season_id) as total_seasons,
-                   ROUND(AVG(cs.yield_tonnes_per_ha), 2) as avg_yield,
-                   ROUND(AVG(cs.quality_percent), 1) as avg_quality,
-                   ROUND(SUM(cs.yield_tonnes_per_ha * f.size_hectares), 1) as total_production
-            FROM fields f
-            LEFT JOIN crop_seasons cs ON f.field_id = cs.field_id
-            WHERE cs.yield_tonnes_per_ha IS NOT NULL
-            GROUP BY f.field_id, f.field_name, f.size_hectares
-            ORDER BY avg_yield DESC
-        ''').fetchall()
+        # All three summaries read the rollups kept current by triggers
+        field_performance = report_queries.field_performance(conn)
+        crop_performance = report_queries.crop_performance(conn)
+        weather_summary = report_queries.weather_summary(conn)
         
-        # Crop performance by type
-        crop_performance = conn.execute('''
-            SELECT crop_type, COUNT(*) as total_seasons,
-                   ROUND(AVG(yield_tonnes_per_ha), 2) as avg_yield,
-                   ROUND(AVG(quality_percent), 1) as avg_quality,
-                   ROUND(AVG(growth_days), 0) as avg_growth_days,
-                   ROUND(MIN(yield_tonnes_per_ha), 2) as min_yield,
-                   ROUND(MAX(yield_tonnes_per_ha), 2) as max_yield
-            FROM crop_seasons
-            WHERE yield_tonnes_per_ha IS NOT NULL
-            GROUP BY crop_type
-            ORDER BY avg_yield DESC
-        ''').fetchall()
-        
-        # Weather impact summary
-        weather_summary = conn.execute('''
-            SELECT weather_type, COUNT(*) as total_events,
-                   ROUND(AVG(damage_percent), 1) as avg_damage,
-                   ROUND(AVG(yield_impact_percent), 1) as avg_yield_impact,
-                   SUM(CASE WHEN insurance_claim = 1 THEN 1 ELSE 0 END) as insurance_claims
-            FROM weather_events
-            GROUP BY weather_type
-            ORDER BY avg_yield_impact DESC
-        ''').fetchall()
+        # Yield percentiles come from the cached columnar engine
+        percentiles = {row['crop_type']: row for row in analytics_engine.yield_percentiles(conn)}
+        for crop in crop_performance:
+            crop['percentiles'] = percentiles.get(crop['crop_type'])
         
         conn.close()
         
@@ -1328,11 +1353,42 @@ def reports_dashboard():
         conn.close()
         return redirect(url_for('index'))
 
+@app.route('/reports/analytics')
+@response_cache.cached('crop_seasons', 'fields', 'harvest_records', 'planting_records')
+def reports_analytics():
+    """Yield distributions, trends and soil correlations"""
+    conn = get_db_connection()
+    if not conn:
+        return redirect(url_for('index'))
+    
+    try:
+        yield_percentiles = analytics_engine.yield_percentiles(conn)
+        rolling_yields = analytics_engine.rolling_yields(conn)
+        yield_correlations = analytics_engine.yield_correlations(conn)
+        soil_yields = analytics_engine.soil_normalized_yields(conn)
+        harvest_percentiles = analytics_engine.harvest_percentiles(conn)
+        
+        conn.close()
+        
+        return render_template('reports/analytics.html',
+                             yield_percentiles=yield_percentiles,
+                             rolling_yields=rolling_yields,
+                             rolling_window=analytics_engine.ROLLING_WINDOW_YEARS,
+                             yield_correlations=yield_correlations,
+                             soil_yields=soil_yields,
+                             harvest_percentiles=harvest_percentiles)
+    
+    except Exception as e:
+        flash(f'Error generating analytics: {str(e)}', 'error')
+        conn.close()
+        return redirect(url_for('reports_dashboard'))
+
 # =====================================================
 # PLANTING TRACKING ROUTES
 # =====================================================
 
 @app.route('/planting')
+@conditional('planting_records', 'fields', 'field_maintenance', 'harvest_records')
 def planting_dashboard():
     """Planting operations dashboard"""
     conn = get_db_connection()
@@ -1340,39 +1396,22 @@ def planting_dashboard():
         return redirect(url_for('index'))
     
     try:
-        # Get all planting records with field info
-        plantings = conn.execute('''
-            SELECT 
-                p.*,
-                f.field_name,
-                f.size_hectares as field_size,
-                (SELECT COUNT(*) FROM field_maintenance WHERE planting_id = p.planting_id) as maintenance_count,
-                (SELECT COUNT(*) FROM harvest_records WHERE planting_id = p.planting_id) as harvest_count
-            FROM planting_records p
-            JOIN fields f ON p.field_id = f.field_id
-            ORDER BY p.planting_date DESC
-        ''').fetchall()
+        cursor = request.args.get('cursor') or None
+        plantings, next_cursor = planting_queries.query_planting_page(conn, cursor=cursor)
         
-        # Get summary stats
-        active_plantings = conn.execute('''
-            SELECT COUNT(*) as count FROM planting_records WHERE status = 'Active'
-        ''').fetchone()['count']
-        
-        total_planted_area = conn.execute('''
-            SELECT SUM(planted_area_ha) as total FROM planting_records WHERE status = 'Active'
-        ''').fetchone()['total'] or 0
-        
-        total_costs = conn.execute('''
-            SELECT SUM(total_planting_cost) as total FROM planting_records
-        ''').fetchone()['total'] or 0
+        # Header totals are maintained by triggers on planting_records
+        summary = planting_queries.get_summary(conn)
         
         conn.close()
         
         return render_template('planting/dashboard.html',
                              plantings=plantings,
-                             active_plantings=active_plantings,
-                             total_planted_area=total_planted_area,
-                             total_costs=total_costs)
+                             next_cursor=next_cursor,
+                             is_first_page=cursor is None,
+                             total_plantings=summary['total_plantings'],
+                             active_plantings=summary['active_plantings'],
+                             total_planted_area=summary['active_area_ha'],
+                             total_costs=summary['total_costs'])
     
     except Exception as e:
         flash(f'Error loading planting dashboard: {str(e)}', 'error')
@@ -1629,101 +1668,14 @@ def add_harvest(planting_id):
     
     if request.method == 'POST':
         try:
-            harvest_date = request.form.get('harvest_date')
-            harvest_season = request.form.get('harvest_season', '')
-            
-            # Yield information
-            total_yield_tonnes = float(request.form.get('total_yield_tonnes'))
-            harvested_area_ha = float(request.form.get('harvested_area_ha', planting['planted_area_ha']))
-            yield_per_hectare = total_yield_tonnes / harvested_area_ha if harvested_area_ha > 0 else 0
-            
-            # Quality
-            moisture_percent = float(request.form.get('moisture_percent')) if request.form.get('moisture_percent') else None
-            quality_grade = request.form.get('quality_grade', '')
-            test_weight = float(request.form.get('test_weight')) if request.form.get('test_weight') else None
-            protein_percent = float(request.form.get('protein_percent')) if request.form.get('protein_percent') else None
-            damage_percent = float(request.form.get('damage_percent', 0))
-            
-            # Market
-            market_price = float(request.form.get('market_price_per_tonne', 0))
-            price_premium = float(request.form.get('price_premium', 0))
-            buyer_name = request.form.get('buyer_name', '')
-            sale_location = request.form.get('sale_location', '')
-            
-            # Harvest costs
-            harvest_labor_cost = float(request.form.get('harvest_labor_cost', 0))
-            harvest_equipment_cost = float(request.form.get('harvest_equipment_cost', 0))
-            harvest_fuel_cost = float(request.form.get('harvest_fuel_cost', 0))
-            transport_cost = float(request.form.get('transport_cost', 0))
-            drying_cost = float(request.form.get('drying_cost', 0))
-            storage_cost = float(request.form.get('storage_cost', 0))
-            other_harvest_costs = float(request.form.get('other_harvest_costs', 0))
-            total_harvest_cost = (harvest_labor_cost + harvest_equipment_cost + harvest_fuel_cost +
-                                transport_cost + drying_cost + storage_cost + other_harvest_costs)
-            
-            # Financial calculations
-            gross_revenue = total_yield_tonnes * (market_price + price_premium)
-            maintenance_costs = planting['maintenance_costs'] or 0
-            total_costs = planting['total_planting_cost'] + maintenance_costs + total_harvest_cost
-            net_profit = gross_revenue - total_costs
-            profit_per_hectare = net_profit / harvested_area_ha if harvested_area_ha > 0 else 0
-            roi_percent = (net_profit / total_costs * 100) if total_costs > 0 else 0
-            break_even_price = total_costs / total_yield_tonnes if total_yield_tonnes > 0 else 0
-            
-            # Details
-            harvest_method = request.form.get('harvest_method', '')
-            equipment_used = request.form.get('equipment_used', '')
-            operator_name = request.form.get('operator_name', '')
-            weather_conditions = request.form.get('weather_conditions', '')
-            notes = request.form.get('notes', '')
-            
-            conn.execute('''
-                INSERT INTO harvest_records (
-                    planting_id, field_id, harvest_date, harvest_season,
-                    total_yield_tonnes, yield_per_hectare, harvested_area_ha,
-                    moisture_percent, quality_grade, test_weight, protein_percent, damage_percent,
-                    market_price_per_tonne, price_premium, buyer_name, sale_location,
-                    harvest_method, equipment_used, operator_name, weather_conditions,
-                    harvest_labor_cost, harvest_equipment_cost, harvest_fuel_cost,
-                    transport_cost, drying_cost, storage_cost, other_harvest_costs, total_harvest_cost,
-                    gross_revenue, total_costs, net_profit, profit_per_hectare, roi_percent, break_even_price,
-                    notes
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                planting_id, planting['field_id'], harvest_date, harvest_season,
-                total_yield_tonnes, yield_per_hectare, harvested_area_ha,
-                moisture_percent, quality_grade, test_weight, protein_percent, damage_percent,
-                market_price, price_premium, buyer_name, sale_location,
-                harvest_method, equipment_used, operator_name, weather_conditions,
-                harvest_labor_cost, harvest_equipment_cost, harvest_fuel_cost,
-                transport_cost, drying_cost, storage_cost, other_harvest_costs, total_harvest_cost,
-                gross_revenue, total_costs, net_profit, profit_per_hectare, roi_percent, break_even_price,
-                notes
-            ))
-            
-            # Update planting status
-            conn.execute('UPDATE planting_records SET status = ? WHERE planting_id = ?',
-                        ('Harvested', planting_id))
-            
-            # Update storage dashboard if crop exists there
-            storage_exists = conn.execute(
-                'SELECT 1 FROM crop_storage WHERE crop_name = ?',
-                (planting['crop_type'],)
-            ).fetchone()
-            
-            if storage_exists:
-                conn.execute('''
-                    UPDATE crop_storage
-                    SET quantity_stored = quantity_stored + ?,
-                        current_market_price = ?,
-                        last_price_update = ?
-                    WHERE crop_name = ?
-                ''', (total_yield_tonnes, market_price, harvest_date, planting['crop_type']))
-            
-            conn.commit()
+            # Financials, the planting status and the storage increment are
+            # handled in one transaction by the harvest service
+            harvest = harvest_service.normalize(request.form, planting_id=planting_id)
+            result = harvest_service.record_harvest(conn, harvest)
             conn.close()
             
-            flash(f'Harvest recorded successfully! Net profit: ${net_profit:,.2f} (ROI: {roi_percent:.1f}%)', 'success')
+            flash(f"Harvest recorded successfully! Net profit: ${result['net_profit']:,.2f} "
+                  f"(ROI: {result['roi_percent']:.1f}%)", 'success')
             return redirect(url_for('planting_detail', planting_id=planting_id))
             
         except Exception as e:
@@ -1732,6 +1684,45 @@ def add_harvest(planting_id):
     conn.close()
     return render_template('harvest/add.html', planting=planting)
 
+@app.route('/harvest/batch', methods=['POST'])
+def add_harvest_batch():
+    """Record a list of harvests (JSON) in one transaction"""
+    payload = request.get_json(silent=True)
+    items = payload.get('harvests') if isinstance(payload, dict) else payload
+    if not isinstance(items, list) or not items:
+        return jsonify({'success': False, 'error': 'Expected a non-empty list of harvests'}), 400
+    if len(items) > harvest_service.MAX_BATCH_HARVESTS:
+        return jsonify({'success': False,
+                        'error': f'At most {harvest_service.MAX_BATCH_HARVESTS} harvests per batch'}), 400
+    
+    # Nothing is written unless every harvest is valid
+    harvests, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise harvest_service.HarvestError('Expected an object')
+            harvests.append(harvest_service.normalize(item))
+        except harvest_service.HarvestError as e:
+            errors.append({'index': index, 'error': str(e)})
+    if errors:
+        return jsonify({'success': False, 'error': 'Invalid harvests', 'errors': errors}), 400
+    
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'success': False, 'error': 'Database connection failed'})
+    
+    try:
+        results = harvest_service.record_harvests(conn, harvests)
+        conn.close()
+        return jsonify({'success': True, 'recorded': len(results), 'harvests': results})
+    
+    except harvest_service.HarvestError as e:
+        conn.close()
+        return jsonify({'success': False, 'error': str(e)}), 404
+    except Exception as e:
+        conn.close()
+        return jsonify({'success': False, 'error': str(e)})
+
 # =====================================================
 # FIELD MAINTENANCE ROUTES
 # =====================================================
@@ -1813,32 +1804,57 @@ def add_maintenance(planting_id):
 # OPTIONAL: Additional maintenance management routes
 # =====================================================
 
-@app.route('/maintenance/list')
-def maintenance_list():
-    """List all maintenance records"""
+def history_filters():
+    """Filters of an operations / maintenance history page from the query string"""
+    return {name: request.args.get(name, '').strip() or None
+            for name in ('field_id', 'entry_type', 'operator', 'start', 'end')}
+
+
+def render_history_page(name, template, endpoint):
+    """One keyset page of a history log with its header totals"""
     conn = get_db_connection()
     if not conn:
         return redirect(url_for('index'))
-    
+
+    filters = history_filters()
+    cursor = request.args.get('cursor') or None
     try:
-        maintenance = conn.execute('''
-            SELECT m.*, f.field_name, p.crop_type
-            FROM field_maintenance m
-            JOIN fields f ON m.field_id = f.field_id
-            LEFT JOIN planting_records p ON m.planting_id = p.planting_id
-            ORDER BY m.maintenance_date DESC
-            LIMIT 100
-        ''').fetchall()
-        
+        entries, next_cursor = history_queries.query_page(conn, name, cursor=cursor, **filters)
+
+        # Header totals are maintained by triggers on the log table
+        totals = history_queries.get_totals(conn, name, filters['field_id'], filters['entry_type'])
+        entry_types = history_queries.entry_types(conn, name)
+
         conn.close()
-        return render_template('maintenance/list.html', maintenance=maintenance)
-    
+        return render_template(template,
+                             entries=entries,
+                             next_cursor=next_cursor,
+                             is_first_page=cursor is None,
+                             filters=filters,
+                             active_filters={key: value for key, value in filters.items() if value},
+                             totals_partial=bool(filters['operator'] or filters['start'] or filters['end']),
+                             entry_types=entry_types,
+                             totals=totals)
+
+    except ValueError as e:
+        # Bad date or cursor in the query string
+        conn.close()
+        flash(str(e), 'error')
+        return redirect(url_for(endpoint))
+
     except Exception as e:
-        flash(f'Error loading maintenance records: {str(e)}', 'error')
+        flash(f'Error loading {name} history: {str(e)}', 'error')
         conn.close()
         return redirect(url_for('index'))
 
 
+@app.route('/maintenance/list')
+@conditional('field_maintenance', 'fields', 'planting_records')
+def maintenance_list():
+    """Maintenance history, newest first, keyset-paged and filterable"""
+    return render_history_page('maintenance', 'maintenance/list.html', 'maintenance_list')
+
+
 @app.route('/maintenance/<int:maintenance_id>/edit', methods=['GET', 'POST'])
 def edit_maintenance(maintenance_id):
     """Edit maintenance record"""
@@ -1852,48 +1868,10 @@ def edit_maintenance(maintenance_id):
 # =====================================================
 
 @app.route('/operations')
+@conditional('field_operations', 'fields')
 def operations_list():
-    """List all field operations"""
-    conn = get_db_connection()
-    if not conn:
-        return redirect(url_for('index'))
-    
-    try:
-        operations = conn.execute('''
-            SELECT fo.operation_id, fo.operation_date, fo.field_id, f.field_name, 
-                   fo.operation_type, fo.hours_worked, fo.fuel_used_liters, 
-                   fo.quality_rating, fo.weather_conditions, fo.operator_name
-            FROM field_operations fo
-            JOIN fields f ON fo.field_id = f.field_id
-            ORDER BY fo.operation_date DESC
-            LIMIT 100
-        ''').fetchall()
-        
-        # Get summary statistics
-        total_operations = conn.execute('SELECT COUNT(*) as count FROM field_operations').fetchone()['count']
-        
-        total_hours = conn.execute('''
-            SELECT SUM(hours_worked) as total FROM field_operations 
-            WHERE hours_worked IS NOT NULL
-        ''').fetchone()['total'] or 0
-        
-        total_fuel = conn.execute('''
-            SELECT SUM(fuel_used_liters) as total FROM field_operations 
-            WHERE fuel_used_liters IS NOT NULL
-        ''').fetchone()['total'] or 0
-        
-        conn.close()
-        return render_template('operations/list.html', 
-                             operations=operations,
-                             total_operations=total_operations,
-                             total_hours=round(total_hours, 1),
-                             total_fuel=round(total_fuel, 1))
-    
-    except Exception as e:
-        flash(f'Error loading operations: {str(e)}', 'error')
-        if conn:
-            conn.close()
-        return redirect(url_for('index'))
+    """Field operation history, newest first, keyset-paged and filterable"""
+    return render_history_page('operations', 'operations/list.html', 'operations_list')
 
 
 @app.route('/operations/add', methods=['GET', 'POST'])
@@ -1949,6 +1927,7 @@ def add_operation():
                 operation_data['operator_name'], operation_data['average_speed_kmh'],
                 operation_data['soil_moisture_percent'], operation_data['notes']
             ))
+            dashboard_stats.on_operations_changed(conn)
             
             conn.commit()
             conn.close()
@@ -2016,6 +1995,7 @@ def edit_operation(operation_id):
                 operation_data['quality_rating'], operation_data['operator_name'],
                 operation_data['notes'], operation_id
             ))
+            dashboard_stats.on_operations_changed(conn)
             
             conn.commit()
             conn.close()
@@ -2039,6 +2019,7 @@ def delete_operation(operation_id):
     
     try:
         conn.execute('DELETE FROM field_operations WHERE operation_id = ?', (operation_id,))
+        dashboard_stats.on_operations_changed(conn)
         conn.commit()
         conn.close()
         
@@ -2051,6 +2032,127 @@ def delete_operation(operation_id):
             conn.close()
         return redirect(url_for('operations_list'))
 
+# =====================================================
+# SEARCH ROUTES
+# =====================================================
+
+def search_link(result):
+    """Page a search result belongs to: the operation in its log, the planting, or the field"""
+    kind = result['kind']
+    if kind == 'operation':
+        # Operations are viewed in the log; narrow it to the record's field and day
+        day = (result['record_date'] or '')[:10] or None
+        return url_for('operations_list', field_id=result['field_id'], start=day, end=day,
+                       _anchor=f"operation-{result['record_id']}")
+    # Maintenance has no page of its own; it is listed on its planting
+    if kind in ('planting', 'maintenance', 'harvest') and result['planting_id']:
+        return url_for('planting_detail', planting_id=result['planting_id'])
+    return url_for('field_detail', field_id=result['field_id'])
+
+def run_search():
+    """(query, results, has_more) for the q / kind / limit / offset request arguments"""
+    query = request.args.get('q', '').strip()
+    kinds = request.args.getlist('kind')
+    limit = request.args.get('limit', search_index.DEFAULT_LIMIT, type=int)
+    offset = request.args.get('offset', 0, type=int)
+
+    conn = get_db_connection()
+    if not conn:
+        return query, [], False
+    try:
+        results, has_more = search_index.search(conn, query, kinds, limit, offset)
+    finally:
+        conn.close()
+    for result in results:
+        result['url'] = search_link(result)
+    return query, results, has_more
+
+@app.route('/search')
+def search_page():
+    """Full-text search across notes and other free-text columns"""
+    try:
+        query, results, has_more = run_search()
+    except ValueError as e:
+        flash(f'Invalid search: {str(e)}', 'error')
+        query, results, has_more = request.args.get('q', ''), [], False
+    return render_template('search.html', query=query, results=results, has_more=has_more,
+                           kinds=[source[0] for source in search_index.SOURCES],
+                           selected_kinds=request.args.getlist('kind'),
+                           offset=request.args.get('offset', 0, type=int))
+
+@app.route('/search/api')
+def search_api():
+    """Full-text search results as JSON (for search-as-you-type)"""
+    try:
+        query, results, has_more = run_search()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, 'query': query, 'results': results, 'has_more': has_more})
+
+# =====================================================
+# BULK IMPORT ROUTES
+# =====================================================
+
+@app.route('/import/<table>', methods=['POST'])
+def bulk_import(table):
+    """Stream a CSV or NDJSON body (or an uploaded 'file') into fields, plantings, operations or harvests"""
+    upload = request.files.get('file') if request.mimetype == 'multipart/form-data' else None
+    stream = upload.stream if upload else request.stream
+    fmt = request.args.get('format') or importer.format_for(
+        upload.filename if upload else None, None if upload else request.content_type)
+    batch_size = request.args.get('batch_size', importer.BATCH_SIZE, type=int)
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'success': False, 'error': 'Database connection failed'})
+
+    try:
+        report = importer.import_stream(conn, table, stream, fmt, max(1, batch_size))
+        conn.close()
+        return jsonify({'success': report['failed'] == 0, **report})
+
+    except importer.ImportRejected as e:
+        conn.close()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        conn.close()
+        return jsonify({'success': False, 'error': str(e)})
+
+# =====================================================
+# BULK EXPORT ROUTES
+# =====================================================
+
+@app.route('/export/<table>')
+def bulk_export(table):
+    """Stream operations, harvests, maintenance or prices as CSV, Parquet or Arrow"""
+    fmt = request.args.get('format', 'csv')
+    start = request.args.get('start')
+    end = request.args.get('end')
+    filters = {name: value for name, value in request.args.items()
+               if name not in ('format', 'start', 'end') and value}
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'success': False, 'error': 'Database connection failed'})
+
+    try:
+        chunks = exporter.export(conn, table, fmt, filters, start, end)
+    except exporter.ExportError as e:
+        conn.close()
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    def generate():
+        try:
+            yield from chunks
+        finally:
+            chunks.close()
+            conn.close()
+
+    response = app.response_class(stream_with_context(generate()), mimetype=exporter.FORMATS[fmt])
+    response.headers['Content-Disposition'] = (
+        f'attachment; filename="{exporter.filename(table, fmt, start, end)}"')
+    return response
+
 # =====================================================
 # ERROR HANDLERS AND UTILITY ROUTES
 # =====================================================
@@ -2060,6 +2162,41 @@ def setup_required():
     """Show setup required page"""
     return render_template('setup_required.html')
 
+@app.route('/db/pool-stats')
+def db_pool_stats():
+    """Connection pool usage, for sizing DB_POOL_MAX_IDLE"""
+    stats = db_pool.stats()
+    try:
+        conn = db_pool.acquire()
+        conn.execute('SELECT 1').fetchone()
+        conn.close()
+        stats['healthy'] = True
+    except Exception as e:
+        stats['healthy'] = False
+        stats['error'] = str(e)
+    return jsonify(stats)
+
+@app.route('/db/slow-queries')
+def db_slow_queries():
+    """Most recent slow statements (needs FS25_SQL_INSTRUMENTATION=1)"""
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify(ring_buffer.recent(limit=limit, logger='fs25.sql.slow'))
+
+@app.route('/cache/stats')
+def cache_stats():
+    """Response cache size, hit rate and evictions"""
+    return jsonify(response_cache.stats())
+
+@app.route('/savegame/status')
+def savegame_status():
+    """Savegame watcher mode and the last sync: when, how long, rows changed (needs FS25_SAVEGAME_DIR)"""
+    return jsonify(current_savegame_status())
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Request, database and process metrics in the Prometheus text format"""
+    return app.response_class(metrics.render(db_pool), mimetype='text/plain; version=0.0.4')
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
@@ -2070,6 +2207,50 @@ def internal_error(error):
     """Handle 500 errors"""
     return render_template('500.html'), 500
 
+# =====================================================
+# MAINTENANCE COMMANDS
+# =====================================================
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Apply pending schema migrations to DATABASE_PATH"""
+    if not os.path.exists(app.config['DATABASE_PATH']):
+        print(f"❌ Database not found: {app.config['DATABASE_PATH']}")
+        exit(1)
+    applied = run_migrations()
+    for version, name in applied:
+        print(f"✅ {version:04d} {name}")
+    if not applied:
+        print("✅ Schema already up to date")
+
+@app.cli.command('rebuild-dashboard-stats')
+def rebuild_dashboard_stats_command():
+    """Recompute the materialized home and planting dashboard statistics"""
+    conn = db_pool.acquire()
+    years = dashboard_stats.rebuild(conn)
+    planting_queries.rebuild_summary(conn)
+    conn.commit()
+    conn.close()
+    print(f"✅ Dashboard statistics rebuilt for {', '.join(str(year) for year in years)}")
+    print("✅ Planting summary rebuilt")
+
+@app.cli.command('watch-savegame')
+def watch_savegame_command():
+    """Sync FS25_SAVEGAME_DIR on every autosave until stopped (for WSGI deployments)"""
+    run_migrations()
+    watcher = start_savegame_watcher()
+    if watcher is None:
+        print("❌ No FS25_SAVEGAME_DIR set, or another process is already watching it")
+        exit(1)
+    print(f"👀 Watching {watcher.directory} ({watcher.source.mode}), Ctrl+C to stop")
+    try:
+        while watcher.join(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop(timeout=5)
+
 # =====================================================
 # APPLICATION STARTUP
 # =====================================================
@@ -2088,5 +2269,11 @@ if __name__ == '__main__':
     print("🔧 Press Ctrl+C to stop the server")
     print("=" * 50)
     
+    # The debug reloader runs this file twice: a parent that only watches
+    # the sources and the child that serves, which it marks WERKZEUG_RUN_MAIN
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        run_migrations()
+        start_savegame_watcher()
+
     # Run the Flask application
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,178 @@
+"""
+Fixtures for the route benchmarks.
+
+    python -m pytest benchmarks                              # compare with routes_baseline.json
+    python -m pytest benchmarks --bench-update-route 'GET /planting'   # re-record one route
+    python -m pytest benchmarks --bench-update-baseline      # record a new baseline
+    python -m pytest benchmarks --bench-scale 1 --bench-runs 50
+    python -m pytest benchmarks --bench-response-cache       # time cache hits instead
+    python -m pytest benchmarks --bench-gate-latency         # fail, not warn, on slow routes
+
+A synthetic farm is generated once per session (database.generate_sample_data)
+unless --bench-db points at an existing one. Baselines are only compared
+when they were recorded at the same scale and seed.
+
+A change re-records the routes it changed with --bench-update-route
+(repeatable) and leaves every other entry alone, so one change cannot
+loosen the thresholds of routes it never touched. --bench-update-baseline
+rewrites the whole file; keep it for a new scale, seed or machine.
+
+Status codes, statement counts and peak memory are deterministic and fail
+the test when they regress. Latency is compared against the baseline
+scaled by the session's calibration run (benchmarks.harness.calibrate)
+and only warns, unless --bench-gate-latency is given: wall-clock times
+from one machine are not a contract for another.
+
+The response cache (database/response_cache.py) is off by default so the
+numbers measure the queries and templates behind each page, not a lookup.
+"""
+
+import os
+import sqlite3
+import warnings
+
+import pytest
+
+from benchmarks import harness
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks')
+    group.addoption('--bench-scale', type=float, default=0.1,
+                    help='generator scale for the benchmark database (default 0.1, ~300k rows)')
+    group.addoption('--bench-seed', type=int, default=25)
+    group.addoption('--bench-db', default=None, help='use an existing generated database (modified by write routes)')
+    group.addoption('--bench-runs', type=int, default=25, help='timed requests per route')
+    group.addoption('--bench-tolerance', type=float, default=0.5,
+                    help='allowed fractional regression over the baseline (default 0.5)')
+    group.addoption('--bench-update-baseline', action='store_true',
+                    help='write routes_baseline.json instead of comparing')
+    group.addoption('--bench-update-route', action='append', default=[], metavar='NAME',
+                    help="re-record one route's entry, e.g. 'GET /planting', keeping the rest (repeatable)")
+    group.addoption('--bench-response-cache', action='store_true',
+                    help='leave the response cache on (repeat GETs become cache hits)')
+    group.addoption('--bench-gate-latency', action='store_true',
+                    help='fail on latency regressions instead of warning')
+
+
+class LatencyRegressionWarning(UserWarning):
+    """A route ran slower than its machine-scaled baseline"""
+
+
+class BenchSession:
+    def __init__(self, config):
+        self.config = config
+        self.runs = config.getoption('--bench-runs')
+        self.tolerance = config.getoption('--bench-tolerance')
+        self.update_baseline = config.getoption('--bench-update-baseline')
+        self.update_routes = set(config.getoption('--bench-update-route'))
+        self.gate_latency = config.getoption('--bench-gate-latency')
+        self.meta = {
+            'scale': config.getoption('--bench-scale'),
+            'seed': config.getoption('--bench-seed'),
+            'runs': self.runs,
+            'calibration_ms': harness.calibrate(),
+        }
+        self.results = {}
+        self.slow_routes = {}
+
+        baseline = None if self.update_baseline else harness.load_baseline()
+        if baseline and {k: baseline['meta'].get(k) for k in ('scale', 'seed')} != \
+                {k: self.meta[k] for k in ('scale', 'seed')}:
+            baseline = None  # recorded against a different database
+        self.baseline = baseline
+        self.speed = harness.speed_factor(baseline['meta'], self.meta['calibration_ms']) if baseline else 1.0
+
+    def check(self, name, result):
+        """Record a result and return regressions against the baseline (latency too with --bench-gate-latency)"""
+        self.results[name] = result
+        if not self.baseline or name not in self.baseline['routes'] or name in self.update_routes:
+            return []
+        failures, slow = harness.compare(result, self.baseline['routes'][name], self.tolerance, self.speed)
+        if slow and not self.gate_latency:
+            self.slow_routes[name] = slow
+            warnings.warn(f'{name}: ' + '; '.join(slow), LatencyRegressionWarning)
+            return failures
+        return failures + slow
+
+
+@pytest.fixture(scope='session')
+def bench(request):
+    session = BenchSession(request.config)
+    request.config._bench_session = session
+    yield session
+    if session.update_baseline and session.results:
+        harness.save_baseline(session.meta, session.results)
+    elif session.update_routes:
+        missing = session.update_routes - set(session.results)
+        if missing:
+            raise pytest.UsageError(f"--bench-update-route: no such route measured: {', '.join(sorted(missing))}")
+        if session.baseline is None:
+            raise pytest.UsageError('--bench-update-route needs a baseline recorded at this scale and seed')
+        routes = dict(session.baseline['routes'])
+        routes.update({name: session.results[name] for name in session.update_routes})
+        harness.save_baseline(session.baseline['meta'], routes)
+
+
+@pytest.fixture(scope='session')
+def bench_db(request, tmp_path_factory):
+    path = request.config.getoption('--bench-db')
+    if path:
+        return path
+
+    from database.generate_sample_data import FarmGenerator, generate
+
+    path = str(tmp_path_factory.mktemp('bench') / 'farm.db')
+    # Pin the end year so the database (and the baseline) do not change on New Year's Day
+    generator = FarmGenerator(request.config.getoption('--bench-seed'),
+                              scale=request.config.getoption('--bench-scale'), end_year=2025)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+    generate(conn, generator)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.close()
+    return path
+
+
+@pytest.fixture(scope='session')
+def bench_app(request, bench_db):
+    """The Flask app bound to the benchmark database, with SQL statement counting"""
+    os.environ['FS25_DATABASE_PATH'] = bench_db
+    if not request.config.getoption('--bench-response-cache'):
+        os.environ['FS25_RESPONSE_CACHE'] = '0'
+    import app as appmod
+
+    appmod.app.config.update(TESTING=True)
+    counter = harness.QueryCounter()
+    counter.attach(appmod.db_pool)
+    return appmod.app, counter
+
+
+@pytest.fixture
+def client(bench_app):
+    return bench_app[0].test_client()
+
+
+@pytest.fixture
+def query_counter(bench_app):
+    return bench_app[1]
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    session = getattr(config, '_bench_session', None)
+    if not session or not session.results:
+        return
+    terminalreporter.section('route benchmarks (ms)')
+    terminalreporter.write_line(harness.format_table(session.results))
+    if session.update_baseline:
+        terminalreporter.write_line(f'\n📝 Baseline written to {os.path.relpath(harness.BASELINE_PATH, harness.REPO_ROOT)}')
+    elif session.baseline is None:
+        terminalreporter.write_line('\nNo baseline for this scale/seed; run with --bench-update-baseline to record one')
+    else:
+        terminalreporter.write_line(f"\nCalibration {session.meta['calibration_ms']} ms, "
+                                    f"baseline latencies scaled x{session.speed:.2f}")
+        if session.slow_routes:
+            terminalreporter.write_line(f'⚠️  {len(session.slow_routes)} routes slower than their baseline '
+                                        f'(warning only; --bench-gate-latency to fail)')
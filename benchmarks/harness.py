@@ -0,0 +1,191 @@
+"""
+Measurement helpers for the route benchmarks (see test_routes.py).
+
+Each route is requested `runs` times after a warm-up. Latency percentiles
+come from plain timed runs; peak Python memory is taken from one extra run
+under tracemalloc, since tracing slows every allocation and would distort
+the timings. The garbage collector is run before and paused during the
+timed runs, as timeit does, so a full collection landing on one request
+does not show up as that route's p95.
+
+Statement counts and peak memory do not depend on the machine and are
+gated as recorded. Latency does: a baseline stores the time of a fixed
+calibration workload (calibrate()), and latency limits are scaled by how
+much slower or faster the current machine runs that same workload.
+"""
+
+import gc
+import json
+import os
+import sqlite3
+import statistics
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(REPO_ROOT, 'benchmarks', 'routes_baseline.json')
+
+TRANSACTION_CONTROL = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+
+# Slack added to every latency / memory limit so sub-millisecond routes do
+# not fail on scheduler noise
+LATENCY_SLACK_MS = 2.0
+MEMORY_SLACK_KB = 256
+
+CALIBRATION_ROWS = 20_000
+CALIBRATION_REPEATS = 7
+
+
+class QueryCounter:
+    """Counts SQL statements (transaction control excluded) run on pooled connections"""
+
+    def __init__(self):
+        self.count = 0
+
+    def _trace(self, sql):
+        if not sql.lstrip().upper().startswith(TRANSACTION_CONTROL):
+            self.count += 1
+
+    def attach(self, pool):
+        acquire, release = pool.acquire, pool.release
+
+        def counted_acquire():
+            conn = acquire()
+            conn.set_trace_callback(self._trace)
+            return conn
+
+        def untraced_release(conn):
+            # Idle connections are pinged by the pool's health check on their
+            # next checkout; that SELECT 1 is not the route's
+            conn.set_trace_callback(None)
+            release(conn)
+
+        pool.acquire = counted_acquire
+        pool.release = untraced_release
+
+
+def calibrate(repeats=CALIBRATION_REPEATS):
+    """Median ms of a fixed SQLite aggregate, sort and HTML build: a stand-in for one heavy page"""
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE calibration (id INTEGER PRIMARY KEY, name TEXT, amount REAL)')
+    conn.executemany('INSERT INTO calibration (name, amount) VALUES (?, ?)',
+                     ((f'row {i % 97}', (i * 7919) % CALIBRATION_ROWS / 4) for i in range(CALIBRATION_ROWS)))
+    samples = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            totals = conn.execute('SELECT name, SUM(amount) FROM calibration GROUP BY name').fetchall()
+            rows = conn.execute('SELECT name, amount FROM calibration ORDER BY amount DESC').fetchall()
+            ''.join(f'<tr><td>{name}</td><td>{amount:,.2f}</td></tr>' for name, amount in totals + rows)
+            samples.append((time.perf_counter() - started) * 1000)
+    finally:
+        gc.enable()
+        conn.close()
+    return round(statistics.median(samples), 2)
+
+
+def speed_factor(baseline_meta, calibration_ms):
+    """How many times slower this machine is than the baseline's (1.0 if the baseline has no calibration)"""
+    recorded = baseline_meta.get('calibration_ms')
+    if not recorded or not calibration_ms:
+        return 1.0
+    return calibration_ms / recorded
+
+
+def percentile(samples, pct):
+    """Linear-interpolated percentile of a non-empty list"""
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def measure(send, counter, runs, warmup=2):
+    """Time send(i) -> response; returns the stats dict stored in the baseline"""
+    for i in range(warmup):
+        send(i)
+
+    latencies, query_counts, status = [], [], None
+    gc.collect()
+    gc.disable()
+    try:
+        for i in range(warmup, warmup + runs):
+            counter.count = 0
+            started = time.perf_counter()
+            response = send(i)
+            latencies.append((time.perf_counter() - started) * 1000)
+            query_counts.append(counter.count)
+            status = response.status_code
+    finally:
+        gc.enable()
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        send(warmup + runs)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': status,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_ms': round(statistics.fmean(latencies), 2),
+        'queries': max(query_counts),
+        'peak_kb': round(peak_bytes / 1024, 1),
+        'runs': runs,
+    }
+
+
+def compare(result, baseline, tolerance, speed=1.0):
+    """(regressions, latency regressions) as lists of messages, empty if within the baseline.
+
+    speed scales the baseline latencies to this machine (see speed_factor).
+    """
+    failures, slow = [], []
+    if result['status'] != baseline['status']:
+        failures.append(f"status {result['status']} (baseline {baseline['status']})")
+
+    if result['queries'] > baseline['queries']:
+        failures.append(f"{result['queries']} queries per request (baseline {baseline['queries']})")
+
+    # p99 of a few dozen runs is effectively the slowest request (GC pauses,
+    # WAL checkpoints), so it is reported but not gated
+    for metric in ('p50_ms', 'p95_ms'):
+        expected = baseline[metric] * speed
+        limit = max(expected * (1 + tolerance), expected + LATENCY_SLACK_MS)
+        if result[metric] > limit:
+            slow.append(f'{metric} {result[metric]} exceeds baseline {baseline[metric]} '
+                        f'(x{speed:.2f} on this machine) by more than {tolerance:.0%}')
+
+    limit = max(baseline['peak_kb'] * (1 + tolerance), baseline['peak_kb'] + MEMORY_SLACK_KB)
+    if result['peak_kb'] > limit:
+        failures.append(f"peak memory {result['peak_kb']} KB exceeds baseline {baseline['peak_kb']} KB "
+                        f'by more than {tolerance:.0%}')
+    return failures, slow
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(meta, results, path=BASELINE_PATH):
+    with open(path, 'w') as f:
+        json.dump({'meta': meta, 'routes': dict(sorted(results.items()))}, f, indent=2)
+        f.write('\n')
+
+
+def format_table(results):
+    lines = [f"{'route':<32}{'status':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}{'peak KB':>10}"]
+    for name, r in sorted(results.items()):
+        lines.append(f"{name:<32}{r['status']:>7}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+                     f"{r['p99_ms']:>9.2f}{r['queries']:>9}{r['peak_kb']:>10.1f}")
+    return '\n'.join(lines)
@@ -0,0 +1,127 @@
+"""
+Application cold-start benchmark.
+
+Imports app.py in fresh interpreters and records import time and resident
+memory, then compares the medians with startup_baseline.json. Exits non-zero
+if either regresses beyond the tolerance, or if pandas/plotly are imported
+at startup again.
+
+The probes run against a migrated copy of data/fs25_farming.db in a
+temporary directory, so they neither write the tracked database nor time
+the migrations that importing app applies to a database that needs them.
+
+    python benchmarks/startup.py                     # compare with baseline
+    python benchmarks/startup.py --update-baseline   # record a new baseline
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(REPO_ROOT, 'benchmarks', 'startup_baseline.json')
+DATABASE_PATH = os.path.join(REPO_ROOT, 'data', 'fs25_farming.db')
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+
+rss_kb = 0
+with open('/proc/self/status') as status:
+    for line in status:
+        if line.startswith('VmRSS:'):
+            rss_kb = int(line.split()[1])
+
+from analytics.lazy import loaded_heavy_modules
+print(json.dumps({
+    'import_seconds': elapsed,
+    'rss_mb': rss_kb / 1024,
+    'heavy_modules': loaded_heavy_modules(),
+}))
+'''
+
+
+def prepare_database(directory):
+    """Copy the sample database into `directory` and migrate it; returns the copy's path"""
+    path = os.path.join(directory, 'fs25_farming.db')
+    if os.path.exists(DATABASE_PATH):
+        shutil.copyfile(DATABASE_PATH, path)
+        subprocess.run([sys.executable, '-m', 'database.migrations', '--db', path], cwd=REPO_ROOT,
+                       capture_output=True, text=True, check=True)
+    return path
+
+
+def measure_once(env):
+    result = subprocess.run([sys.executable, '-c', PROBE], cwd=REPO_ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure(runs):
+    with tempfile.TemporaryDirectory() as directory:
+        env = {**os.environ, 'FS25_DATABASE_PATH': prepare_database(directory)}
+        samples = [measure_once(env) for _ in range(runs)]
+    return {
+        'import_seconds': round(statistics.median(s['import_seconds'] for s in samples), 4),
+        'rss_mb': round(statistics.median(s['rss_mb'] for s in samples), 1),
+        'heavy_modules': sorted({m for s in samples for m in s['heavy_modules']}),
+        'runs': runs,
+    }
+
+
+def compare(result, baseline, tolerance):
+    failures = []
+    if result['heavy_modules']:
+        failures.append(f"heavy modules imported at startup: {', '.join(result['heavy_modules'])}")
+
+    for metric in ('import_seconds', 'rss_mb'):
+        limit = baseline[metric] * (1 + tolerance)
+        if result[metric] > limit:
+            failures.append(f'{metric} {result[metric]} exceeds baseline {baseline[metric]} '
+                            f'by more than {tolerance:.0%}')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure app import time and RSS')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='allowed fractional regression over the baseline (default 0.5)')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    result = measure(args.runs)
+    print(f"⏱️  import app: {result['import_seconds'] * 1000:.1f} ms, RSS {result['rss_mb']:.1f} MB "
+          f"(median of {args.runs})")
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(result, f, indent=2)
+            f.write('\n')
+        print(f'📝 Baseline written to {os.path.relpath(BASELINE_PATH, REPO_ROOT)}')
+        return 0
+
+    if not os.path.exists(BASELINE_PATH):
+        print('No baseline yet; run with --update-baseline first')
+        return 1
+
+    with open(BASELINE_PATH) as f:
+        baseline = json.load(f)
+
+    failures = compare(result, baseline, args.tolerance)
+    for failure in failures:
+        print(f'❌ {failure}')
+    if not failures:
+        print('✅ Startup within baseline')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
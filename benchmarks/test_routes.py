@@ -0,0 +1,102 @@
+"""
+Route latency, SQL statement count and peak memory against a generated farm.
+
+Read routes are timed first; write routes run afterwards on the same
+database and create their own rows (unique ids per request).
+"""
+
+import pytest
+
+from benchmarks.harness import measure
+from database.init_crop_storage import FS25_CROPS
+
+READ_ROUTES = (
+    ('GET /', '/'),
+    ('GET /fields', '/fields'),
+    ('GET /fields/<id>', '/fields/F00001'),
+    ('GET /crops', '/crops'),
+    ('GET /storage', '/storage'),
+    ('GET /storage/price-history/<crop>', '/storage/price-history/Wheat'),
+    ('GET /storage/api/prices', '/storage/api/prices'),
+    ('GET /reports', '/reports'),
+    ('GET /reports/analytics', '/reports/analytics'),
+    ('GET /planting', '/planting'),
+    ('GET /operations', '/operations'),
+    ('GET /maintenance/list', '/maintenance/list'),
+    ('GET /search', '/search?q=rain'),
+    ('GET /search/api', '/search/api?q=over'),
+)
+
+
+def _form(**values):
+    return {key: str(value) for key, value in values.items()}
+
+
+# (name, path, form or JSON builder taking the request number, JSON?)
+WRITE_ROUTES = (
+    ('POST /fields/add', lambda i: '/fields/add', lambda i: _form(
+        field_id=f'BENCH{i:05d}', field_name=f'Bench Field {i}', size_hectares=12.5,
+        soil_type='Loam', soil_ph=6.5), False),
+    ('POST /crops/add', lambda i: '/crops/add', lambda i: _form(
+        field_id='F00001', crop_year=2025, season_name='Bench', crop_type='Wheat',
+        variety_name='Standard', planting_date='2025-04-01'), False),
+    ('POST /crops/<id>/harvest', lambda i: '/crops/1/harvest', lambda i: _form(
+        harvest_date='2025-08-30', yield_tonnes_per_ha=8.2, quality_percent=91), False),
+    ('POST /weather/add', lambda i: '/weather/add', lambda i: _form(
+        field_id='F00002', event_date='2025-06-15', weather_type='Hail', severity='Moderate',
+        damage_percent=5, yield_impact_percent=2), False),
+    ('POST /operations/add', lambda i: '/operations/add', lambda i: _form(
+        field_id='F00003', operation_date='2025-05-02', operation_type='Spraying',
+        hours_worked=2.5, fuel_used_liters=60, quality_rating=8, operator_name='Bench'), False),
+    ('POST /planting/add', lambda i: '/planting/add', lambda i: _form(
+        field_id='F00004', crop_type='Barley', planting_date='2025-04-10', planting_season='Spring',
+        expected_harvest_date='2025-08-20', planted_area_ha=10, seed_cost=900), False),
+    ('POST /harvest/add/<id>', lambda i: '/harvest/add/1', lambda i: _form(
+        harvest_date='2025-08-30', total_yield_tonnes=40, market_price_per_tonne=210,
+        harvest_labor_cost=120), False),
+    ('POST /maintenance/add/<id>', lambda i: '/maintenance/add/1', lambda i: _form(
+        maintenance_date='2025-05-20', maintenance_type='Weeding', hours_worked=3,
+        labor_cost=75, area_covered_ha=8), False),
+    ('POST /storage/update-quantity', lambda i: '/storage/update-quantity',
+     lambda i: {'crop_name': 'Wheat', 'quantity': 100 + i}, True),
+    ('POST /storage/update-field', lambda i: '/storage/update-field',
+     lambda i: {'crop_name': 'Wheat', 'field_name': 'current_market_price', 'value': 200 + i}, True),
+    ('POST /storage/batch-update', lambda i: '/storage/batch-update',
+     lambda i: {'changes': [{'crop_name': crop[0], 'field_name': 'current_market_price', 'value': 300 + i}
+                            for crop in FS25_CROPS]}, True),
+)
+
+
+def _flashed_errors(client):
+    with client.session_transaction() as session:
+        return [message for category, message in session.pop('_flashes', []) if category == 'error']
+
+
+@pytest.mark.parametrize('name,path', READ_ROUTES, ids=[r[0] for r in READ_ROUTES])
+def test_read_route(name, path, client, query_counter, bench):
+    result = measure(lambda i: client.get(path), query_counter, bench.runs)
+    assert result['status'] < 500, f'{name} returned {result["status"]}'
+
+    regressions = bench.check(name, result)
+    assert not regressions, f'{name}: ' + '; '.join(regressions)
+
+
+@pytest.mark.parametrize('name,path,payload,is_json', WRITE_ROUTES, ids=[r[0] for r in WRITE_ROUTES])
+def test_write_route(name, path, payload, is_json, client, query_counter, bench):
+    def send(i):
+        if is_json:
+            return client.post(path(i), json=payload(i))
+        return client.post(path(i), data=payload(i))
+
+    # One checked request first, so a broken form is reported as such rather than timed.
+    # Form routes redirect on success and re-render the form on failure.
+    response = send(-1)
+    if is_json:
+        assert response.get_json().get('success'), response.get_json()
+    else:
+        assert response.status_code == 302, f'{name} returned {response.status_code}'
+        assert not _flashed_errors(client)
+
+    result = measure(send, query_counter, bench.runs)
+    regressions = bench.check(name, result)
+    assert not regressions, f'{name}: ' + '; '.join(regressions)
@@ -0,0 +1,39 @@
+"""
+Every kind of /search result links to a page that renders.
+"""
+
+import sqlite3
+
+import pytest
+
+from database.search import SOURCES
+
+
+@pytest.fixture(scope='module')
+def sample_terms(bench_db):
+    """{kind: a word from one indexed record of that kind}"""
+    conn = sqlite3.connect(bench_db)
+    try:
+        terms = {}
+        for kind, *_ in SOURCES:
+            row = conn.execute('SELECT body FROM search_index WHERE kind = ? LIMIT 1', (kind,)).fetchone()
+            words = [word for word in (row[0].split() if row else []) if word.isalpha() and len(word) > 3]
+            if words:
+                terms[kind] = words[0]
+        return terms
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('kind', [source[0] for source in SOURCES])
+def test_search_result_links(kind, sample_terms, client):
+    if kind not in sample_terms:
+        pytest.skip(f'no indexed {kind} records in the generated farm')
+
+    response = client.get('/search/api', query_string={'q': sample_terms[kind], 'kind': kind})
+    results = response.get_json()['results']
+    assert results, f'no {kind} results for {sample_terms[kind]!r}'
+
+    for result in results[:5]:
+        page = client.get(result['url'])
+        assert page.status_code == 200, f"{kind} result {result['record_id']}: {result['url']} returned {page.status_code}"
@@ -0,0 +1,132 @@
+# Conditional requests
+"""
+ETag / Last-Modified validators for GET routes, derived from table versions.
+
+    @app.route('/storage')
+    @conditional('crop_storage')
+    def storage_dashboard(): ...
+
+The ETag hashes the route, its arguments and the table_versions counters of
+the tables the page is built from; Last-Modified is the latest changed_at
+of those tables. Both come from the VersionWatcher, so a client that
+revalidates an unchanged page gets 304 Not Modified after one PRAGMA
+data_version, without the view's queries or template.
+
+changed_at, like the Last-Modified header, is only accurate to the second,
+so a write later in the same second would leave it unchanged. The ETag
+counts every write and decides whenever the client sends If-None-Match;
+If-Modified-Since is used only without it (RFC 9110 §13.2.2). Last-Modified
+is withheld while its second has not passed yet, so a client never holds
+one that a later write could share.
+
+Responses carry Cache-Control: no-cache, so browsers keep the page but ask
+before every reuse instead of guessing a freshness lifetime from
+Last-Modified. Pages with pending flash messages are neither tagged nor
+answered with 304, and only plain 200 responses are tagged.
+"""
+
+import functools
+import hashlib
+import os
+
+from datetime import datetime, timezone
+
+from flask import current_app, make_response, request, session
+
+from database import table_versions
+
+TAGGED_METHODS = ('GET', 'HEAD')
+
+
+def _build_token(app):
+    """Changes when templates or app code do, so a deploy invalidates every ETag"""
+    digest = hashlib.sha1()
+    roots = [os.path.join(app.root_path, app.template_folder or 'templates')]
+    files = [os.path.join(app.root_path, 'app.py')]
+    for root in roots:
+        for directory, _, names in os.walk(root):
+            files.extend(os.path.join(directory, name) for name in names)
+    for path in sorted(files):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        digest.update(f'{path}:{stat.st_mtime_ns}:{stat.st_size};'.encode())
+    return digest.hexdigest()[:12]
+
+
+def _validators(tables, view_args):
+    """(etag, last_modified) for this request, or None when the versions are unavailable"""
+    state = current_app.extensions.get('conditional_requests')
+    if state is None:
+        return None
+    watcher = state['watcher']
+    versions = watcher.current()
+    if versions is None:
+        return None
+
+    stamp = tuple(versions.get(table) for table in tables)
+    key = repr((state['build'], request.endpoint, sorted(view_args.items()),
+                sorted(request.args.items(multi=True)), stamp))
+    etag = hashlib.sha1(key.encode()).hexdigest()[:20]
+    return etag, watcher.last_changed(tables)
+
+
+def _settled(last_modified):
+    """last_modified once its second is over, else None (another write may still land in it)"""
+    if last_modified is None:
+        return None
+    if last_modified >= datetime.now(timezone.utc).replace(microsecond=0):
+        return None
+    return last_modified
+
+
+def _not_modified(etag, last_modified):
+    """Whether the client's copy is current; If-None-Match overrides If-Modified-Since"""
+    if 'If-None-Match' in request.headers:
+        return request.if_none_match.contains_weak(etag)
+    if_modified_since = request.if_modified_since
+    return last_modified is not None and if_modified_since is not None and last_modified <= if_modified_since
+
+
+def conditional(*tables):
+    """Answer GETs with 304 while none of `tables` changed since the client's copy"""
+    def decorate(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            validators = None
+            if request.method in TAGGED_METHODS and not session.get('_flashes'):
+                validators = _validators(tables, kwargs)
+            if validators is None:
+                return view(*args, **kwargs)
+
+            etag, last_modified = validators
+            last_modified = _settled(last_modified)
+            if _not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or session.modified:
+                    return response
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorate
+
+
+def init_conditional_requests(app):
+    """Enable ETag / Last-Modified handling for @conditional views; returns whether enabled"""
+    enabled = app.config.get('CONDITIONAL_REQUESTS')
+    if enabled is None:
+        enabled = os.environ.get('FS25_CONDITIONAL_REQUESTS', '1').lower() not in ('0', 'false', 'off', 'no')
+    if not enabled:
+        return False
+
+    app.extensions['conditional_requests'] = {
+        'watcher': table_versions.watcher(app.config['DATABASE_PATH']),
+        'build': _build_token(app),
+    }
+    return True
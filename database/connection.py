@@ -1 +1,210 @@
 # Database connection
+"""
+Pooled SQLite connections for the Flask app.
+
+A connection is checked out once per app context (i.e. per request), used by
+exactly one thread at a time and handed back to the pool on teardown, so the
+connect / PRAGMA setup cost is paid once per pooled connection rather than on
+every request.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app, g
+
+# Applied once, when a pooled connection is first opened
+DEFAULT_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -16000),      # negative = KiB, so ~16 MB page cache
+    ('mmap_size', 268435456),    # 256 MB memory-mapped I/O
+    ('foreign_keys', 'ON'),
+    ('temp_store', 'MEMORY'),
+)
+
+
+class DatabaseNotFoundError(Exception):
+    """Raised when the SQLite file has not been created yet"""
+
+
+class TransactionOpenError(Exception):
+    """Raised when an atomic write is started on a connection with uncommitted changes"""
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to its pool"""
+
+    def close(self):
+        pool = getattr(self, '_pool', None)
+        if pool is None:
+            super().close()
+        else:
+            pool.release(self)
+
+    def _close_for_real(self):
+        self._pool = None
+        super().close()
+
+
+class ConnectionPool:
+    """LIFO pool of SQLite connections with health checks and usage stats"""
+
+    def __init__(self, database_path, max_idle=8, health_check_interval=30.0,
+                 pragmas=DEFAULT_PRAGMAS, factory=PooledConnection):
+        self.database_path = database_path
+        self.max_idle = max_idle
+        self.health_check_interval = health_check_interval
+        self.pragmas = pragmas
+        self.factory = factory
+
+        self._idle = []
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._stats = {
+            'created': 0,
+            'reused': 0,
+            'released': 0,
+            'discarded': 0,
+            'health_checks': 0,
+            'health_failures': 0,
+            'peak_in_use': 0,
+        }
+
+    def _connect(self):
+        if not os.path.exists(self.database_path):
+            raise DatabaseNotFoundError(self.database_path)
+
+        conn = sqlite3.connect(self.database_path, factory=self.factory,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas:
+            conn.execute(f'PRAGMA {name} = {value}')
+        conn._pool = self
+        conn._lease = None
+        conn._last_checked = time.monotonic()
+        return conn
+
+    def _is_healthy(self, conn):
+        """Ping connections that have been idle longer than the check interval"""
+        now = time.monotonic()
+        if now - conn._last_checked < self.health_check_interval:
+            return True
+
+        self._stats['health_checks'] += 1
+        try:
+            conn.execute('SELECT 1').fetchone()
+        except sqlite3.Error:
+            self._stats['health_failures'] += 1
+            return False
+        conn._last_checked = now
+        return True
+
+    def acquire(self):
+        """Check out a connection for the calling thread"""
+        conn = None
+        with self._lock:
+            while self._idle:
+                candidate = self._idle.pop()
+                if self._is_healthy(candidate):
+                    conn = candidate
+                    self._stats['reused'] += 1
+                    break
+                self._stats['discarded'] += 1
+                candidate._close_for_real()
+
+        if conn is None:
+            conn = self._connect()
+            with self._lock:
+                self._stats['created'] += 1
+
+        with self._lock:
+            self._in_use += 1
+            self._stats['peak_in_use'] = max(self._stats['peak_in_use'], self._in_use)
+
+        conn._lease = object()
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, rolling back anything left open"""
+        if conn._lease is None:
+            return  # already released (e.g. route closed it before teardown)
+        conn._lease = None
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            healthy = True
+        except sqlite3.Error:
+            healthy = False
+
+        with self._lock:
+            self._in_use -= 1
+            self._stats['released'] += 1
+            if healthy and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+            self._stats['discarded'] += 1
+        conn._close_for_real()
+
+    def close_all(self):
+        """Close every idle connection (checked-out ones close on release)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn._close_for_real()
+
+    def stats(self):
+        """Snapshot of pool usage, for sizing max_idle"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._in_use
+        stats['max_idle'] = self.max_idle
+        stats['database_path'] = self.database_path
+        return stats
+
+
+def begin_immediate(conn):
+    """Start a write transaction, refusing to fold in changes the caller has not committed"""
+    if conn.in_transaction:
+        raise TransactionOpenError('A transaction is already open on this connection; '
+                                   'commit or roll it back first')
+    conn.execute('BEGIN IMMEDIATE')
+
+
+def init_db_pool(app):
+    """Create the app's connection pool and release connections on teardown"""
+    pool = ConnectionPool(
+        app.config['DATABASE_PATH'],
+        max_idle=app.config.get('DB_POOL_MAX_IDLE', 8),
+        health_check_interval=app.config.get('DB_POOL_HEALTH_CHECK_INTERVAL', 30.0),
+    )
+    app.extensions['db_pool'] = pool
+    app.teardown_appcontext(release_db)
+    return pool
+
+
+def get_pool(app=None):
+    return (app or current_app).extensions['db_pool']
+
+
+def get_db():
+    """Connection bound to the current app context, checked out on first use"""
+    conn = g.get('_db_conn')
+    if conn is not None and conn._lease is g._db_lease:
+        return conn
+
+    conn = get_pool().acquire()
+    g._db_conn = conn
+    g._db_lease = conn._lease
+    return conn
+
+
+def release_db(exception=None):
+    conn = g.pop('_db_conn', None)
+    lease = g.pop('_db_lease', None)
+    if conn is not None and conn._lease is lease:
+        conn._pool.release(conn)
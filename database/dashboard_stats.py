@@ -0,0 +1,268 @@
+# Home dashboard statistics
+"""
+Materialized statistics for the home dashboard.
+
+One dashboard_stats row per calendar year holds everything index() shows, so
+the page is a single primary-key read. Write routes keep the row current
+through the on_* hooks below; rebuild() recomputes it from the base tables
+if the counters ever drift. Rows are only written on those paths and by
+ensure_year() at startup: a page read that finds no row computes the
+stats without storing them, so a GET never takes the write lock.
+"""
+
+import json
+import sqlite3
+from datetime import date, timedelta
+
+RECENT_OPERATIONS_KEPT = 10
+TOP_FIELDS_KEPT = 5
+
+STAT_COLUMNS = ('stat_year', 'total_fields', 'total_area', 'active_seasons', 'total_yield',
+                'weather_events', 'recent_operations', 'top_fields')
+
+CREATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS dashboard_stats (
+        stat_year INTEGER PRIMARY KEY,
+        total_fields INTEGER NOT NULL DEFAULT 0,
+        total_area REAL NOT NULL DEFAULT 0,
+        active_seasons INTEGER NOT NULL DEFAULT 0,
+        total_yield REAL NOT NULL DEFAULT 0,
+        weather_events INTEGER NOT NULL DEFAULT 0,
+        recent_operations TEXT NOT NULL DEFAULT '[]',
+        top_fields TEXT NOT NULL DEFAULT '[]',
+        updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+def ensure_table(conn):
+    conn.execute(CREATE_TABLE_SQL)
+
+
+def _query_recent_operations(conn):
+    rows = conn.execute('''
+        SELECT fo.operation_date, fo.field_id, f.field_name, fo.operation_type, fo.hours_worked
+        FROM field_operations fo
+        JOIN fields f ON fo.field_id = f.field_id
+        ORDER BY fo.operation_date DESC, fo.created_date DESC
+        LIMIT ?
+    ''', (RECENT_OPERATIONS_KEPT,)).fetchall()
+    return json.dumps([dict(row) for row in rows])
+
+
+def _query_top_fields(conn):
+    rows = conn.execute('''
+        SELECT f.field_id, f.field_name, ROUND(AVG(cs.yield_tonnes_per_ha), 2) as avg_yield,
+               COUNT(cs.season_id) as seasons
+        FROM fields f
+        JOIN crop_seasons cs ON f.field_id = cs.field_id
+        WHERE cs.yield_tonnes_per_ha IS NOT NULL
+        GROUP BY f.field_id, f.field_name
+        HAVING seasons >= 1
+        ORDER BY avg_yield DESC, f.field_id
+        LIMIT ?
+    ''', (TOP_FIELDS_KEPT,)).fetchall()
+    return json.dumps([dict(row) for row in rows])
+
+
+def _top_field_rank(entry):
+    # The ORDER BY of _query_top_fields()
+    return -entry['avg_yield'], entry['field_id']
+
+
+def _merge_top_field(top_fields, field):
+    """top_fields with one field's new average merged in, or None if only a full query can tell.
+
+    Every field outside a full list ranks below its last entry, so the list
+    stays exact unless the changed field was in it and now ranks below that.
+    """
+    if any('field_id' not in entry for entry in top_fields):
+        return None  # stored before entries carried their field_id
+    others = [entry for entry in top_fields if entry['field_id'] != field['field_id']]
+    was_listed = len(others) < len(top_fields)
+    full = len(top_fields) >= TOP_FIELDS_KEPT
+
+    if field['seasons']:
+        if was_listed and full and _top_field_rank(field) > _top_field_rank(top_fields[-1]):
+            return None
+        others.append(field)
+    elif was_listed and full:
+        return None
+    return sorted(others, key=_top_field_rank)[:TOP_FIELDS_KEPT]
+
+
+def _compute_row(conn, year):
+    """Run the full aggregate queries for one year"""
+    fields = conn.execute(
+        'SELECT COUNT(*) as count, COALESCE(SUM(size_hectares), 0) as total_area FROM fields'
+    ).fetchone()
+
+    active_seasons = conn.execute(
+        'SELECT COUNT(*) as count FROM crop_seasons WHERE crop_year = ?', (year,)
+    ).fetchone()['count']
+
+    total_yield = conn.execute('''
+        SELECT COALESCE(SUM(cs.yield_tonnes_per_ha * f.size_hectares), 0) as total_yield
+        FROM crop_seasons cs
+        JOIN fields f ON cs.field_id = f.field_id
+        WHERE cs.crop_year = ? AND cs.yield_tonnes_per_ha IS NOT NULL
+    ''', (year,)).fetchone()['total_yield']
+
+    weather_events = conn.execute('''
+        SELECT COUNT(*) as count FROM weather_events
+        WHERE event_date >= ? AND event_date < ?
+    ''', (f'{year}-01-01', f'{year + 1}-01-01')).fetchone()['count']
+
+    return (year, fields['count'], fields['total_area'], active_seasons, total_yield,
+            weather_events, _query_recent_operations(conn), _query_top_fields(conn))
+
+
+def rebuild(conn, years=None):
+    """Recompute stats rows from the base tables (default: every cached year plus this one)"""
+    ensure_table(conn)
+    if years is None:
+        years = {row['stat_year'] for row in conn.execute('SELECT stat_year FROM dashboard_stats')}
+        years.add(date.today().year)
+
+    conn.execute('DELETE FROM dashboard_stats')
+    conn.executemany('''
+        INSERT INTO dashboard_stats (stat_year, total_fields, total_area, active_seasons,
+                                     total_yield, weather_events, recent_operations, top_fields)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [_compute_row(conn, year) for year in sorted(years)])
+    return sorted(years)
+
+
+def ensure_year(conn, year):
+    """Build the stats row for a year that has none, without committing; returns True if built"""
+    ensure_table(conn)
+    if conn.execute('SELECT 1 FROM dashboard_stats WHERE stat_year = ?', (year,)).fetchone():
+        return False
+    conn.execute('''
+        INSERT OR IGNORE INTO dashboard_stats (stat_year, total_fields, total_area, active_seasons,
+                                               total_yield, weather_events, recent_operations, top_fields)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', _compute_row(conn, year))
+    return True
+
+
+def get_stats(conn, year):
+    """Return (stats, recent_operations, top_fields) for the home dashboard"""
+    try:
+        row = conn.execute('SELECT * FROM dashboard_stats WHERE stat_year = ?', (year,)).fetchone()
+    except sqlite3.OperationalError:
+        row = None  # table not created yet
+
+    if row is None:
+        # Not stored yet (new year, or before ensure_year ran): compute, don't write
+        row = dict(zip(STAT_COLUMNS, _compute_row(conn, year)))
+
+    stats = {
+        'total_fields': row['total_fields'],
+        'total_area': round(row['total_area'] or 0, 1),
+        'active_seasons': row['active_seasons'],
+        'total_yield': round(row['total_yield'] or 0, 1),
+        'weather_events': row['weather_events'],
+    }
+
+    # Operations are stored newest first, so the last-7-days window is a prefix
+    since = (date.today() - timedelta(days=7)).isoformat()
+    recent_operations = [op for op in json.loads(row['recent_operations'])
+                         if str(op['operation_date']) >= since]
+
+    return stats, recent_operations, json.loads(row['top_fields'])
+
+
+# =====================================================
+# INCREMENTAL MAINTENANCE HOOKS
+# Called by write routes inside their own transaction. A missing table or
+# row is ignored: get_stats() computes from the base tables until one exists.
+# =====================================================
+
+def _apply(conn, sql, params=()):
+    try:
+        conn.execute(sql, params)
+    except sqlite3.OperationalError as e:
+        if 'no such table' not in str(e):
+            raise
+
+
+def on_field_added(conn, size_hectares):
+    _apply(conn, '''
+        UPDATE dashboard_stats
+        SET total_fields = total_fields + 1, total_area = total_area + ?, updated_date = CURRENT_TIMESTAMP
+    ''', (size_hectares or 0,))
+
+
+def on_season_added(conn, crop_year):
+    _apply(conn, '''
+        UPDATE dashboard_stats
+        SET active_seasons = active_seasons + 1, updated_date = CURRENT_TIMESTAMP
+        WHERE stat_year = ?
+    ''', (crop_year,))
+
+
+def on_harvest_recorded(conn, season, new_yield):
+    """Adjust the year's total yield by the change in t/ha times field size"""
+    size = conn.execute('SELECT size_hectares FROM fields WHERE field_id = ?',
+                        (season['field_id'],)).fetchone()
+    delta = (new_yield - (season['yield_tonnes_per_ha'] or 0)) * (size['size_hectares'] if size else 0)
+
+    _apply(conn, '''
+        UPDATE dashboard_stats
+        SET total_yield = total_yield + ?, updated_date = CURRENT_TIMESTAMP
+        WHERE stat_year = ?
+    ''', (delta, season['crop_year']))
+    _update_top_fields(conn, season['field_id'])
+
+
+def _update_top_fields(conn, field_id):
+    """Merge one field's new average yield into the stored top fields (every row holds the same list)"""
+    try:
+        # The stored list and the field's seasons (idx_seasons_field_year) in one statement
+        row = conn.execute('''
+            SELECT (SELECT top_fields FROM dashboard_stats LIMIT 1) as stored,
+                   f.field_id, f.field_name, ROUND(AVG(cs.yield_tonnes_per_ha), 2) as avg_yield,
+                   COUNT(cs.season_id) as seasons
+            FROM fields f
+            LEFT JOIN crop_seasons cs ON cs.field_id = f.field_id AND cs.yield_tonnes_per_ha IS NOT NULL
+            WHERE f.field_id = ?
+            GROUP BY f.field_id, f.field_name
+        ''', (field_id,)).fetchone()
+    except sqlite3.OperationalError as e:
+        if 'no such table' not in str(e):
+            raise
+        return
+    if row is None or row['stored'] is None:
+        return  # no such field (so not ranked), or no stats rows yet
+
+    field = {key: row[key] for key in ('field_id', 'field_name', 'avg_yield', 'seasons')}
+    top_fields = _merge_top_field(json.loads(row['stored']), field)
+    conn.execute('UPDATE dashboard_stats SET top_fields = ?',
+                 (_query_top_fields(conn) if top_fields is None else json.dumps(top_fields),))
+
+
+def on_weather_event_added(conn, event_date):
+    try:
+        year = date.fromisoformat(str(event_date)[:10]).year
+    except ValueError:
+        return  # not a date, so no year's count includes it (see _compute_row)
+    _apply(conn, '''
+        UPDATE dashboard_stats
+        SET weather_events = weather_events + 1, updated_date = CURRENT_TIMESTAMP
+        WHERE stat_year = ?
+    ''', (year,))
+
+
+def on_operations_changed(conn):
+    _apply(conn, 'UPDATE dashboard_stats SET recent_operations = ?, updated_date = CURRENT_TIMESTAMP',
+           (_query_recent_operations(conn),))
+
+
+def on_bulk_change(conn):
+    """Deletes touch too many counters to adjust by hand; recompute instead"""
+    try:
+        rebuild(conn)
+    except sqlite3.OperationalError as e:
+        if 'no such table' not in str(e):
+            raise
@@ -0,0 +1,218 @@
+# Bulk export
+"""
+Streaming CSV, Parquet and Arrow export of operations, harvests, maintenance
+and price history.
+
+    GET /export/operations?format=csv&field_id=F00003&start=2025-01-01&end=2025-12-31
+    GET /export/prices?format=parquet&crop_name=Wheat
+
+export() returns a generator of encoded chunks for a Flask streaming
+response. Rows are read from one cursor with fetchmany() and encoded a
+batch at a time, so only one batch of rows is ever held in Python however
+large the table. Parquet (one row group per batch) and the Arrow IPC stream
+format need pyarrow, which is optional (the commented-out pin in
+requirements.txt): without it those formats raise ExportError and CSV
+still works.
+
+Rows come out in primary key order, i.e. the order the table is stored in.
+Date bounds are applied with a unary + so they never drive an index: a
+date range can cover most of a table, and walking a date index would mean
+sorting every matching row before the first one is sent. Equality filters
+(field, planting, crop) may use their indexes; a sort then covers only
+the rows of that one field or crop.
+"""
+
+import csv
+import io
+
+from database.pagination import date_range
+
+CSV_BATCH_ROWS = 1000
+ARROW_BATCH_ROWS = 10_000
+
+# name -> (table, date column, equality filters)
+EXPORTS = {
+    'operations': ('field_operations', 'operation_date', ('field_id', 'season_id', 'operation_type')),
+    'harvests': ('harvest_records', 'harvest_date', ('field_id', 'planting_id')),
+    'maintenance': ('field_maintenance', 'maintenance_date', ('field_id', 'planting_id', 'maintenance_type')),
+    'prices': ('price_history', 'price_date', ('crop_name', 'sale_location')),
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+
+class ExportError(ValueError):
+    """An export that cannot be produced (unknown table, filter or format)"""
+
+
+def _columns(conn, table):
+    """[(name, declared type)] in table order, and the rowid primary key"""
+    info = conn.execute(f'PRAGMA table_info({table})').fetchall()
+    key = next(row[1] for row in info if row[5] and (row[2] or '').upper() == 'INTEGER')
+    return [(row[1], (row[2] or '').upper()) for row in info], key
+
+
+def build_query(conn, name, filters=None, start=None, end=None):
+    """(sql, params, columns) of one export; filters maps column -> value"""
+    if name not in EXPORTS:
+        raise ExportError(f"Unknown export: {name} (expected one of {', '.join(EXPORTS)})")
+    table, date_column, filterable = EXPORTS[name]
+    columns, key = _columns(conn, table)
+
+    where, params = [], []
+    for column, value in (filters or {}).items():
+        if column not in filterable:
+            raise ExportError(f"Cannot filter {name} by {column} (expected one of {', '.join(filterable)})")
+        where.append(f'{column} = ?')
+        params.append(value)
+    try:
+        date_where, date_params = date_range(f'+{date_column}', start, end)
+    except ValueError as e:
+        raise ExportError(str(e)) from None
+    where.extend(date_where)
+    params.extend(date_params)
+
+    sql = f"SELECT {', '.join(column for column, _ in columns)} FROM {table}"
+    if where:
+        sql += f" WHERE {' AND '.join(where)}"
+    sql += f' ORDER BY {key}'
+    return sql, params, columns
+
+
+def _batches(cursor, size):
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+
+# =====================================================
+# ENCODERS
+# =====================================================
+
+def _csv_chunks(cursor, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column for column, _ in columns])
+    for rows in _batches(cursor, CSV_BATCH_ROWS):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that collects what pyarrow writes until drained"""
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def _arrow_type(pa, declared_type):
+    if 'INT' in declared_type:
+        return pa.int64()
+    if any(name in declared_type for name in ('REAL', 'FLOA', 'DOUB')):
+        return pa.float64()
+    return pa.string()
+
+
+def _arrow_column(pa, values, arrow_type):
+    try:
+        return pa.array(values, type=arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # SQLite lets stray text into numeric columns; export it as null
+        # rather than failing the whole download
+        clean = [value if isinstance(value, (int, float)) else None for value in values]
+        return pa.array(clean, type=arrow_type)
+
+
+def _pyarrow(fmt):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError(f'{fmt} export needs pyarrow (pip install pyarrow==14.0.2)') from None
+    return pa, pq
+
+
+def _arrow_chunks(cursor, columns, fmt, pa, pq):
+    schema = pa.schema([(column, _arrow_type(pa, declared)) for column, declared in columns])
+    sink = _ChunkSink()
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    def chunks():
+        try:
+            for rows in _batches(cursor, ARROW_BATCH_ROWS):
+                arrays = [_arrow_column(pa, list(values), field.type)
+                          for values, field in zip(zip(*rows), schema)]
+                writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                data = sink.drain()
+                if data:
+                    yield data
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    return chunks()
+
+
+def export(conn, name, fmt='csv', filters=None, start=None, end=None):
+    """Generator of encoded chunks of one export.
+
+    Raises ExportError before anything is read if the table, a filter or
+    the format is not supported.
+    """
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format: {fmt} (expected one of {', '.join(FORMATS)})")
+    sql, params, columns = build_query(conn, name, filters, start, end)
+    modules = _pyarrow(fmt) if fmt != 'csv' else None
+    cursor = conn.cursor()
+    cursor.row_factory = None  # plain tuples; sqlite3.Row would add nothing here
+    cursor.execute(sql, params)
+    if fmt == 'csv':
+        return _closing(cursor, _csv_chunks(cursor, columns))
+    return _closing(cursor, _arrow_chunks(cursor, columns, fmt, *modules))
+
+
+def _closing(cursor, chunks):
+    # Also when the client disconnects mid-download: an unfinished SELECT
+    # would keep its read snapshot open on a pooled connection
+    try:
+        yield from chunks
+    finally:
+        chunks.close()
+        cursor.close()
+
+
+def filename(name, fmt, start=None, end=None):
+    """Download name such as operations_2025-01-01_2025-12-31.csv"""
+    parts = [name] + [value for value in (start, end) if value]
+    return f"{'_'.join(parts)}.{fmt}"
@@ -0,0 +1,531 @@
+# Synthetic data generator
+"""
+Fill a fresh database with a large, referentially consistent synthetic farm
+for load and scale testing.
+
+    python -m database.generate_sample_data --db data/large_farm.db
+    python -m database.generate_sample_data --db /tmp/small.db --scale 0.01 --seed 7
+
+Output is deterministic for a given seed, scale and --end-year: every data
+row, created_date included, comes from the seeded RNG (only the migration and
+dashboard bookkeeping timestamps differ between runs). Rows are streamed
+into executemany() inside a single transaction, and the secondary indexes are
+built after loading. Throughput is bound by the Python RNG at roughly 70k
+rows/s: about 15 s for a 1M-row farm (--scale 0.3) and under a minute for the
+default ~3M rows. Never point --db at the database you play with.
+"""
+
+import argparse
+import functools
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from database import dashboard_stats, migrations
+from database import planting as planting_queries
+from database import history, prices, reports, search, table_versions
+from database.init_crop_storage import DEFAULT_SALE_LOCATIONS, FS25_CROPS
+
+# Row counts at --scale 1
+DEFAULT_COUNTS = {
+    'fields': 10_000,
+    'equipment': 400,
+    'operations': 1_000_000,
+    'weather_events': 50_000,
+    'plantings': 500_000,
+}
+DEFAULT_YEARS = 5
+MAINTENANCE_PER_PLANTING = 2  # average; each planting gets 0..4 records
+
+FIELD_CROP_CATEGORIES = ('Grains', 'Root Crops', 'Vegetables')
+FIELD_CROPS = [crop for crop in FS25_CROPS if crop[1] in FIELD_CROP_CATEGORIES] + \
+              [crop for crop in FS25_CROPS if crop[0] == 'Grass']
+# Typical yield (t/ha) per crop category
+BASE_YIELDS = {'Grains': 8.0, 'Root Crops': 45.0, 'Vegetables': 12.0, 'Forage': 30.0}
+VARIETIES = ('Standard', 'Early', 'Late', 'High Yield', 'Drought Tolerant', 'Organic')
+
+FIELD_WORDS = ('North', 'South', 'East', 'West', 'Upper', 'Lower', 'Old', 'New', 'Long', 'Back')
+FIELD_NOUNS = ('Valley', 'Meadow', 'Ridge', 'Hollow', 'Creek', 'Acre', 'Pasture', 'Bottom', 'Hill', 'Orchard')
+SOIL_TYPES = ('Clay Loam', 'Sandy Loam', 'Silt Loam', 'Loam', 'Clay', 'Sandy Clay', 'Peat')
+DRAINAGE_RATINGS = ('Poor', 'Fair', 'Good', 'Excellent')
+
+EQUIPMENT_MODELS = (
+    ('Tractor', 'Fendt', '942 Vario', 95.0), ('Tractor', 'John Deere', '8R 410', 100.0),
+    ('Tractor', 'Case IH', 'Magnum 380', 90.0), ('Combine', 'Claas', 'Lexion 8900', 120.0),
+    ('Combine', 'New Holland', 'CR11', 115.0), ('Sprayer', 'Amazone', 'Pantera 4504', 35.0),
+    ('Seeder', 'Horsch', 'Maestro 24 SW', 20.0), ('Plough', 'Lemken', 'Diamant 16', 0.0),
+    ('Cultivator', 'Kverneland', 'CLC Pro', 0.0), ('Baler', 'Krone', 'BiG Pack 1290', 10.0),
+)
+OPERATION_TYPES = ('Plowing', 'Cultivating', 'Planting', 'Fertilizing', 'Spraying', 'Weeding',
+                   'Irrigating', 'Harvesting', 'Mowing', 'Baling', 'Transport')
+MAINTENANCE_TYPES = ('Plowing', 'Cultivating', 'Weeding', 'Fertilizing', 'Liming', 'Spraying',
+                     'Irrigation', 'Rolling', 'Mulching', 'Mowing')
+WEATHER_TYPES = (('Hail', 'Severe'), ('Drought', 'Moderate'), ('Flood', 'Severe'),
+                 ('Frost', 'Light'), ('Storm', 'Moderate'), ('Heavy Rain', 'Light'))
+SOIL_CONDITIONS = ('Dry', 'Adequate', 'Wet', 'Saturated')
+WEATHER_CONDITIONS = ('Sunny', 'Cloudy', 'Overcast', 'Light Rain', 'Windy')
+OPERATORS = ('Alex', 'Sam', 'Jordan', 'Taylor', 'Casey', 'Riley', 'Morgan', 'Jamie')
+QUALITY_GRADES = ('A', 'A', 'B', 'B', 'B', 'C')
+SEASONS = ('Spring', 'Summer', 'Autumn')
+
+
+@functools.lru_cache(maxsize=None)
+def _ordinal_range(year, first_month, last_month):
+    return date(year, first_month, 1).toordinal(), date(year, last_month, 28).toordinal()
+
+
+class FarmGenerator:
+    """Builds every table from one seeded RNG; rows are yielded, never held in memory"""
+
+    def __init__(self, seed, scale=1.0, years=DEFAULT_YEARS, end_year=None):
+        self.rng = random.Random(seed)
+        self._random = self.rng.random
+        self.counts = {name: max(1, int(count * scale)) for name, count in DEFAULT_COUNTS.items()}
+        self.years = years
+        self.end_year = end_year or date.today().year
+        self.start_year = self.end_year - years + 1
+        self.start_date = date(self.start_year, 1, 1)
+        self.end_date = date(self.end_year, 12, 31)
+        self.field_sizes = []  # index = field number - 1
+
+    # -- helpers ---------------------------------------------------------
+    # random.randint/choice/uniform spend most of their time in argument
+    # checking; these run millions of times, so use random() directly.
+
+    def _int(self, low, high):
+        return low + int(self._random() * (high - low + 1))
+
+    def _pick(self, options):
+        return options[int(self._random() * len(options))]
+
+    def _uniform(self, low, high, digits=None):
+        value = low + (high - low) * self._random()
+        return value if digits is None else round(value, digits)
+
+    def _field_id(self, number):
+        return f'F{number:05d}'
+
+    def _random_field(self):
+        number = self._int(1, self.counts['fields'])
+        return number, self._field_id(number)
+
+    def _day_in_year(self, year, first_month=1, last_month=12):
+        first, last = _ordinal_range(year, first_month, last_month)
+        return date.fromordinal(self._int(first, last))
+
+    def _season_id(self, field_number, year):
+        return (field_number - 1) * self.years + (year - self.start_year) + 1
+
+    def _timestamp(self, day):
+        minute = self._int(6 * 60, 20 * 60 - 1)
+        return f'{day.isoformat()} {minute // 60:02d}:{minute % 60:02d}:00'
+
+    def _stamps(self, day):
+        """(created_date, updated_date) for tables that have both"""
+        stamp = self._timestamp(day)
+        return stamp, stamp
+
+    # -- tables ----------------------------------------------------------
+
+    def fields(self):
+        for number in range(1, self.counts['fields'] + 1):
+            size = round(self.rng.lognormvariate(2.6, 0.6), 2)
+            self.field_sizes.append(size)
+            price_per_ha = self._uniform(9000, 16000)
+            purchase = self._day_in_year(self.start_year - self._int(0, 10))
+            yield (
+                self._field_id(number),
+                f'{self._pick(FIELD_WORDS)} {self._pick(FIELD_NOUNS)} {number}',
+                size, self._pick(SOIL_TYPES), self._uniform(5.5, 7.8, 1),
+                self._uniform(1.5, 6.0, 1), self._pick(DRAINAGE_RATINGS),
+                self._uniform(0, 12, 1),
+                round(45.0 + self._uniform(-0.5, 0.5), 5), round(-93.0 + self._uniform(-0.5, 0.5), 5),
+                round(size * price_per_ha), purchase.isoformat(),
+                round(size * price_per_ha * self._uniform(0.95, 1.3)),
+                self._uniform(0, 3, 1), None, *self._stamps(purchase),
+            )
+
+    def equipment(self):
+        for number in range(1, self.counts['equipment'] + 1):
+            category, brand, model, fuel = self._pick(EQUIPMENT_MODELS)
+            price = self._uniform(40_000, 650_000, -2)
+            purchase = self._day_in_year(self._int(self.start_year - 8, self.end_year))
+            yield (
+                number, f'{brand} {model} #{number}', brand, model, category, price,
+                purchase.isoformat(), round(price * self._uniform(0.4, 0.95), -2),
+                fuel, self._uniform(5, 40, 2), self._uniform(0, 6000, 1),
+                None, self._timestamp(purchase),
+            )
+
+    def crop_seasons(self):
+        """One season per field per year; season_id is computable from (field, year)"""
+        for number in range(1, self.counts['fields'] + 1):
+            for year in range(self.start_year, self.end_year + 1):
+                crop_name, category = self._pick(FIELD_CROPS)[:2]
+                planting = self._day_in_year(year, 3, 5)
+                growth_days = self._int(90, 160)
+                harvest = planting + timedelta(days=growth_days)
+                finished = year < self.end_year
+                yield (
+                    self._season_id(number, year), self._field_id(number), year,
+                    f'{year} {crop_name}', crop_name, self._pick(VARIETIES),
+                    planting.isoformat(), harvest.isoformat() if finished else None,
+                    growth_days if finished else None,
+                    round(BASE_YIELDS[category] * self._uniform(0.6, 1.3), 2) if finished else None,
+                    self._uniform(70, 100, 1) if finished else None,
+                    None, None, self._uniform(0, 10, 1), None, self._timestamp(planting),
+                )
+
+    def field_operations(self):
+        for operation_id in range(1, self.counts['operations'] + 1):
+            number, field_id = self._random_field()
+            year = self._int(self.start_year, self.end_year)
+            day = self._day_in_year(year, 3, 11)
+            hours = self._uniform(0.5, 14, 1)
+            yield (
+                operation_id, field_id,
+                self._season_id(number, year) if self._random() < 0.9 else None,
+                day.isoformat(), self._pick(OPERATION_TYPES),
+                self._int(1, self.counts['equipment']), self._pick(OPERATORS),
+                hours, round(hours * self._uniform(15, 45), 1), self._uniform(4, 18, 1),
+                self._pick(WEATHER_CONDITIONS), self._uniform(10, 45, 1),
+                self._pick(('Low', 'Low', 'Medium', 'High')), self._int(4, 10),
+                None, self._timestamp(day),
+            )
+
+    def weather_events(self):
+        for event_id in range(1, self.counts['weather_events'] + 1):
+            number, field_id = self._random_field()
+            year = self._int(self.start_year, self.end_year)
+            day = self._day_in_year(year)
+            weather_type, severity = self._pick(WEATHER_TYPES)
+            damage = self._uniform(0, 40, 1)
+            claimed = damage > 25
+            yield (
+                event_id, field_id, self._season_id(number, year), day.isoformat(),
+                weather_type, severity, self._pick(('Seedling', 'Vegetative', 'Flowering', 'Mature')),
+                damage, round(damage * self._uniform(0.3, 0.9), 1), round(damage * 0.5, 1),
+                self._int(0, 30), int(claimed),
+                round(self.field_sizes[number - 1] * damage * 40, 2) if claimed else None,
+                None, None, self._timestamp(day),
+            )
+
+    def plantings(self):
+        """Yield (planting row, maintenance rows, harvest row or None) together so they stay consistent"""
+        maintenance_id = harvest_id = 0
+        for planting_id in range(1, self.counts['plantings'] + 1):
+            number, field_id = self._random_field()
+            crop_name, category, _, _, market_price, sale_location = self._pick(FIELD_CROPS)
+            year = self._int(self.start_year, self.end_year)
+            planted = self._day_in_year(year, 3, 6)
+            expected = planted + timedelta(days=self._int(90, 160))
+            area = round(self.field_sizes[number - 1] * self._uniform(0.5, 1.0), 2)
+
+            seed, fertilizer, lime = (round(area * self._uniform(a, b), 2)
+                                      for a, b in ((80, 220), (120, 300), (0, 60)))
+            labor, equipment_cost, fuel = (round(area * self._uniform(a, b), 2)
+                                           for a, b in ((20, 60), (40, 120), (15, 45)))
+            planting_cost = round(seed + fertilizer + lime + labor + equipment_cost + fuel, 2)
+
+            if expected > self.end_date:
+                status = 'Active'
+            else:
+                roll = self._random()
+                status = 'Harvested' if roll < 0.92 else 'Failed' if roll < 0.95 else 'Active'
+
+            planting = (
+                planting_id, field_id, crop_name, self._pick(VARIETIES), planted.isoformat(),
+                SEASONS[(planted.month - 3) // 3 % 3], expected.isoformat(), area,
+                seed, f'{self._int(120, 400)} kg/ha', fertilizer, lime, labor, equipment_cost,
+                fuel, 0, planting_cost, round(planting_cost / area, 2),
+                self._pick(('Drilled', 'Broadcast', 'Precision')), self._uniform(6, 18, 1),
+                self._pick(SOIL_CONDITIONS), self._pick(WEATHER_CONDITIONS),
+                self._pick(OPERATORS), None, status, *self._stamps(planted),
+            )
+
+            maintenance = []
+            maintenance_cost = 0
+            span = max(1, (expected - planted).days)
+            for _ in range(self._int(0, 2 * MAINTENANCE_PER_PLANTING)):
+                maintenance_id += 1
+                day = planted + timedelta(days=self._int(1, span))
+                hours = self._uniform(0.5, 8, 1)
+                costs = [round(hours * self._uniform(a, b), 2) for a, b in ((20, 35), (30, 90), (0, 400), (10, 40))]
+                total = round(sum(costs), 2)
+                maintenance_cost += total
+                maintenance.append((
+                    maintenance_id, field_id, planting_id, day.isoformat(), self._pick(MAINTENANCE_TYPES),
+                    None, None, self._pick(OPERATORS), hours, *costs, total, area,
+                    None, None, self._pick(WEATHER_CONDITIONS), self._pick(SOIL_CONDITIONS),
+                    None, self._timestamp(day),
+                ))
+
+            harvest = None
+            if status == 'Harvested':
+                harvest_id += 1
+                day = expected + timedelta(days=self._int(-7, 14))
+                per_ha = round(BASE_YIELDS[category] * self._uniform(0.6, 1.3), 2)
+                tonnes = round(per_ha * area, 2)
+                price = round(market_price * self._uniform(0.8, 1.25), 2)
+                harvest_costs = [round(area * self._uniform(a, b), 2)
+                                 for a, b in ((15, 40), (40, 110), (10, 35), (0, 30), (0, 25), (0, 20), (0, 10))]
+                harvest_cost = round(sum(harvest_costs), 2)
+                revenue = round(tonnes * price, 2)
+                costs = round(planting_cost + maintenance_cost + harvest_cost, 2)
+                profit = round(revenue - costs, 2)
+                harvest = (
+                    harvest_id, planting_id, field_id, day.isoformat(), SEASONS[min(2, (day.month - 3) // 3)],
+                    tonnes, per_ha, area, self._uniform(11, 20, 1), self._pick(QUALITY_GRADES),
+                    self._uniform(70, 82, 1), self._uniform(9, 15, 1),
+                    self._uniform(0, 5, 1), price, 0, None, sale_location,
+                    'Combine', None, self._pick(OPERATORS), self._pick(WEATHER_CONDITIONS),
+                    *harvest_costs, harvest_cost, revenue, costs, profit, round(profit / area, 2),
+                    round(profit / costs * 100, 2) if costs else None,
+                    round(costs / tonnes, 2) if tonnes else None, None, *self._stamps(day),
+                )
+            yield planting, maintenance, harvest
+
+    def crop_storage(self):
+        for crop_name, category, _, capacity, price, sale_location in FS25_CROPS:
+            yield (crop_name, category, round(capacity * self._uniform(0, 0.9), 1), capacity,
+                   round(price * self._uniform(0.85, 1.15), 2), sale_location,
+                   self.end_date.isoformat(), *self._stamps(self.start_date))
+
+    def sale_locations(self):
+        for location in DEFAULT_SALE_LOCATIONS:
+            yield (*location, self._timestamp(self.start_date))
+
+    def price_history(self):
+        """Daily random-walk price per crop across the whole date range"""
+        days = (self.end_date - self.start_date).days + 1
+        for crop_name, _, _, _, base_price, sale_location in FS25_CROPS:
+            price = base_price
+            for offset in range(days):
+                price = max(base_price * 0.4, min(base_price * 1.8, price * self.rng.gauss(1.0, 0.015)))
+                day = self.start_date + timedelta(days=offset)
+                yield crop_name, round(price, 2), sale_location, day.isoformat(), None, self._timestamp(day)
+
+
+# =====================================================
+# LOADING
+# =====================================================
+
+FIELD_INSERT = '''
+    INSERT INTO fields (field_id, field_name, size_hectares, soil_type, soil_ph, organic_matter_percent,
+                        drainage_rating, slope_percent, gps_latitude, gps_longitude, purchase_price,
+                        purchase_date, current_value, stone_percent, notes, created_date, updated_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+EQUIPMENT_INSERT = '''
+    INSERT INTO equipment (equipment_id, equipment_name, brand, model, category, purchase_price,
+                           purchase_date, current_value, fuel_consumption_per_hour,
+                           maintenance_cost_per_hour, total_hours, notes, created_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+SEASON_INSERT = '''
+    INSERT INTO crop_seasons (season_id, field_id, crop_year, season_name, crop_type, variety_name,
+                              planting_date, harvest_date, growth_days, yield_tonnes_per_ha,
+                              quality_percent, weather_impact, disease_pest_notes,
+                              rotation_benefit_percent, notes, created_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+OPERATION_INSERT = '''
+    INSERT INTO field_operations (operation_id, field_id, season_id, operation_date, operation_type,
+                                  equipment_id, operator_name, hours_worked, fuel_used_liters,
+                                  average_speed_kmh, weather_conditions, soil_moisture_percent,
+                                  compaction_risk, quality_rating, notes, created_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+WEATHER_INSERT = '''
+    INSERT INTO weather_events (event_id, field_id, season_id, event_date, weather_type, severity,
+                                crop_stage, damage_percent, yield_impact_percent, quality_impact_percent,
+                                recovery_time_days, insurance_claim, insurance_amount, mitigation_used,
+                                lessons_learned, created_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+PLANTING_INSERT = '''
+    INSERT INTO planting_records (planting_id, field_id, crop_type, variety, planting_date, planting_season,
+                                  expected_harvest_date, planted_area_ha, seed_cost, seed_rate,
+                                  fertilizer_cost, lime_cost, labor_cost, equipment_cost, fuel_cost,
+                                  other_costs, total_planting_cost, cost_per_hectare, planting_method,
+                                  soil_temp_c, soil_moisture, weather_conditions, operator_name, notes,
+                                  status, created_date, updated_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+MAINTENANCE_INSERT = '''
+    INSERT INTO field_maintenance (maintenance_id, field_id, planting_id, maintenance_date, maintenance_type,
+                                   operation_details, equipment_used, operator_name, hours_worked,
+                                   labor_cost, equipment_cost, material_cost, fuel_cost, total_cost,
+                                   area_covered_ha, product_used, application_rate, weather_conditions,
+                                   soil_conditions, notes, created_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+HARVEST_INSERT = '''
+    INSERT INTO harvest_records (harvest_id, planting_id, field_id, harvest_date, harvest_season,
+                                 total_yield_tonnes, yield_per_hectare, harvested_area_ha,
+                                 moisture_percent, quality_grade, test_weight, protein_percent, damage_percent,
+                                 market_price_per_tonne, price_premium, buyer_name, sale_location,
+                                 harvest_method, equipment_used, operator_name, weather_conditions,
+                                 harvest_labor_cost, harvest_equipment_cost, harvest_fuel_cost,
+                                 transport_cost, drying_cost, storage_cost, other_harvest_costs,
+                                 total_harvest_cost, gross_revenue, total_costs, net_profit,
+                                 profit_per_hectare, roi_percent, break_even_price, notes,
+                                 created_date, updated_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+STORAGE_INSERT = '''
+    INSERT INTO crop_storage (crop_name, crop_category, quantity_stored, storage_capacity,
+                              current_market_price, sale_location, last_price_update,
+                              created_date, updated_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+LOCATION_INSERT = '''
+    INSERT INTO sale_locations (location_name, location_type, distance_km, contact_info, created_date)
+    VALUES (?, ?, ?, ?, ?)
+'''
+PRICE_INSERT = '''
+    INSERT INTO price_history (crop_name, price, sale_location, price_date, notes, created_date)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+PLANTING_BATCH_SIZE = 10_000
+
+
+def _load_plantings(conn, generator):
+    """Split the combined planting stream into three executemany batches"""
+    counts = {'planting_records': 0, 'field_maintenance': 0, 'harvest_records': 0}
+    plantings, maintenance, harvests = [], [], []
+
+    def flush():
+        conn.executemany(PLANTING_INSERT, plantings)
+        conn.executemany(MAINTENANCE_INSERT, maintenance)
+        conn.executemany(HARVEST_INSERT, harvests)
+        counts['planting_records'] += len(plantings)
+        counts['field_maintenance'] += len(maintenance)
+        counts['harvest_records'] += len(harvests)
+        plantings.clear()
+        maintenance.clear()
+        harvests.clear()
+
+    for planting, planting_maintenance, harvest in generator.plantings():
+        plantings.append(planting)
+        maintenance.extend(planting_maintenance)
+        if harvest:
+            harvests.append(harvest)
+        if len(plantings) >= PLANTING_BATCH_SIZE:
+            flush()
+    flush()
+    return counts
+
+
+def generate(conn, generator):
+    """Load every table in one transaction; returns {table: rows inserted}"""
+    migrations.migrate(conn)
+
+    # Secondary indexes are cheaper to build once over sorted data than to
+    # maintain row by row, so drop them for the load and recreate afterwards.
+    index_sql = [row[0] for row in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+    )]
+    index_names = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+    )]
+
+    # The report / price / history rollup, search and table version triggers
+    # would fire once per row; one GROUP BY / version bump / bulk index after
+    # the load is far cheaper.
+    bulk_triggers = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+        "AND (name LIKE 'trg_report_%' OR name LIKE 'trg_price_%' OR name LIKE 'trg_version_%' "
+        "OR name LIKE 'trg_search_%' OR name LIKE 'trg_history_%')"
+    )]
+
+    conn.execute('BEGIN')
+    try:
+        for name in index_names:
+            conn.execute(f'DROP INDEX {name}')
+        for name in bulk_triggers:
+            conn.execute(f'DROP TRIGGER {name}')
+
+        counts = {}
+        for table, sql, rows in (
+            ('fields', FIELD_INSERT, generator.fields()),
+            ('equipment', EQUIPMENT_INSERT, generator.equipment()),
+            ('crop_seasons', SEASON_INSERT, generator.crop_seasons()),
+            ('field_operations', OPERATION_INSERT, generator.field_operations()),
+            ('weather_events', WEATHER_INSERT, generator.weather_events()),
+            ('crop_storage', STORAGE_INSERT, generator.crop_storage()),
+            ('sale_locations', LOCATION_INSERT, generator.sale_locations()),
+            ('price_history', PRICE_INSERT, generator.price_history()),
+        ):
+            counts[table] = conn.executemany(sql, rows).rowcount
+        counts.update(_load_plantings(conn, generator))
+
+        for sql in index_sql:
+            conn.execute(sql)
+
+        # The planting summary triggers kept up during the load; the dashboard
+        # rows are computed for every year that now has data, the report
+        # rollups from the loaded tables, and the dropped triggers recreated
+        # (with every table version bumped so caches see the new data).
+        planting_queries.rebuild_summary(conn)
+        reports.rebuild_rollups(conn)
+        prices.rebuild_rollups(conn)
+        search.rebuild_index(conn)
+        history.rebuild_totals(conn)
+        table_versions.install(conn)
+        table_versions.bump(conn)
+        dashboard_stats.rebuild(conn, years=range(generator.start_year, generator.end_year + 1))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    conn.execute('ANALYZE')
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a large synthetic FS25 farm database')
+    parser.add_argument('--db', required=True, help='output database file (must not exist unless --force)')
+    parser.add_argument('--seed', type=int, default=25)
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiplier on the default row counts (1.0 = 10k fields, 1M operations, 500k plantings)')
+    parser.add_argument('--years', type=int, default=DEFAULT_YEARS, help='years of history to generate')
+    parser.add_argument('--end-year', type=int, default=None, help='last year of history (default: this year)')
+    parser.add_argument('--force', action='store_true', help='overwrite an existing database file')
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        if not args.force:
+            parser.error(f'{args.db} already exists (use --force to overwrite)')
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+
+    generator = FarmGenerator(args.seed, scale=args.scale, years=args.years, end_year=args.end_year)
+    print(f"🌾 Generating {generator.start_year}-{generator.end_year} farm "
+          f"(seed {args.seed}, scale {args.scale}) into {args.db}...")
+
+    started = time.perf_counter()
+    conn = sqlite3.connect(args.db)
+    conn.row_factory = sqlite3.Row
+    # Throwaway file: no journal, no fsync until the end
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA cache_size = -262144')
+    counts = generate(conn, generator)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.close()
+    elapsed = time.perf_counter() - started
+
+    for table, count in counts.items():
+        print(f"✅ {table}: {count:,} rows")
+    print(f"\n🎉 {sum(counts.values()):,} rows in {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
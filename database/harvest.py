@@ -0,0 +1,211 @@
+# Harvest recording
+"""
+Records harvests atomically: the harvest row, the planting's status and the
+storage quantity of the crop change together in one BEGIN IMMEDIATE
+transaction, or not at all.
+
+The storage quantity is incremented in SQL (UPDATE ... RETURNING) rather
+than read, adjusted in Python and written back, so concurrent harvests of
+the same crop cannot lose each other's tonnes, and the write lock taken up
+front means the planting and maintenance costs a harvest's financials are
+computed from cannot change underneath it.
+
+record_harvests() takes any number of harvests, so an end-of-season import
+costs one transaction: one planting lookup per chunk of ids, one INSERT per
+harvest, one status UPDATE per planting and one storage UPDATE per crop.
+"""
+
+import sqlite3
+from datetime import date, datetime
+
+from database.connection import begin_immediate
+
+# Largest IN (...) list per planting lookup
+LOOKUP_CHUNK = 500
+MAX_BATCH_HARVESTS = 10_000
+
+COST_FIELDS = ('harvest_labor_cost', 'harvest_equipment_cost', 'harvest_fuel_cost',
+               'transport_cost', 'drying_cost', 'storage_cost', 'other_harvest_costs')
+
+# Optional numeric inputs; absent ones are stored as NULL
+MEASUREMENT_FIELDS = ('moisture_percent', 'test_weight', 'protein_percent')
+
+# Numeric inputs that default to 0
+ZERO_DEFAULT_FIELDS = ('damage_percent', 'market_price_per_tonne', 'price_premium') + COST_FIELDS
+
+TEXT_FIELDS = ('harvest_season', 'quality_grade', 'buyer_name', 'sale_location', 'harvest_method',
+               'equipment_used', 'operator_name', 'weather_conditions', 'notes')
+
+HARVEST_COLUMNS = (
+    'planting_id', 'field_id', 'harvest_date', 'harvest_season',
+    'total_yield_tonnes', 'yield_per_hectare', 'harvested_area_ha',
+    'moisture_percent', 'quality_grade', 'test_weight', 'protein_percent', 'damage_percent',
+    'market_price_per_tonne', 'price_premium', 'buyer_name', 'sale_location',
+    'harvest_method', 'equipment_used', 'operator_name', 'weather_conditions',
+    *COST_FIELDS, 'total_harvest_cost',
+    'gross_revenue', 'total_costs', 'net_profit', 'profit_per_hectare', 'roi_percent', 'break_even_price',
+    'notes',
+)
+
+INSERT_SQL = f'''
+    INSERT INTO harvest_records ({', '.join(HARVEST_COLUMNS)})
+    VALUES ({', '.join('?' * len(HARVEST_COLUMNS))})
+    RETURNING harvest_id
+'''
+
+
+class HarvestError(ValueError):
+    """A harvest that cannot be recorded (bad input or unknown planting)"""
+
+
+def _number(value, name, default=None):
+    if value is None or value == '':
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise HarvestError(f'{name} must be a number') from None
+
+
+def normalize(values, planting_id=None):
+    """A harvest dict from form fields or a parsed JSON object, with numbers converted.
+
+    harvested_area_ha may be left out; record_harvests() then uses the
+    planting's planted area.
+    """
+    planting_id = planting_id if planting_id is not None else values.get('planting_id')
+    try:
+        planting_id = int(planting_id)
+    except (TypeError, ValueError):
+        raise HarvestError('planting_id must be an integer') from None
+
+    harvest_date = values.get('harvest_date') or ''
+    try:
+        date.fromisoformat(str(harvest_date)[:10])
+    except ValueError:
+        raise HarvestError('harvest_date must be a YYYY-MM-DD date') from None
+
+    harvest = {
+        'planting_id': planting_id,
+        'harvest_date': harvest_date,
+        'total_yield_tonnes': _number(values.get('total_yield_tonnes'), 'total_yield_tonnes'),
+        'harvested_area_ha': _number(values.get('harvested_area_ha'), 'harvested_area_ha'),
+    }
+    if harvest['total_yield_tonnes'] is None:
+        raise HarvestError('total_yield_tonnes is required')
+    for name in MEASUREMENT_FIELDS:
+        harvest[name] = _number(values.get(name), name)
+    for name in ZERO_DEFAULT_FIELDS:
+        harvest[name] = _number(values.get(name), name, default=0.0)
+    for name in TEXT_FIELDS:
+        harvest[name] = values.get(name) or ''
+    return harvest
+
+
+def compute_financials(harvest, planting_cost, maintenance_cost):
+    """Yield, cost and profit figures of one harvest against its planting's costs"""
+    tonnes = harvest['total_yield_tonnes']
+    area = harvest['harvested_area_ha']
+    harvest_cost = sum(harvest[name] for name in COST_FIELDS)
+    gross_revenue = tonnes * (harvest['market_price_per_tonne'] + harvest['price_premium'])
+    total_costs = (planting_cost or 0) + (maintenance_cost or 0) + harvest_cost
+    net_profit = gross_revenue - total_costs
+    return {
+        'yield_per_hectare': tonnes / area if area > 0 else 0,
+        'total_harvest_cost': harvest_cost,
+        'gross_revenue': gross_revenue,
+        'total_costs': total_costs,
+        'net_profit': net_profit,
+        'profit_per_hectare': net_profit / area if area > 0 else 0,
+        'roi_percent': (net_profit / total_costs * 100) if total_costs > 0 else 0,
+        'break_even_price': total_costs / tonnes if tonnes > 0 else 0,
+    }
+
+
+def _plantings(conn, planting_ids):
+    plantings = {}
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row  # also when called with a bare connection (importer CLI)
+    for start in range(0, len(planting_ids), LOOKUP_CHUNK):
+        chunk = planting_ids[start:start + LOOKUP_CHUNK]
+        rows = cursor.execute(f'''
+            SELECT p.planting_id, p.field_id, p.crop_type, p.planted_area_ha, p.total_planting_cost,
+                   (SELECT SUM(total_cost) FROM field_maintenance m
+                    WHERE m.planting_id = p.planting_id) AS maintenance_costs
+            FROM planting_records p
+            WHERE p.planting_id IN ({', '.join('?' * len(chunk))})
+        ''', chunk)
+        plantings.update((row[0], row) for row in rows)
+    return plantings
+
+
+def _write(conn, harvests):
+    planting_ids = list(dict.fromkeys(harvest['planting_id'] for harvest in harvests))
+    plantings = _plantings(conn, planting_ids)
+    missing = [planting_id for planting_id in planting_ids if planting_id not in plantings]
+    if missing:
+        raise HarvestError(f"Planting record not found: {', '.join(map(str, missing[:10]))}")
+
+    results = []
+    storage = {}  # crop -> [tonnes, (harvest_date, price) of the latest priced harvest]
+    for harvest in harvests:
+        planting = plantings[harvest['planting_id']]
+        if harvest['harvested_area_ha'] is None:
+            harvest['harvested_area_ha'] = planting['planted_area_ha'] or 0
+        figures = compute_financials(harvest, planting['total_planting_cost'], planting['maintenance_costs'])
+        row = {**harvest, **figures, 'field_id': planting['field_id']}
+        harvest_id = conn.execute(INSERT_SQL, [row[column] for column in HARVEST_COLUMNS]).fetchone()[0]
+        results.append({'harvest_id': harvest_id, 'planting_id': harvest['planting_id'],
+                        'crop_type': planting['crop_type'], **figures})
+
+        totals = storage.setdefault(planting['crop_type'], [0.0, None])
+        totals[0] += harvest['total_yield_tonnes']
+        if harvest['market_price_per_tonne'] > 0 and (totals[1] is None or harvest['harvest_date'] >= totals[1][0]):
+            totals[1] = (harvest['harvest_date'], harvest['market_price_per_tonne'])
+
+    conn.executemany("UPDATE planting_records SET status = 'Harvested' WHERE planting_id = ?",
+                     [(planting_id,) for planting_id in planting_ids])
+
+    # Increment in place; a crop without a storage row simply returns nothing
+    stored = {}
+    for crop_type, (tonnes, latest) in storage.items():
+        price_date, price = latest or (None, None)
+        row = conn.execute('''
+            UPDATE crop_storage
+            SET quantity_stored = COALESCE(quantity_stored, 0) + ?,
+                current_market_price = COALESCE(?, current_market_price),
+                last_price_update = COALESCE(?, last_price_update),
+                updated_date = ?
+            WHERE crop_name = ?
+            RETURNING quantity_stored
+        ''', (tonnes, price, price_date, datetime.now(), crop_type)).fetchone()
+        stored[crop_type] = row[0] if row else None
+
+    for result in results:
+        result['quantity_stored'] = stored[result['crop_type']]
+    return results
+
+
+def record_harvests(conn, harvests):
+    """Record normalized harvests in one transaction; returns one result dict per harvest.
+
+    Each result has harvest_id, planting_id, crop_type, the computed
+    financials and the crop's quantity_stored afterwards (None when the crop
+    is not in storage). Raises HarvestError, with nothing written, if any
+    planting does not exist, and TransactionOpenError if the connection has
+    uncommitted changes.
+    """
+    if not harvests:
+        return []
+    begin_immediate(conn)
+    try:
+        results = _write(conn, harvests)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return results
+
+
+def record_harvest(conn, harvest):
+    return record_harvests(conn, [harvest])[0]
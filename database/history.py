@@ -0,0 +1,197 @@
+# Operations and maintenance history
+"""
+Keyset-paged field operation and maintenance logs, with their header totals.
+
+Both logs are listed newest first on (date, id) and paged with a cursor
+holding the last row's key, so page 500 reads the same 50 index entries as
+page 1 (see database/pagination.py). The date indexes of index pack v3 end
+in the rowid, which is the id, so the walk needs no sort; a field filter
+has its own (field_id, date) index, and type / operator filters ride the
+date index, each type and operator being a sizeable share of the rows.
+
+The header totals live in history_totals, kept current by triggers: one
+row per (log, field, type) plus an ALL_FIELDS row per (log, type), so the
+totals for the whole log, one field and/or one type add up at most a
+dozen rows. The operator and date filters are not part of the rollup key,
+so the totals shown with them are those of the field / type scope.
+"""
+
+import sqlite3
+
+from database.migrations import execute_script
+from database.pagination import date_range, decode_cursor, encode_cursor
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# field_id of the per-type rows that cover every field
+ALL_FIELDS = '*'
+
+# name -> (table, key column, date column, type column, {total column: source column})
+LOGS = {
+    'operations': ('field_operations', 'operation_id', 'operation_date', 'operation_type',
+                   {'hours': 'hours_worked', 'fuel_liters': 'fuel_used_liters'}),
+    'maintenance': ('field_maintenance', 'maintenance_id', 'maintenance_date', 'maintenance_type',
+                    {'hours': 'hours_worked', 'cost': 'total_cost'}),
+}
+
+# Extra columns and joins of a page: name -> (select, join)
+PAGE_JOINS = {
+    'operations': ('', ''),
+    'maintenance': (', p.crop_type', 'LEFT JOIN planting_records p ON p.planting_id = page.planting_id'),
+}
+
+TOTAL_COLUMNS = ('entries', 'hours', 'fuel_liters', 'cost')
+
+TOTALS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS history_totals (
+        log TEXT NOT NULL,
+        field_id TEXT NOT NULL,
+        entry_type TEXT NOT NULL,
+        entries INTEGER NOT NULL DEFAULT 0,
+        hours REAL NOT NULL DEFAULT 0,
+        fuel_liters REAL NOT NULL DEFAULT 0,
+        cost REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (log, field_id, entry_type)
+    ) WITHOUT ROWID;
+'''
+
+
+def _values(measures, row, sign=''):
+    return ', '.join([f'{sign}1'] + [f"{sign}COALESCE({row}.{measures[column]}, 0)" if column in measures else '0'
+                                     for column in TOTAL_COLUMNS[1:]])
+
+
+def _add(name, row, sign=''):
+    """Upserts adding (or with sign '-', taking away) one row to its field and all-fields totals"""
+    _, _, _, type_column, measures = LOGS[name]
+    merge = ', '.join(f'{column} = {column} + excluded.{column}' for column in TOTAL_COLUMNS)
+    return ''.join(f'''
+        INSERT INTO history_totals (log, field_id, entry_type, {', '.join(TOTAL_COLUMNS)})
+        VALUES ('{name}', {field}, {row}.{type_column}, {_values(measures, row, sign)})
+        ON CONFLICT (log, field_id, entry_type) DO UPDATE SET {merge};'''
+                   for field in (f'{row}.field_id', f"'{ALL_FIELDS}'"))
+
+
+def _triggers(name):
+    table, _, _, type_column, measures = LOGS[name]
+    watched = ', '.join(dict.fromkeys(('field_id', type_column, *measures.values())))
+    return f'''
+    CREATE TRIGGER IF NOT EXISTS trg_history_{table}_insert
+    AFTER INSERT ON {table}
+    BEGIN{_add(name, 'NEW')}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_history_{table}_update
+    AFTER UPDATE OF {watched} ON {table}
+    BEGIN{_add(name, 'OLD', '-')}{_add(name, 'NEW')}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_history_{table}_delete
+    AFTER DELETE ON {table}
+    BEGIN{_add(name, 'OLD', '-')}
+    END;
+'''
+
+
+def rebuild_totals(conn):
+    """Create the totals table and triggers if needed and recompute it from both logs"""
+    execute_script(conn, TOTALS_TABLE + ''.join(_triggers(name) for name in LOGS))
+    conn.execute('DELETE FROM history_totals')
+    for name, (table, _, _, type_column, measures) in LOGS.items():
+        sums = ', '.join(f'COALESCE(SUM({measures[column]}), 0)' if column in measures else '0'
+                         for column in TOTAL_COLUMNS[1:])
+        for field in ('field_id', f"'{ALL_FIELDS}'"):
+            conn.execute(f'''
+                INSERT INTO history_totals (log, field_id, entry_type, {', '.join(TOTAL_COLUMNS)})
+                SELECT '{name}', {field}, {type_column}, COUNT(*), {sums}
+                FROM {table}
+                GROUP BY {field}, {type_column}
+            ''')
+
+
+def get_totals(conn, name, field_id=None, entry_type=None):
+    """Header totals of one log for a field and/or type (None = all).
+
+    Returns entries, hours, fuel_liters and cost.
+    """
+    where, params = ['log = ?', 'field_id = ?'], [name, field_id or ALL_FIELDS]
+    if entry_type:
+        where.append('entry_type = ?')
+        params.append(entry_type)
+    sql = f'''
+        SELECT {', '.join(f'COALESCE(SUM({column}), 0) AS {column}' for column in TOTAL_COLUMNS)}
+        FROM history_totals
+        WHERE {' AND '.join(where)}
+    '''
+    try:
+        row = conn.execute(sql, params).fetchone()
+    except sqlite3.OperationalError:
+        # not created yet
+        rebuild_totals(conn)
+        conn.commit()
+        row = conn.execute(sql, params).fetchone()
+    return dict(row)
+
+
+# =====================================================
+# PAGES
+# =====================================================
+
+def query_page(conn, name, field_id=None, entry_type=None, operator=None, start=None, end=None,
+               cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Return (entries, next_cursor) for one page of a log, newest first.
+
+    Each entry has the log's columns plus field_name (and crop_type for
+    maintenance). Raises ValueError for a bad date or cursor.
+    """
+    table, key, date_column, type_column, _ = LOGS[name]
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    conditions, params = [], []
+    for column, value in (('field_id', field_id), (type_column, entry_type), ('operator_name', operator)):
+        if value:
+            conditions.append(f'{column} = ?')
+            params.append(value)
+    date_conditions, date_params = date_range(date_column, start, end)
+    conditions.extend(date_conditions)
+    params.extend(date_params)
+    if cursor:
+        # Both keys descend, so a row value says it in one range the date
+        # index can seek to; the OR form of seek_condition() is planned as
+        # a filter on a full index scan
+        conditions.append(f'({date_column}, {key}) < (?, ?)')
+        params.extend(decode_cursor(cursor, 2))
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    extra_columns, extra_join = PAGE_JOINS[name]
+
+    # Page first, then join: joining fields inside would let the planner
+    # drive the query from fields and sort every matching row
+    rows = conn.execute(f'''
+        WITH page AS (
+            SELECT * FROM {table}
+            {where}
+            ORDER BY {date_column} DESC, {key} DESC
+            LIMIT ?
+        )
+        SELECT page.*, f.field_name{extra_columns}
+        FROM page
+        LEFT JOIN fields f ON f.field_id = page.field_id
+        {extra_join}
+        ORDER BY page.{date_column} DESC, page.{key} DESC
+    ''', (*params, limit + 1)).fetchall()
+
+    entries = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = entries[-1]
+        next_cursor = encode_cursor(last[date_column], last[key])
+    return entries, next_cursor
+
+
+def entry_types(conn, name):
+    """Types on record in one log, for the filter dropdown"""
+    return [row[0] for row in conn.execute(
+        'SELECT DISTINCT entry_type FROM history_totals WHERE log = ? AND field_id = ? AND entries > 0 '
+        'ORDER BY entry_type', (name, ALL_FIELDS))]
@@ -0,0 +1,408 @@
+# Bulk import
+"""
+Streaming CSV / NDJSON import of fields, plantings, operations and harvests.
+
+    python -m database.importer fields my_fields.csv
+    python -m database.importer harvests season.ndjson --db path/to/fs25_farming.db
+    curl --data-binary @season.csv -H 'Content-Type: text/csv' http://localhost:5000/import/harvests
+
+Rows are read one at a time, checked against the target table's schema
+(PRAGMA table_info: known columns, NOT NULL without a default, declared
+type) and written BATCH_SIZE at a time with one executemany and one commit
+per batch. If SQLite rejects a batch (duplicate key, unknown field_id,
+CHECK constraint) it is rolled back and replayed row by row, so each bad
+row gets its own error and the good ones are still written. Memory stays
+flat however long the input: one batch of rows plus at most
+MAX_REPORTED_ERRORS error entries.
+
+Harvests go through database.harvest, so their financials, the planting
+status and the storage quantity change exactly as with the harvest form.
+"""
+
+import argparse
+import csv
+import io
+import itertools
+import json
+import os
+import sqlite3
+import sys
+from datetime import date
+
+from database import dashboard_stats, migrations
+from database.connection import begin_immediate
+from database import harvest as harvest_service
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+FORMATS = ('csv', 'ndjson')
+
+DEFAULT_DATABASE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'fs25_farming.db'
+)
+
+# Maintained by the database, never imported
+SKIPPED_COLUMNS = ('created_date', 'updated_date')
+
+PLANTING_COST_COLUMNS = ('seed_cost', 'fertilizer_cost', 'lime_cost', 'labor_cost',
+                         'equipment_cost', 'fuel_cost', 'other_costs')
+
+
+class ImportRejected(ValueError):
+    """The input as a whole cannot be imported (unknown table or format, bad CSV header)"""
+
+
+class RowError(ValueError):
+    """One input row is invalid; reported and skipped"""
+
+
+# =====================================================
+# ROW PREPARATION
+# =====================================================
+
+def _prepare_field(row):
+    if row.get('field_id'):
+        row['field_id'] = row['field_id'].strip().upper()
+    if row.get('current_value') is None:
+        row['current_value'] = row.get('purchase_price')
+
+
+def _prepare_planting(row):
+    if row.get('total_planting_cost') is None:
+        row['total_planting_cost'] = sum(row.get(name) or 0 for name in PLANTING_COST_COLUMNS)
+    if row.get('cost_per_hectare') is None:
+        area = row.get('planted_area_ha') or 0
+        row['cost_per_hectare'] = row['total_planting_cost'] / area if area > 0 else 0
+
+
+def _after_fields(conn):
+    dashboard_stats.on_bulk_change(conn)
+
+
+def _after_operations(conn):
+    dashboard_stats.on_operations_changed(conn)
+
+
+# import name -> (table, row preparation, hook run once after the last batch)
+IMPORT_TABLES = {
+    'fields': ('fields', _prepare_field, _after_fields),
+    'plantings': ('planting_records', _prepare_planting, None),
+    'operations': ('field_operations', None, _after_operations),
+    'harvests': ('harvest_records', None, None),
+}
+
+
+# =====================================================
+# SCHEMA VALIDATION
+# =====================================================
+
+def _default(value):
+    """A column's literal DEFAULT as a Python value; None for expressions or no default"""
+    if value is None:
+        return None
+    if value.startswith("'") and value.endswith("'"):
+        return value[1:-1].replace("''", "'")
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return None
+
+
+def _kind(declared_type):
+    declared_type = (declared_type or '').upper()
+    if 'INT' in declared_type:
+        return 'integer'
+    if any(name in declared_type for name in ('REAL', 'FLOA', 'DOUB')):
+        return 'real'
+    if declared_type == 'DATE':
+        return 'date'
+    return 'text'
+
+
+def table_columns(conn, table):
+    """[(name, kind, required, default)] of the importable columns of a table"""
+    columns = []
+    for _, name, declared_type, notnull, default, pk in conn.execute(f'PRAGMA table_info({table})'):
+        kind = _kind(declared_type)
+        if name in SKIPPED_COLUMNS or (pk and kind == 'integer'):
+            continue  # timestamps and rowid keys are assigned by SQLite
+        required = bool(notnull or pk) and default is None
+        columns.append((name, kind, required, _default(default)))
+    return columns
+
+
+def _convert(value, kind, name):
+    if isinstance(value, str):
+        value = value.strip() if kind != 'text' else value
+        if value == '' and kind != 'text':
+            return None
+    if value is None:
+        return None
+    try:
+        if kind == 'integer':
+            number = float(value)
+            if not number.is_integer():
+                raise ValueError
+            return int(number)
+        if kind == 'real':
+            return float(value)
+        if kind == 'date':
+            return date.fromisoformat(str(value)[:10]).isoformat() + str(value)[10:]
+    except (TypeError, ValueError):
+        raise RowError(f'{name}: expected {"a YYYY-MM-DD date" if kind == "date" else "a number"}, '
+                       f'got {value!r}') from None
+    if isinstance(value, (dict, list)):
+        raise RowError(f'{name}: expected a scalar value')
+    return str(value)
+
+
+def validate_row(row, columns, prepare=None):
+    """Table row values in column order, or RowError"""
+    names = {column[0] for column in columns}
+    unknown = [key for key in row if key not in names and key not in SKIPPED_COLUMNS]
+    if unknown:
+        raise RowError(f"Unknown column(s): {', '.join(map(str, unknown))}")
+
+    values = {name: _convert(row.get(name), kind, name) for name, kind, _, _ in columns}
+    if prepare is not None:
+        prepare(values)
+    for name, _, _, default in columns:
+        if values[name] is None:
+            values[name] = default
+
+    missing = [name for name, _, required, _ in columns if required and values[name] in (None, '')]
+    if missing:
+        raise RowError(f"Missing required value(s): {', '.join(missing)}")
+    return tuple(values[name] for name, _, _, _ in columns)
+
+
+# =====================================================
+# INPUT READERS
+# =====================================================
+
+def read_csv(stream):
+    """(line, row dict or RowError) per CSV record; the header names the columns"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    if not reader.fieldnames:
+        raise ImportRejected('CSV input has no header row')
+    for row in reader:
+        if None in row:
+            yield reader.line_num, RowError('More values than header columns')
+        else:
+            yield reader.line_num, row
+
+
+def read_ndjson(stream):
+    """(line, row dict or RowError) per non-blank line of newline-delimited JSON objects"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, RowError(f'Invalid JSON: {e.msg}')
+            continue
+        yield line_number, row if isinstance(row, dict) else RowError('Expected a JSON object')
+
+
+READERS = {'csv': read_csv, 'ndjson': read_ndjson}
+
+
+def _batches(rows, size):
+    batch = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# =====================================================
+# WRITING
+# =====================================================
+
+class ImportReport:
+    """Counts and the first MAX_REPORTED_ERRORS row errors of one import"""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows_read = 0
+        self.inserted = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def as_dict(self):
+        return {
+            'table': self.name,
+            'rows_read': self.rows_read,
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'batches': self.batches,
+            'errors': sorted(self.errors, key=lambda error: error['line']),
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def _write_table_batch(conn, sql, batch, report):
+    """executemany the batch; if SQLite rejects it, replay row by row to find the bad rows"""
+    begin_immediate(conn)
+    try:
+        conn.executemany(sql, [values for _, values in batch])
+        conn.commit()
+        report.inserted += len(batch)
+        return
+    except sqlite3.IntegrityError:
+        conn.rollback()
+
+    begin_immediate(conn)
+    try:
+        for line, values in batch:
+            try:
+                conn.execute(sql, values)  # a failed statement undoes only itself
+                report.inserted += 1
+            except sqlite3.IntegrityError as e:
+                report.error(line, str(e))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def _existing_plantings(conn, planting_ids):
+    placeholders = ', '.join('?' * len(planting_ids))
+    return {row[0] for row in conn.execute(
+        f'SELECT planting_id FROM planting_records WHERE planting_id IN ({placeholders})', planting_ids)}
+
+
+def _write_harvest_batch(conn, batch, report):
+    existing = _existing_plantings(conn, list({harvest['planting_id'] for _, harvest in batch}))
+    harvests = []
+    for line, harvest in batch:
+        if harvest['planting_id'] in existing:
+            harvests.append(harvest)
+        else:
+            report.error(line, f"Planting record not found: {harvest['planting_id']}")
+    harvest_service.record_harvests(conn, harvests)
+    report.inserted += len(harvests)
+
+
+def import_rows(conn, name, rows, batch_size=BATCH_SIZE):
+    """Import (line, row dict or RowError) pairs into one of IMPORT_TABLES; returns the report dict"""
+    if name not in IMPORT_TABLES:
+        raise ImportRejected(f"Unknown import table: {name} (expected one of {', '.join(IMPORT_TABLES)})")
+    table, prepare, after = IMPORT_TABLES[name]
+    report = ImportReport(name)
+
+    columns = table_columns(conn, table)
+    sql = (f"INSERT INTO {table} ({', '.join(column[0] for column in columns)}) "
+           f"VALUES ({', '.join('?' * len(columns))})")
+
+    def validated():
+        for line, row in rows:
+            report.rows_read += 1
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                if name == 'harvests':
+                    yield line, harvest_service.normalize(row)
+                else:
+                    yield line, validate_row(row, columns, prepare)
+            except (RowError, harvest_service.HarvestError) as e:
+                report.error(line, str(e))
+
+    for batch in _batches(validated(), batch_size):
+        report.batches += 1
+        if name == 'harvests':
+            _write_harvest_batch(conn, batch, report)
+        else:
+            _write_table_batch(conn, sql, batch, report)
+
+    if after is not None and report.inserted:
+        after(conn)
+        conn.commit()
+    return report.as_dict()
+
+
+def import_stream(conn, name, stream, fmt='csv', batch_size=BATCH_SIZE):
+    """Import a binary stream of CSV or NDJSON; returns the report dict"""
+    if fmt not in READERS:
+        raise ImportRejected(f"Unknown format: {fmt} (expected one of {', '.join(FORMATS)})")
+    if name not in IMPORT_TABLES:
+        raise ImportRejected(f"Unknown import table: {name} (expected one of {', '.join(IMPORT_TABLES)})")
+
+    rows = READERS[fmt](stream)
+    if fmt == 'csv':
+        # Check the header before anything is written
+        first = next(rows, None)
+        columns = {column[0] for column in table_columns(conn, IMPORT_TABLES[name][0])}
+        if name == 'harvests':
+            columns = set(harvest_service.HARVEST_COLUMNS)
+        header = [] if first is None or isinstance(first[1], RowError) else list(first[1])
+        unknown = [key for key in header if key not in columns and key not in SKIPPED_COLUMNS]
+        if unknown:
+            raise ImportRejected(f"Unknown CSV column(s) for {name}: {', '.join(unknown)}")
+        if first is not None:
+            rows = itertools.chain([first], rows)
+    return import_rows(conn, name, rows, batch_size)
+
+
+def format_for(filename=None, content_type=None):
+    """Guess csv / ndjson from a file name or Content-Type"""
+    name = (filename or '').lower()
+    content_type = (content_type or '').lower()
+    if name.endswith(('.ndjson', '.jsonl', '.json')) or 'json' in content_type:
+        return 'ndjson'
+    return 'csv'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk import fields, plantings, operations or harvests')
+    parser.add_argument('table', choices=sorted(IMPORT_TABLES))
+    parser.add_argument('file', help="CSV or NDJSON file, or '-' for stdin")
+    parser.add_argument('--db', default=DEFAULT_DATABASE_PATH)
+    parser.add_argument('--format', choices=FORMATS, help='default: from the file extension')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    conn.row_factory = sqlite3.Row  # as pooled connections; the dashboard hooks expect it
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA foreign_keys = ON')
+    migrations.migrate(conn)
+
+    fmt = args.format or format_for(args.file)
+    try:
+        if args.file == '-':
+            report = import_stream(conn, args.table, sys.stdin.buffer, fmt, args.batch_size)
+        else:
+            with open(args.file, 'rb') as stream:
+                report = import_stream(conn, args.table, stream, fmt, args.batch_size)
+    except ImportRejected as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    print(f"✅ {report['inserted']:,} {args.table} imported, {report['failed']:,} rejected "
+          f"({report['rows_read']:,} rows in {report['batches']:,} batches)")
+    for error in report['errors']:
+        print(f"   line {error['line']}: {error['error']}")
+    if report['errors_truncated']:
+        print(f"   ... and {report['failed'] - len(report['errors']):,} more")
+    sys.exit(1 if report['failed'] else 0)
+
+
+if __name__ == '__main__':
+    main()
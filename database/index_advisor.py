@@ -0,0 +1,174 @@
+# Index advisor
+"""
+Run EXPLAIN QUERY PLAN over every literal SQL statement passed to
+execute()/executemany() in app.py and the database package (or the files
+given) and flag full table scans and temporary B-trees. The sample data
+generator and the schema scripts are left out: they only run offline.
+
+    python -m database.index_advisor [--db path] [--strict] [files ...]
+
+Plans are taken against an empty in-memory copy of the database schema, so
+the result depends on which indexes exist rather than on how many rows a
+small development database happens to hold. Statements built with f-strings
+are reported as skipped, since their final text is only known at run time.
+"""
+
+import argparse
+import ast
+import glob
+import os
+import re
+import sqlite3
+import sys
+
+from database import migrations
+from database.migrations import DEFAULT_DATABASE_PATH
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Offline scripts (sample data, schema creation, migrations, this advisor) and
+# the response cache, whose cache_entries table lives in a database of its own
+SKIPPED_FILES = {
+    'add_planting_tables.py', 'generate_sample_data.py', 'index_advisor.py',
+    'init_crop_storage.py', 'migrations.py', 'setup.py', 'response_cache.py',
+}
+DEFAULT_FILES = (os.path.join(REPO_ROOT, 'app.py'),) + tuple(
+    path for path in sorted(glob.glob(os.path.join(REPO_ROOT, 'database', '*.py')))
+    if os.path.basename(path) not in SKIPPED_FILES
+)
+
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_PARAMETER = re.compile(r'\?(\d*)')
+
+
+def extract_statements(path):
+    """Yield (line, sql or None) for every execute()/executemany() call in a source file"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr in ('execute', 'executemany') and node.args):
+            continue
+        arg = node.args[0]
+        if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+            yield node.lineno, arg.value
+        else:
+            yield node.lineno, None
+
+
+def count_parameters(sql):
+    """Bindings a statement takes: one per ?, or the highest ?NNN when numbered"""
+    numbers = _PARAMETER.findall(_STRING_LITERAL.sub('', sql))
+    if any(numbers):
+        return max(int(n) for n in numbers if n)
+    return len(numbers)
+
+
+def explain(conn, sql):
+    params = [None] * count_parameters(sql)
+    rows = conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+    return [row[3] for row in rows]
+
+
+def schema_only_copy(database_path):
+    """In-memory database with the same tables and indexes but no rows or statistics.
+
+    The copy is migrated to the latest schema, so statements are planned
+    against the tables and index pack the app runs with even when the
+    source database has never been migrated.
+    """
+    source = sqlite3.connect(f'file:{database_path}?mode=ro', uri=True)
+    schema = source.execute('''
+        SELECT sql FROM sqlite_master
+        WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+        ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 ELSE 2 END
+    ''').fetchall()
+    has_migrations = source.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_migrations'"
+    ).fetchone()
+    applied = source.execute(
+        'SELECT version, name FROM schema_migrations'
+    ).fetchall() if has_migrations else []
+    source.close()
+
+    conn = sqlite3.connect(':memory:')
+    for (sql,) in schema:
+        try:
+            conn.execute(sql)
+        except sqlite3.Error:
+            pass  # e.g. virtual tables whose module is unavailable
+    # Carry the applied versions over so only the pending migrations run
+    conn.execute(migrations.MIGRATIONS_TABLE_SQL)
+    conn.executemany('INSERT INTO schema_migrations (version, name) VALUES (?, ?)', applied)
+    conn.commit()
+    migrations.migrate(conn)
+    return conn
+
+
+def classify(detail):
+    """Return a finding label for a plan step, or None if it is fine"""
+    if detail in ('SCAN CONSTANT ROW', 'SCAN sqlite_master'):
+        return None
+    if detail.startswith('SCAN ') and 'USING' not in detail:
+        return 'full scan'
+    if detail.startswith('SCAN ') and 'COVERING INDEX' in detail:
+        return 'full index scan'
+    if 'USE TEMP B-TREE' in detail:
+        return 'temp b-tree'
+    return None
+
+
+def advise(conn, files):
+    report = {'checked': 0, 'skipped': [], 'errors': [], 'findings': []}
+
+    for path in files:
+        rel = os.path.relpath(path, REPO_ROOT)
+        for line, sql in extract_statements(path):
+            if sql is None:
+                report['skipped'].append((rel, line))
+                continue
+            if not sql.strip().upper().startswith(EXPLAINABLE):
+                continue
+
+            report['checked'] += 1
+            try:
+                plan = explain(conn, sql)
+            except sqlite3.Error as e:
+                report['errors'].append((rel, line, str(e)))
+                continue
+
+            for detail in plan:
+                label = classify(detail)
+                if label:
+                    report['findings'].append((rel, line, label, detail, ' '.join(sql.split())))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Flag full scans and temp B-trees in app SQL')
+    parser.add_argument('files', nargs='*', default=list(DEFAULT_FILES))
+    parser.add_argument('--db', default=DEFAULT_DATABASE_PATH)
+    parser.add_argument('--strict', action='store_true', help='exit non-zero on full scans')
+    args = parser.parse_args()
+
+    conn = schema_only_copy(args.db)
+    report = advise(conn, args.files)
+    conn.close()
+
+    for rel, line, label, detail, sql in report['findings']:
+        print(f'⚠️  {rel}:{line}: {label}: {detail}')
+        print(f'    {sql[:160]}')
+    for rel, line, error in report['errors']:
+        print(f'❌ {rel}:{line}: {error}')
+
+    print(f"\n📋 {report['checked']} statements checked, {len(report['findings'])} findings, "
+          f"{len(report['errors'])} errors, {len(report['skipped'])} dynamic statements skipped")
+
+    full_scans = [f for f in report['findings'] if f[2] == 'full scan']
+    return 1 if args.strict and full_scans else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
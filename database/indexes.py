@@ -0,0 +1,102 @@
+# Index pack
+"""
+Versioned secondary indexes for the core tables.
+
+crop_seasons, field_operations and weather_events were created without
+secondary indexes, but every list and detail route filters on
+field_id or sorts on crop_year / operation_date / event_date. To change
+the index set, add the next version to PACKS and a migration to
+database/migrations.py that calls install_pack() with that version, so
+existing databases pick the new pack up at startup. schema_migrations is
+the only record of which pack a database has: migrations 6, 11 and 14
+installed packs 1, 2 and 3.
+"""
+
+# Every pack that has shipped: version -> (indexes added, index names dropped),
+# each index an (index name, table, column list) - composite where the ORDER BY
+# needs it. A pack is the packs before it plus its own changes. Migrations
+# install a pinned version, so a shipped pack is never edited: add the next.
+PACKS = {
+    1: ((
+        # field_detail: WHERE field_id = ? ORDER BY crop_year DESC, planting_date DESC
+        ('idx_seasons_field_year', 'crop_seasons', 'field_id, crop_year DESC, planting_date DESC'),
+        # crops_list / add_operation: ORDER BY crop_year DESC, planting_date DESC; index(): WHERE crop_year = ?
+        ('idx_seasons_year', 'crop_seasons', 'crop_year DESC, planting_date DESC'),
+
+        # field_detail: WHERE field_id = ? ORDER BY operation_date DESC
+        ('idx_operations_field_date', 'field_operations', 'field_id, operation_date DESC'),
+        # operations_list / recent activity: ORDER BY operation_date DESC, created_date DESC
+        ('idx_operations_date', 'field_operations', 'operation_date DESC, created_date DESC'),
+
+        # field_detail: WHERE field_id = ? ORDER BY event_date DESC
+        ('idx_weather_field_date', 'weather_events', 'field_id, event_date DESC'),
+        # dashboard weather count: event_date range
+        ('idx_weather_date', 'weather_events', 'event_date'),
+
+        # maintenance_list: ORDER BY maintenance_date DESC
+        ('idx_maintenance_date', 'field_maintenance', 'maintenance_date DESC'),
+        # planting_detail: WHERE planting_id = ? ORDER BY maintenance_date / harvest_date DESC
+        ('idx_maintenance_planting_date', 'field_maintenance', 'planting_id, maintenance_date DESC'),
+        ('idx_harvest_planting_date', 'harvest_records', 'planting_id, harvest_date DESC'),
+        # field_maintenance_add: WHERE field_id = ? AND status = 'Active' ORDER BY planting_date DESC
+        ('idx_planting_field_status', 'planting_records', 'field_id, status, planting_date DESC'),
+
+        # Field dropdowns: ORDER BY field_name (covering)
+        ('idx_fields_name', 'fields', 'field_name, field_id'),
+
+        # Foreign-key children, probed when seasons / equipment are deleted with foreign_keys = ON
+        ('idx_operations_season', 'field_operations', 'season_id'),
+        ('idx_operations_equipment', 'field_operations', 'equipment_id'),
+        ('idx_weather_season', 'weather_events', 'season_id'),
+    ), ()),
+
+    2: ((
+        # price_history: WHERE crop_name = ? ORDER BY price_date DESC (scanned backwards), and the
+        # price rollup triggers' per-bucket range scans
+        ('idx_price_crop_date', 'price_history', 'crop_name, price_date'),
+    ), ()),
+
+    3: ((
+        # Operation and maintenance history pages: ORDER BY date DESC, id DESC, optionally
+        # WHERE field_id = ?. Every index ends in the rowid (= the id), so these are scanned
+        # backwards with no sort; a DESC date column would leave the ids ascending.
+        # Also field_detail (WHERE field_id = ? ORDER BY date DESC) and recent activity.
+        ('idx_operations_field_day', 'field_operations', 'field_id, operation_date'),
+        ('idx_operations_day', 'field_operations', 'operation_date'),
+        ('idx_maintenance_field_day', 'field_maintenance', 'field_id, maintenance_date'),
+        ('idx_maintenance_day', 'field_maintenance', 'maintenance_date'),
+    ), (
+        # replaced by the *_day history indexes (idx_maintenance_field, created with the
+        # planting tables, is a prefix of one)
+        'idx_operations_field_date', 'idx_operations_date', 'idx_maintenance_date', 'idx_maintenance_field',
+    )),
+}
+
+INDEX_PACK_VERSION = max(PACKS)
+
+
+def pack_indexes(version=INDEX_PACK_VERSION):
+    """(indexes, dropped index names) of one pack version"""
+    if version not in PACKS:
+        raise ValueError(f'unknown index pack version {version}')
+    indexes, dropped = {}, []
+    for pack in range(1, version + 1):
+        added, removed = PACKS[pack]
+        for name in removed:
+            indexes.pop(name, None)
+            dropped.append(name)
+        for index in added:
+            indexes[index[0]] = index
+    return tuple(indexes.values()), tuple(dropped)
+
+
+INDEXES, DROPPED_INDEXES = pack_indexes()
+
+
+def install_pack(conn, version):
+    """Drop and create the indexes of one pack version, without committing (database.migrations)"""
+    indexes, dropped = pack_indexes(version)
+    for name in dropped:
+        conn.execute(f'DROP INDEX IF EXISTS {name}')
+    for name, table, columns in indexes:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})')
@@ -0,0 +1,229 @@
+# SQL instrumentation
+"""
+Per-request SQL statement recording, Server-Timing headers and a slow-query log.
+
+When enabled (SQL_INSTRUMENTATION in app.config or FS25_SQL_INSTRUMENTATION=1)
+the pool opens InstrumentedConnection objects, whose cursors time every
+execute() and fetch and count the rows returned. Statements run during a
+request are collected on flask.g. After the request:
+
+* the response gets ``Server-Timing: db;dur=..;desc="N queries, M rows"`` and
+  ``db-slowest;dur=..`` entries, which browser dev tools show per request;
+* statements slower than SLOW_QUERY_MS (default 100) are logged as
+  ``slow_query`` warnings on fs25.sql.slow with normalized text, a hash of
+  their parameters and their EXPLAIN QUERY PLAN. Set SLOW_QUERY_LOG (or
+  FS25_SLOW_QUERY_LOG) to also append them to a JSON-lines file.
+
+When disabled the pool keeps using plain PooledConnection objects, so there
+is no wrapper on the query path at all.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import time
+
+from flask import g, has_request_context
+
+from database.connection import PooledConnection
+from monitoring.logger import JsonLineFormatter, get_logger
+
+DEFAULT_SLOW_QUERY_MS = 100.0
+
+slow_log = get_logger('sql.slow')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*\?\s*,)+\s*\?\s*\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Collapse whitespace and replace literals so equivalent statements group together"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    return _IN_LIST.sub('IN (?, ...)', sql)
+
+
+def params_hash(params):
+    if params is None:
+        return None
+    return hashlib.blake2b(repr(params).encode(), digest_size=6).hexdigest()
+
+
+class StatementRecord:
+    __slots__ = ('sql', 'params', 'rows', 'seconds', 'many')
+
+    def __init__(self, sql, params, many=False):
+        self.sql = sql
+        self.params = params
+        self.rows = 0
+        self.seconds = 0.0
+        self.many = many
+
+    def to_dict(self):
+        return {
+            'sql': normalize_sql(self.sql),
+            'params_hash': params_hash(self.params),
+            'rows': self.rows,
+            'ms': round(self.seconds * 1000, 3),
+        }
+
+
+def _start_record(sql, params, many=False):
+    if not has_request_context():
+        return None
+    statements = g.get('_sql_statements')
+    if statements is None:
+        return None
+    record = StatementRecord(sql, params, many)
+    statements.append(record)
+    return record
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Times execute() and every fetch, and counts rows, into the current request's record"""
+
+    _record = None
+
+    def execute(self, sql, parameters=()):
+        record = self._record = _start_record(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            if record is not None:
+                record.seconds += time.perf_counter() - started
+                if self.description is None:
+                    record.rows = max(self.rowcount, 0)
+
+    def executemany(self, sql, seq_of_parameters):
+        record = self._record = _start_record(sql, None, many=True)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            if record is not None:
+                record.seconds += time.perf_counter() - started
+                record.rows = max(self.rowcount, 0)
+
+    def _timed_fetch(self, fetch, *args):
+        record = self._record
+        if record is None:
+            return fetch(*args)
+        started = time.perf_counter()
+        result = fetch(*args)
+        record.seconds += time.perf_counter() - started
+        return result
+
+    def fetchone(self):
+        row = self._timed_fetch(super().fetchone)
+        if row is not None and self._record is not None:
+            self._record.rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed_fetch(super().fetchmany, size or self.arraysize)
+        if self._record is not None:
+            self._record.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed_fetch(super().fetchall)
+        if self._record is not None:
+            self._record.rows += len(rows)
+        return rows
+
+    def __next__(self):
+        row = self._timed_fetch(super().__next__)
+        if self._record is not None:
+            self._record.rows += 1
+        return row
+
+
+class InstrumentedConnection(PooledConnection):
+    """Pooled connection whose execute() shortcuts go through InstrumentedCursor"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def summarize(statements):
+    total = sum(s.seconds for s in statements)
+    slowest = max((s.seconds for s in statements), default=0.0)
+    return {
+        'queries': len(statements),
+        'rows': sum(s.rows for s in statements),
+        'db_ms': round(total * 1000, 3),
+        'slowest_ms': round(slowest * 1000, 3),
+    }
+
+
+def server_timing(summary):
+    return (f"db;dur={summary['db_ms']:.2f};desc=\"{summary['queries']} queries, {summary['rows']} rows\", "
+            f"db-slowest;dur={summary['slowest_ms']:.2f}")
+
+
+def explain_plan(pool, record):
+    """EXPLAIN QUERY PLAN on a separate pooled connection (the request's may already be released)"""
+    if record.many:
+        return None
+    conn = pool.acquire()
+    try:
+        rows = conn.execute(f'EXPLAIN QUERY PLAN {record.sql}', record.params).fetchall()
+        return [row[3] for row in rows]
+    except sqlite3.Error as e:
+        return [f'unavailable: {e}']
+    finally:
+        conn.close()
+
+
+def init_sql_instrumentation(app, pool):
+    """Switch the pool to instrumented connections and register the request hooks; returns enabled"""
+    enabled = app.config.get('SQL_INSTRUMENTATION')
+    if enabled is None:
+        enabled = os.environ.get('FS25_SQL_INSTRUMENTATION', '').lower() in ('1', 'true', 'on', 'yes')
+    if not enabled:
+        return False
+
+    threshold = float(app.config.get('SLOW_QUERY_MS',
+                                     os.environ.get('FS25_SLOW_QUERY_MS', DEFAULT_SLOW_QUERY_MS))) / 1000
+    log_path = app.config.get('SLOW_QUERY_LOG') or os.environ.get('FS25_SLOW_QUERY_LOG')
+    if log_path:
+        handler = logging.FileHandler(log_path)
+        handler.setFormatter(JsonLineFormatter())
+        logging.getLogger('fs25.sql.slow').addHandler(handler)
+
+    pool.factory = InstrumentedConnection
+    pool.close_all()  # drop idle connections opened with the plain factory
+
+    @app.before_request
+    def start_sql_recording():
+        g._sql_statements = []
+
+    @app.after_request
+    def finish_sql_recording(response):
+        statements = g.pop('_sql_statements', None)  # stop recording before running EXPLAIN
+        if statements is None:
+            return response
+
+        summary = summarize(statements)
+        g.sql_summary = summary
+        response.headers.add('Server-Timing', server_timing(summary))
+
+        for record in statements:
+            if record.seconds >= threshold:
+                slow_log.warning('slow_query', **record.to_dict(),
+                                 plan=lambda record=record: explain_plan(pool, record))
+        return response
+
+    return True
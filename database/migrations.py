@@ -0,0 +1,610 @@
+# Schema migrations
+"""
+Ordered, versioned schema migrations.
+
+Every schema change ships as a numbered entry in MIGRATIONS. migrate() runs
+the pending ones in a single BEGIN IMMEDIATE transaction and records each in
+schema_migrations, so a database is either fully upgraded or left untouched,
+and two workers starting at once cannot both apply the same step. app.py
+calls it before the first request it serves (or run `flask migrate`); the
+setup scripts call it before seeding data.
+
+Never edit a migration that has shipped - add a new one. Migrations 1-3
+reproduce the tables the old setup scripts created with IF NOT EXISTS, so
+databases made by those scripts adopt the numbering without changes.
+
+A migration must do the same thing whatever the code around it looks like
+later. Plain tables are created from DDL written out here; the index pack
+and table_versions install the pack / schema version the migration names,
+and keep every shipped version. The rollup migrations (planting summary,
+reports, prices, search, history totals) still call their module's
+rebuild, whose SQL is unchanged since it shipped: changing one means
+versioning it the same way and adding a migration for the new version.
+
+    python -m database.migrations [--db path] [--status]
+"""
+
+import argparse
+import os
+import sqlite3
+
+DEFAULT_DATABASE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'fs25_farming.db'
+)
+
+MIGRATIONS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+class MigrationError(Exception):
+    """A migration failed; the whole batch has been rolled back"""
+
+
+def split_script(script):
+    """Split a multi-statement SQL script (triggers included) into single statements.
+
+    executescript() commits the caller's open transaction first, so scripts
+    that must run inside one are executed statement by statement instead.
+    """
+    statements, current = [], ''
+    for line in script.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            statements.append(current.strip())
+            current = ''
+    return statements
+
+
+def execute_script(conn, script):
+    for statement in split_script(script):
+        conn.execute(statement)
+
+
+# =====================================================
+# ONLINE SCHEMA CHANGE HELPERS
+# =====================================================
+
+def column_names(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+
+def add_column(conn, table, column, definition):
+    """ALTER TABLE ... ADD COLUMN unless the column already exists (e.g. counter columns)"""
+    if column not in column_names(conn, table):
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+
+def rebuild_table(conn, table, create_sql, select_sql=None):
+    """Recreate a table with a new definition, keeping its rows, indexes and triggers.
+
+    For changes ALTER TABLE cannot make (constraints, column types). create_sql
+    must create a table named ``{table}__new``; select_sql (default: every
+    column the old and new tables share) supplies its rows. Runs inside the
+    migration transaction, so under WAL readers keep seeing the old table
+    until the commit and the app does not have to stop. Foreign keys are
+    switched off by migrate() and checked for the rebuilt table here.
+    """
+    new_table = f'{table}__new'
+    dependents = conn.execute('''
+        SELECT sql FROM sqlite_master
+        WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL
+    ''', (table,)).fetchall()
+
+    conn.execute(create_sql)
+    new_columns = column_names(conn, new_table)
+    if select_sql is None:
+        shared = [c for c in column_names(conn, table) if c in new_columns]
+        select_sql = f"SELECT {', '.join(shared)} FROM {table}"
+        insert_columns = shared
+    else:
+        insert_columns = new_columns
+    conn.execute(f"INSERT INTO {new_table} ({', '.join(insert_columns)}) {select_sql}")
+
+    conn.execute(f'DROP TABLE {table}')
+    conn.execute(f'ALTER TABLE {new_table} RENAME TO {table}')
+    for (sql,) in dependents:
+        conn.execute(sql)
+
+    violations = conn.execute(f'PRAGMA foreign_key_check({table})').fetchall()
+    if violations:
+        raise MigrationError(f'{len(violations)} foreign key violations after rebuilding {table}')
+
+
+# =====================================================
+# MIGRATIONS
+# =====================================================
+
+def _core_tables(conn):
+    execute_script(conn, '''
+        CREATE TABLE IF NOT EXISTS fields (
+            field_id TEXT PRIMARY KEY,
+            field_name TEXT NOT NULL,
+            size_hectares REAL NOT NULL,
+            soil_type TEXT,
+            soil_ph REAL,
+            organic_matter_percent REAL,
+            drainage_rating TEXT,
+            slope_percent REAL,
+            gps_latitude REAL,
+            gps_longitude REAL,
+            purchase_price REAL,
+            purchase_date DATE,
+            current_value REAL,
+            stone_percent REAL,
+            notes TEXT,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS equipment (
+            equipment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            equipment_name TEXT NOT NULL,
+            brand TEXT,
+            model TEXT,
+            category TEXT,
+            purchase_price REAL,
+            purchase_date DATE,
+            current_value REAL,
+            fuel_consumption_per_hour REAL,
+            maintenance_cost_per_hour REAL,
+            total_hours REAL DEFAULT 0,
+            notes TEXT,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS crop_seasons (
+            season_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            field_id TEXT NOT NULL,
+            crop_year INTEGER NOT NULL,
+            season_name TEXT,
+            crop_type TEXT NOT NULL,
+            variety_name TEXT,
+            planting_date DATE,
+            harvest_date DATE,
+            growth_days INTEGER,
+            yield_tonnes_per_ha REAL,
+            quality_percent REAL,
+            weather_impact TEXT,
+            disease_pest_notes TEXT,
+            rotation_benefit_percent REAL,
+            notes TEXT,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (field_id) REFERENCES fields (field_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS field_operations (
+            operation_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            field_id TEXT NOT NULL,
+            season_id INTEGER,
+            operation_date DATE NOT NULL,
+            operation_type TEXT NOT NULL,
+            equipment_id INTEGER,
+            operator_name TEXT,
+            hours_worked REAL,
+            fuel_used_liters REAL,
+            average_speed_kmh REAL,
+            weather_conditions TEXT,
+            soil_moisture_percent REAL,
+            compaction_risk TEXT,
+            quality_rating INTEGER CHECK (quality_rating BETWEEN 1 AND 10),
+            notes TEXT,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (field_id) REFERENCES fields (field_id),
+            FOREIGN KEY (season_id) REFERENCES crop_seasons (season_id),
+            FOREIGN KEY (equipment_id) REFERENCES equipment (equipment_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS weather_events (
+            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            field_id TEXT NOT NULL,
+            season_id INTEGER,
+            event_date DATE NOT NULL,
+            weather_type TEXT NOT NULL,
+            severity TEXT,
+            crop_stage TEXT,
+            damage_percent REAL,
+            yield_impact_percent REAL,
+            quality_impact_percent REAL,
+            recovery_time_days INTEGER,
+            insurance_claim BOOLEAN DEFAULT 0,
+            insurance_amount REAL,
+            mitigation_used TEXT,
+            lessons_learned TEXT,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (field_id) REFERENCES fields (field_id),
+            FOREIGN KEY (season_id) REFERENCES crop_seasons (season_id)
+        );
+    ''')
+
+
+def _storage_tables(conn):
+    execute_script(conn, '''
+        CREATE TABLE IF NOT EXISTS crop_storage (
+            storage_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            crop_name TEXT NOT NULL UNIQUE,
+            crop_category TEXT,
+            quantity_stored REAL DEFAULT 0,
+            storage_capacity REAL DEFAULT 1000,
+            current_market_price REAL DEFAULT 0,
+            sale_location TEXT DEFAULT 'Local Elevator',
+            price_per_unit TEXT DEFAULT 'per tonne',
+            last_price_update DATE,
+            notes TEXT,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS sale_locations (
+            location_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            location_name TEXT NOT NULL,
+            location_type TEXT,
+            distance_km REAL,
+            contact_info TEXT,
+            notes TEXT,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS price_history (
+            price_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            crop_name TEXT NOT NULL,
+            price REAL NOT NULL,
+            sale_location TEXT,
+            price_date DATE NOT NULL,
+            notes TEXT,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+
+
+def _planting_tables(conn):
+    execute_script(conn, '''
+        CREATE TABLE IF NOT EXISTS planting_records (
+            planting_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            field_id TEXT NOT NULL,
+            crop_type TEXT NOT NULL,
+            variety TEXT,
+            planting_date DATE NOT NULL,
+            planting_season TEXT,
+            expected_harvest_date DATE,
+            planted_area_ha REAL,
+
+            -- Costs
+            seed_cost REAL DEFAULT 0,
+            seed_rate TEXT,
+            fertilizer_cost REAL DEFAULT 0,
+            lime_cost REAL DEFAULT 0,
+            labor_cost REAL DEFAULT 0,
+            equipment_cost REAL DEFAULT 0,
+            fuel_cost REAL DEFAULT 0,
+            other_costs REAL DEFAULT 0,
+            total_planting_cost REAL DEFAULT 0,
+            cost_per_hectare REAL DEFAULT 0,
+
+            -- Details
+            planting_method TEXT,
+            soil_temp_c REAL,
+            soil_moisture TEXT,
+            weather_conditions TEXT,
+            operator_name TEXT,
+            notes TEXT,
+
+            -- Status
+            status TEXT DEFAULT 'Active',
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+            FOREIGN KEY (field_id) REFERENCES fields (field_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS field_maintenance (
+            maintenance_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            field_id TEXT NOT NULL,
+            planting_id INTEGER,
+            maintenance_date DATE NOT NULL,
+            maintenance_type TEXT NOT NULL,
+
+            -- Details
+            operation_details TEXT,
+            equipment_used TEXT,
+            operator_name TEXT,
+            hours_worked REAL,
+
+            -- Costs
+            labor_cost REAL DEFAULT 0,
+            equipment_cost REAL DEFAULT 0,
+            material_cost REAL DEFAULT 0,
+            fuel_cost REAL DEFAULT 0,
+            total_cost REAL DEFAULT 0,
+
+            -- Specifics based on type
+            area_covered_ha REAL,
+            product_used TEXT,
+            application_rate TEXT,
+            weather_conditions TEXT,
+            soil_conditions TEXT,
+
+            notes TEXT,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+            FOREIGN KEY (field_id) REFERENCES fields (field_id),
+            FOREIGN KEY (planting_id) REFERENCES planting_records (planting_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS harvest_records (
+            harvest_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            planting_id INTEGER NOT NULL,
+            field_id TEXT NOT NULL,
+            harvest_date DATE NOT NULL,
+            harvest_season TEXT,
+
+            -- Yield Information
+            total_yield_tonnes REAL NOT NULL,
+            yield_per_hectare REAL,
+            harvested_area_ha REAL,
+
+            -- Quality Metrics
+            moisture_percent REAL,
+            quality_grade TEXT,
+            test_weight REAL,
+            protein_percent REAL,
+            damage_percent REAL,
+
+            -- Market Information
+            market_price_per_tonne REAL,
+            price_premium REAL DEFAULT 0,
+            buyer_name TEXT,
+            sale_location TEXT,
+
+            -- Harvest Details
+            harvest_method TEXT,
+            equipment_used TEXT,
+            operator_name TEXT,
+            weather_conditions TEXT,
+
+            -- Costs
+            harvest_labor_cost REAL DEFAULT 0,
+            harvest_equipment_cost REAL DEFAULT 0,
+            harvest_fuel_cost REAL DEFAULT 0,
+            transport_cost REAL DEFAULT 0,
+            drying_cost REAL DEFAULT 0,
+            storage_cost REAL DEFAULT 0,
+            other_harvest_costs REAL DEFAULT 0,
+            total_harvest_cost REAL DEFAULT 0,
+
+            -- Financial Summary (calculated)
+            gross_revenue REAL,
+            total_costs REAL,
+            net_profit REAL,
+            profit_per_hectare REAL,
+            roi_percent REAL,
+            break_even_price REAL,
+
+            notes TEXT,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+            FOREIGN KEY (planting_id) REFERENCES planting_records (planting_id),
+            FOREIGN KEY (field_id) REFERENCES fields (field_id)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_planting_field ON planting_records(field_id);
+        CREATE INDEX IF NOT EXISTS idx_planting_date ON planting_records(planting_date);
+        CREATE INDEX IF NOT EXISTS idx_maintenance_field ON field_maintenance(field_id);
+        CREATE INDEX IF NOT EXISTS idx_maintenance_planting ON field_maintenance(planting_id);
+        CREATE INDEX IF NOT EXISTS idx_harvest_planting ON harvest_records(planting_id);
+        CREATE INDEX IF NOT EXISTS idx_harvest_field ON harvest_records(field_id);
+    ''')
+
+
+def _dashboard_stats_table(conn):
+    execute_script(conn, '''
+        CREATE TABLE IF NOT EXISTS dashboard_stats (
+            stat_year INTEGER PRIMARY KEY,
+            total_fields INTEGER NOT NULL DEFAULT 0,
+            total_area REAL NOT NULL DEFAULT 0,
+            active_seasons INTEGER NOT NULL DEFAULT 0,
+            total_yield REAL NOT NULL DEFAULT 0,
+            weather_events INTEGER NOT NULL DEFAULT 0,
+            recent_operations TEXT NOT NULL DEFAULT '[]',
+            top_fields TEXT NOT NULL DEFAULT '[]',
+            updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+
+
+def _planting_summary(conn):
+    from database import planting
+    planting.rebuild_summary(conn)
+
+
+def _index_pack(version):
+    def install(conn):
+        from database import indexes
+        indexes.install_pack(conn, version)
+    return install
+
+
+def _unique_sale_location_names(conn):
+    # add_location() reports duplicates through IntegrityError and
+    # bulk_add_locations() relies on INSERT OR IGNORE, but the table was
+    # created without the constraint. Keep the oldest row for each name.
+    rebuild_table(conn, 'sale_locations', '''
+        CREATE TABLE sale_locations__new (
+            location_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            location_name TEXT NOT NULL UNIQUE,
+            location_type TEXT,
+            distance_km REAL,
+            contact_info TEXT,
+            notes TEXT,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''', select_sql='''
+        SELECT location_id, location_name, location_type, distance_km,
+               contact_info, notes, created_date
+        FROM sale_locations
+        WHERE location_id IN (SELECT MIN(location_id) FROM sale_locations GROUP BY location_name)
+    ''')
+
+
+def _report_rollups(conn):
+    from database import reports
+    reports.rebuild_rollups(conn)
+
+
+def _table_versions(conn):
+    from database import table_versions
+    table_versions.install(conn, schema=1)
+
+
+def _table_change_times(conn):
+    from database import table_versions
+    table_versions.install(conn, replace_triggers=True, schema=2)
+
+
+def _price_rollups(conn):
+    from database import prices
+    prices.rebuild_rollups(conn)
+
+
+def _search_index(conn):
+    from database import search
+    search.rebuild_index(conn)
+
+
+def _history_totals(conn):
+    from database import history
+    history.rebuild_totals(conn)
+
+
+def _savegame_files(conn):
+    execute_script(conn, '''
+        CREATE TABLE IF NOT EXISTS savegame_files (
+            savegame TEXT NOT NULL,
+            file_name TEXT NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            modified_ns INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            synced_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (savegame, file_name)
+        );
+    ''')
+
+
+def _savegame_sync_status(conn):
+    execute_script(conn, '''
+        CREATE TABLE IF NOT EXISTS savegame_sync_status (
+            savegame TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+
+
+def _savegame_field_state(conn):
+    # Ownership and crop as of the last savegame sync; NULL until a sync sees the field
+    add_column(conn, 'fields', 'savegame_owned', 'INTEGER')
+    add_column(conn, 'fields', 'savegame_crop', 'TEXT')
+    add_column(conn, 'fields', 'savegame_growth_state', 'INTEGER')
+    add_column(conn, 'fields', 'savegame_synced_date', 'TIMESTAMP')
+
+
+# (version, name, function) - append only
+MIGRATIONS = (
+    (1, 'core tables', _core_tables),
+    (2, 'crop storage tables', _storage_tables),
+    (3, 'planting and harvest tables', _planting_tables),
+    (4, 'dashboard stats table', _dashboard_stats_table),
+    (5, 'planting summary table and triggers', _planting_summary),
+    (6, 'index pack v1', _index_pack(1)),
+    (7, 'unique sale location names', _unique_sale_location_names),
+    (8, 'report rollup tables and triggers', _report_rollups),
+    (9, 'table version counters', _table_versions),
+    (10, 'table change timestamps', _table_change_times),
+    (11, 'index pack v2', _index_pack(2)),
+    (12, 'price rollup table and triggers', _price_rollups),
+    (13, 'full-text search index and triggers', _search_index),
+    (14, 'index pack v3', _index_pack(3)),
+    (15, 'history totals table and triggers', _history_totals),
+    (16, 'savegame file state', _savegame_files),
+    (17, 'savegame sync status', _savegame_sync_status),
+    (18, 'savegame field state', _savegame_field_state),
+)
+
+
+# =====================================================
+# RUNNER
+# =====================================================
+
+def applied_versions(conn):
+    conn.execute(MIGRATIONS_TABLE_SQL)
+    return {row[0] for row in conn.execute('SELECT version FROM schema_migrations')}
+
+
+def pending_migrations(conn):
+    applied = applied_versions(conn)
+    return [m for m in MIGRATIONS if m[0] not in applied]
+
+
+def migrate(conn):
+    """Apply every pending migration in one transaction; returns the (version, name) pairs applied"""
+    if conn.in_transaction:
+        conn.commit()
+
+    # Table rebuilds drop and recreate referenced tables; PRAGMA foreign_keys
+    # is ignored inside a transaction, so switch it off around the batch.
+    foreign_keys = conn.execute('PRAGMA foreign_keys').fetchone()[0]
+    conn.execute('PRAGMA foreign_keys = OFF')
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Read inside the write lock so concurrent workers never apply a step twice
+            pending = pending_migrations(conn)
+            for version, name, apply in pending:
+                try:
+                    apply(conn)
+                except sqlite3.Error as e:
+                    raise MigrationError(f'migration {version} ({name}) failed: {e}') from e
+                conn.execute('INSERT INTO schema_migrations (version, name) VALUES (?, ?)',
+                             (version, name))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+
+    if pending:
+        conn.execute('PRAGMA optimize')
+    return [(version, name) for version, name, _ in pending]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply pending schema migrations')
+    parser.add_argument('--db', default=DEFAULT_DATABASE_PATH)
+    parser.add_argument('--status', action='store_true', help='list pending migrations without applying')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    if args.status:
+        pending = pending_migrations(conn)
+        conn.commit()
+        latest = MIGRATIONS[-1][0]
+        print(f"📋 {latest - len(pending)}/{latest} migrations applied")
+        for version, name, _ in pending:
+            print(f"   pending: {version:04d} {name}")
+    else:
+        applied = migrate(conn)
+        for version, name in applied:
+            print(f"✅ {version:04d} {name}")
+        if not applied:
+            print("✅ Schema already up to date")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# Keyset pagination helpers
+"""
+Opaque cursors for keyset ("seek") pagination.
+
+A cursor carries the sort-key values of the last row on a page; the next page
+asks for rows strictly after that key, so every page costs the same no matter
+how deep it is.
+"""
+
+import base64
+import json
+from datetime import date
+
+
+def encode_cursor(*values):
+    raw = json.dumps(values).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor, size):
+    """Decode a cursor into a list of `size` key values, or raise ValueError"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def seek_condition(columns, directions):
+    """
+    SQL for "row comes after the cursor" over a multi-column sort key, e.g.
+    (a < ? OR (a = ? AND b > ?)) for ORDER BY a DESC, b ASC.
+    Returns the SQL and the order in which cursor values must be bound.
+    """
+    clauses, bind_order = [], []
+    for i, column in enumerate(columns):
+        parts = [f'{prior} = ?' for prior in columns[:i]]
+        parts.append(f"{column} {'>' if directions[i] == 'ASC' else '<'} ?")
+        clauses.append('(' + ' AND '.join(parts) + ')')
+        bind_order.extend(range(i + 1))
+    return '(' + ' OR '.join(clauses) + ')', bind_order
+
+
+def bind_cursor(values, bind_order):
+    return [values[i] for i in bind_order]
+
+
+def iso_date(value, name):
+    try:
+        return date.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a YYYY-MM-DD date') from None
+
+
+def date_range(column, start=None, end=None):
+    """
+    Conditions and params for an inclusive start..end date filter on column.
+    Raises ValueError unless both are YYYY-MM-DD dates (or empty).
+    """
+    conditions, params = [], []
+    if start:
+        conditions.append(f'{column} >= ?')
+        params.append(iso_date(start, 'start'))
+    if end:
+        # Dates may carry a time part; compare against the next day
+        conditions.append(f"{column} < date(?, '+1 day')")
+        params.append(iso_date(end, 'end'))
+    return conditions, params
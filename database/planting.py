@@ -0,0 +1,141 @@
+# Planting dashboard queries
+"""
+Paged planting records with their maintenance / harvest counts, plus the
+dashboard header totals.
+
+The counts are aggregated once per page (only for the plantings on that page)
+instead of running two correlated subqueries per row, and the header totals
+live in a one-row planting_summary table kept current by triggers, so the
+dashboard costs the same with 100 or 100,000 plantings on record.
+"""
+
+import sqlite3
+
+from database.migrations import execute_script
+from database.pagination import decode_cursor, encode_cursor
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+SUMMARY_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS planting_summary (
+        summary_id INTEGER PRIMARY KEY CHECK (summary_id = 1),
+        total_plantings INTEGER NOT NULL DEFAULT 0,
+        active_plantings INTEGER NOT NULL DEFAULT 0,
+        active_area_ha REAL NOT NULL DEFAULT 0,
+        total_costs REAL NOT NULL DEFAULT 0
+    );
+
+    CREATE TRIGGER IF NOT EXISTS trg_planting_summary_insert
+    AFTER INSERT ON planting_records
+    BEGIN
+        UPDATE planting_summary SET
+            total_plantings = total_plantings + 1,
+            active_plantings = active_plantings + (NEW.status IS 'Active'),
+            active_area_ha = active_area_ha + CASE WHEN NEW.status IS 'Active' THEN COALESCE(NEW.planted_area_ha, 0) ELSE 0 END,
+            total_costs = total_costs + COALESCE(NEW.total_planting_cost, 0)
+        WHERE summary_id = 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_planting_summary_delete
+    AFTER DELETE ON planting_records
+    BEGIN
+        UPDATE planting_summary SET
+            total_plantings = total_plantings - 1,
+            active_plantings = active_plantings - (OLD.status IS 'Active'),
+            active_area_ha = active_area_ha - CASE WHEN OLD.status IS 'Active' THEN COALESCE(OLD.planted_area_ha, 0) ELSE 0 END,
+            total_costs = total_costs - COALESCE(OLD.total_planting_cost, 0)
+        WHERE summary_id = 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_planting_summary_update
+    AFTER UPDATE OF status, planted_area_ha, total_planting_cost ON planting_records
+    BEGIN
+        UPDATE planting_summary SET
+            active_plantings = active_plantings - (OLD.status IS 'Active') + (NEW.status IS 'Active'),
+            active_area_ha = active_area_ha
+                - CASE WHEN OLD.status IS 'Active' THEN COALESCE(OLD.planted_area_ha, 0) ELSE 0 END
+                + CASE WHEN NEW.status IS 'Active' THEN COALESCE(NEW.planted_area_ha, 0) ELSE 0 END,
+            total_costs = total_costs - COALESCE(OLD.total_planting_cost, 0) + COALESCE(NEW.total_planting_cost, 0)
+        WHERE summary_id = 1;
+    END;
+'''
+
+
+def rebuild_summary(conn):
+    """Create the summary table and triggers if needed and recompute the totals"""
+    execute_script(conn, SUMMARY_SCHEMA)
+    conn.execute('''
+        INSERT OR REPLACE INTO planting_summary (summary_id, total_plantings, active_plantings,
+                                                 active_area_ha, total_costs)
+        SELECT 1,
+               COUNT(*),
+               COALESCE(SUM(status IS 'Active'), 0),
+               COALESCE(SUM(CASE WHEN status IS 'Active' THEN planted_area_ha END), 0),
+               COALESCE(SUM(total_planting_cost), 0)
+        FROM planting_records
+    ''')
+
+
+def get_summary(conn):
+    try:
+        row = conn.execute('SELECT * FROM planting_summary WHERE summary_id = 1').fetchone()
+    except sqlite3.OperationalError:
+        row = None  # not created yet
+
+    if row is None:
+        rebuild_summary(conn)
+        conn.commit()
+        row = conn.execute('SELECT * FROM planting_summary WHERE summary_id = 1').fetchone()
+    return dict(row)
+
+
+def query_planting_page(conn, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Return (plantings, next_cursor), newest planting first"""
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    where, params = '', []
+    if cursor:
+        # One row-value range that idx_planting_date (planting_date, then the
+        # rowid = planting_id) is walked backwards from, as in
+        # database/history.py; the OR form of seek_condition() is planned as
+        # a filter on a full scan
+        where = 'WHERE (planting_date, planting_id) < (?, ?)'
+        params = decode_cursor(cursor, 2)
+
+    # Page planting_records alone, then join fields and the counts for that
+    # page only: joining fields inside lets the planner drive the query from
+    # fields and sort every planting
+    rows = conn.execute(f'''
+        WITH page AS (
+            SELECT * FROM planting_records
+            {where}
+            ORDER BY planting_date DESC, planting_id DESC
+            LIMIT ?
+        )
+        SELECT page.*, f.field_name, f.size_hectares as field_size,
+               COALESCE(m.maintenance_count, 0) as maintenance_count,
+               COALESCE(h.harvest_count, 0) as harvest_count
+        FROM page
+        LEFT JOIN fields f ON f.field_id = page.field_id
+        LEFT JOIN (
+            SELECT planting_id, COUNT(*) as maintenance_count
+            FROM field_maintenance
+            WHERE planting_id IN (SELECT planting_id FROM page)
+            GROUP BY planting_id
+        ) m ON m.planting_id = page.planting_id
+        LEFT JOIN (
+            SELECT planting_id, COUNT(*) as harvest_count
+            FROM harvest_records
+            WHERE planting_id IN (SELECT planting_id FROM page)
+            GROUP BY planting_id
+        ) h ON h.planting_id = page.planting_id
+        ORDER BY page.planting_date DESC, page.planting_id DESC
+    ''', (*params, limit + 1)).fetchall()
+
+    plantings = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = plantings[-1]
+        next_cursor = encode_cursor(last['planting_date'], last['planting_id'])
+    return plantings, next_cursor
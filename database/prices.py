@@ -0,0 +1,251 @@
+# Price time series
+"""
+OHLC rollups of price_history and range queries over them.
+
+price_rollup holds one row per (crop_name, resolution, bucket_start) for
+three resolutions: calendar days, weeks starting on Monday, and seasons
+(meteorological: spring starts 1 March, summer 1 June, autumn 1 September,
+winter 1 December). Each row has open, high, low and close price, the sum
+and count for the average, and the (price_date, price_id) of the opening
+and closing record so a new record can move them.
+
+Triggers keep it current: an inserted price is merged into its three
+buckets in place; an update or delete recomputes just the affected buckets
+from price_history, which the (crop_name, price_date) index turns into a
+short range scan.
+
+price_series() picks the finest resolution that fits the requested range
+into max_points buckets, so a chart of several years of prices for every
+crop reads a few hundred rollup rows rather than the raw history.
+"""
+
+from datetime import date
+
+from database.migrations import execute_script
+
+RESOLUTIONS = ('day', 'week', 'season')
+DEFAULT_MAX_POINTS = 400
+
+# resolution -> (bucket start for a date expression, modifier to the next bucket, typical days)
+BUCKETS = {
+    'day': ('date({0})', '+1 day', 1),
+    'week': ("date({0}, '-6 days', 'weekday 1')", '+7 days', 7),
+    'season': ("date({0}, 'start of month', "
+               "printf('-%d months', CAST(strftime('%m', {0}) AS INTEGER) % 3))", '+3 months', 91),
+}
+
+SEASON_NAMES = {3: 'Spring', 6: 'Summer', 9: 'Autumn', 12: 'Winter'}
+
+ROLLUP_COLUMNS = ('crop_name, resolution, bucket_start, open_price, high_price, low_price, close_price, '
+                  'price_sum, price_count, open_date, open_id, close_date, close_id')
+
+
+def _bucket(resolution, expr):
+    return BUCKETS[resolution][0].format(expr)
+
+
+def _group_sql(resolution, where=''):
+    """Recompute rollup rows of one resolution from the price_history rows matching `where`"""
+    bucket = _bucket(resolution, 'price_date')
+    return f'''
+        INSERT INTO price_rollup ({ROLLUP_COLUMNS})
+        SELECT crop_name, '{resolution}', bucket_start,
+               MAX(CASE WHEN first_rank = 1 THEN price END), MAX(price), MIN(price),
+               MAX(CASE WHEN last_rank = 1 THEN price END),
+               SUM(price), COUNT(*),
+               MAX(CASE WHEN first_rank = 1 THEN price_date END),
+               MAX(CASE WHEN first_rank = 1 THEN price_id END),
+               MAX(CASE WHEN last_rank = 1 THEN price_date END),
+               MAX(CASE WHEN last_rank = 1 THEN price_id END)
+        FROM (
+            SELECT crop_name, price_id, price, price_date, {bucket} AS bucket_start,
+                   ROW_NUMBER() OVER (PARTITION BY crop_name, {bucket}
+                                      ORDER BY price_date, price_id) AS first_rank,
+                   ROW_NUMBER() OVER (PARTITION BY crop_name, {bucket}
+                                      ORDER BY price_date DESC, price_id DESC) AS last_rank
+            FROM price_history
+            {where}
+        )
+        GROUP BY crop_name, bucket_start'''
+
+
+def _recompute(row):
+    statements = []
+    for resolution in RESOLUTIONS:
+        bucket = _bucket(resolution, f'{row}.price_date')
+        step = BUCKETS[resolution][1]
+        statements.append(f'''
+        DELETE FROM price_rollup
+        WHERE crop_name = {row}.crop_name AND resolution = '{resolution}' AND bucket_start = {bucket};''')
+        statements.append(_group_sql(resolution, f'''
+            WHERE crop_name = {row}.crop_name
+              AND price_date >= {bucket} AND price_date < date({bucket}, '{step}')''') + ';')
+    return ''.join(statements)
+
+
+def _add_new():
+    statements = []
+    for resolution in RESOLUTIONS:
+        statements.append(f'''
+        INSERT INTO price_rollup ({ROLLUP_COLUMNS})
+        VALUES (NEW.crop_name, '{resolution}', {_bucket(resolution, 'NEW.price_date')},
+                NEW.price, NEW.price, NEW.price, NEW.price, NEW.price, 1,
+                NEW.price_date, NEW.price_id, NEW.price_date, NEW.price_id)
+        ON CONFLICT (crop_name, resolution, bucket_start) DO UPDATE SET
+            open_price = CASE WHEN (excluded.open_date, excluded.open_id) < (open_date, open_id)
+                              THEN excluded.open_price ELSE open_price END,
+            open_date = CASE WHEN (excluded.open_date, excluded.open_id) < (open_date, open_id)
+                             THEN excluded.open_date ELSE open_date END,
+            open_id = CASE WHEN (excluded.open_date, excluded.open_id) < (open_date, open_id)
+                           THEN excluded.open_id ELSE open_id END,
+            close_price = CASE WHEN (excluded.close_date, excluded.close_id) > (close_date, close_id)
+                               THEN excluded.close_price ELSE close_price END,
+            close_date = CASE WHEN (excluded.close_date, excluded.close_id) > (close_date, close_id)
+                              THEN excluded.close_date ELSE close_date END,
+            close_id = CASE WHEN (excluded.close_date, excluded.close_id) > (close_date, close_id)
+                            THEN excluded.close_id ELSE close_id END,
+            high_price = MAX(high_price, excluded.high_price),
+            low_price = MIN(low_price, excluded.low_price),
+            price_sum = price_sum + excluded.price_sum,
+            price_count = price_count + excluded.price_count;''')
+    return ''.join(statements)
+
+
+ROLLUP_SCHEMA = f'''
+    CREATE TABLE IF NOT EXISTS price_rollup (
+        crop_name TEXT NOT NULL,
+        resolution TEXT NOT NULL,
+        bucket_start DATE NOT NULL,
+        open_price REAL NOT NULL,
+        high_price REAL NOT NULL,
+        low_price REAL NOT NULL,
+        close_price REAL NOT NULL,
+        price_sum REAL NOT NULL,
+        price_count INTEGER NOT NULL,
+        open_date DATE NOT NULL,
+        open_id INTEGER NOT NULL,
+        close_date DATE NOT NULL,
+        close_id INTEGER NOT NULL,
+        PRIMARY KEY (crop_name, resolution, bucket_start)
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER IF NOT EXISTS trg_price_rollup_insert
+    AFTER INSERT ON price_history
+    BEGIN{_add_new()}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_price_rollup_update
+    AFTER UPDATE OF crop_name, price, price_date ON price_history
+    BEGIN{_recompute('OLD')}{_recompute('NEW')}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_price_rollup_delete
+    AFTER DELETE ON price_history
+    BEGIN{_recompute('OLD')}
+    END;
+'''
+
+
+def rebuild_rollups(conn):
+    """Create the rollup table and triggers if needed and recompute it from price_history"""
+    execute_script(conn, ROLLUP_SCHEMA)
+    conn.execute('DELETE FROM price_rollup')
+    for resolution in RESOLUTIONS:
+        conn.execute(_group_sql(resolution))
+
+
+# =====================================================
+# RANGE QUERIES
+# =====================================================
+
+def bucket_label(resolution, bucket_start):
+    """Human label for a bucket: the date, 'Week of <date>' or 'Spring 2025'"""
+    if resolution == 'season':
+        start = date.fromisoformat(bucket_start)
+        return f'{SEASON_NAMES[start.month]} {start.year}'
+    if resolution == 'week':
+        return f'Week of {bucket_start}'
+    return bucket_start
+
+
+def choose_resolution(start, end, max_points=DEFAULT_MAX_POINTS):
+    """The finest resolution with at most max_points buckets between two ISO dates"""
+    days = (date.fromisoformat(end) - date.fromisoformat(start)).days + 1
+    for resolution in RESOLUTIONS:
+        if days / BUCKETS[resolution][2] <= max_points:
+            return resolution
+    return RESOLUTIONS[-1]
+
+
+def price_range(conn, crop_names=None):
+    """(first, last) price_date on record, optionally for some crops; (None, None) if empty"""
+    where, params = '', []
+    if crop_names:
+        where = f"WHERE crop_name IN ({', '.join('?' * len(crop_names))})"
+        params = list(crop_names)
+    row = conn.execute(f'SELECT MIN(price_date), MAX(price_date) FROM price_history {where}',
+                       params).fetchone()
+    return row[0], row[1]
+
+
+def price_series(conn, crop_names=None, start=None, end=None, resolution=None,
+                 max_points=DEFAULT_MAX_POINTS):
+    """{'resolution', 'start', 'end', 'series': {crop_name: [bucket, ...]}} for a date range.
+
+    Each bucket has bucket_start, label, open, high (max), low (min), close
+    (last), avg and count. Buckets overlapping start or end are included
+    whole. Without a resolution the finest one giving at most max_points
+    buckets per crop is used.
+    """
+    if resolution is not None and resolution not in RESOLUTIONS:
+        raise ValueError(f'Unknown resolution: {resolution}')
+    if start is None or end is None:
+        first, last = price_range(conn, crop_names)
+        start = start or first
+        end = end or last
+    if start is None or end is None:
+        return {'resolution': resolution or RESOLUTIONS[0], 'start': start, 'end': end, 'series': {}}
+    start, end = date.fromisoformat(start).isoformat(), date.fromisoformat(end).isoformat()
+    if start > end:
+        raise ValueError('start must not be after end')
+    resolution = resolution or choose_resolution(start, end, max_points)
+
+    first_bucket = f"(SELECT {_bucket(resolution, 'day')} FROM (SELECT ? AS day))"
+    where = [f'resolution = ? AND bucket_start BETWEEN {first_bucket} AND ?']
+    params = [resolution, start, end]
+    if crop_names:
+        where.append(f"crop_name IN ({', '.join('?' * len(crop_names))})")
+        params.extend(crop_names)
+
+    rows = conn.execute(f'''
+        SELECT crop_name, bucket_start, open_price, high_price, low_price, close_price,
+               price_sum / price_count AS avg_price, price_count
+        FROM price_rollup
+        WHERE {' AND '.join(where)}
+        ORDER BY crop_name, bucket_start
+    ''', params).fetchall()
+
+    series = {}
+    for row in rows:
+        series.setdefault(row['crop_name'], []).append({
+            'bucket_start': row['bucket_start'],
+            'label': bucket_label(resolution, row['bucket_start']),
+            'open': row['open_price'],
+            'high': row['high_price'],
+            'low': row['low_price'],
+            'close': row['close_price'],
+            'avg': row['avg_price'],
+            'count': row['price_count'],
+        })
+    return {'resolution': resolution, 'start': start, 'end': end, 'series': series}
+
+
+def recent_prices(conn, crop_name, limit=50):
+    """Latest raw price records of one crop, newest first"""
+    return conn.execute('''
+        SELECT price, sale_location, price_date, notes
+        FROM price_history
+        WHERE crop_name = ?
+        ORDER BY price_date DESC, price_id DESC
+        LIMIT ?
+    ''', (crop_name, limit)).fetchall()
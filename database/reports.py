@@ -0,0 +1,373 @@
+# Reports dashboard rollups
+"""
+Pre-aggregated statistics behind the reports dashboard.
+
+report_season_rollup is the base of the store: one row per (field_id,
+crop_type, crop_year) with count, sum, sum of squares, min and max of yield
+and quality for harvested seasons (yield recorded). report_field_rollup and
+report_crop_rollup roll it up per field and per crop type, and
+report_weather_rollup holds the same moments per weather type for damage
+and yield impact.
+
+Triggers keep everything current:
+
+* a new harvested season, a season being harvested (yield going from NULL
+  to a value) and a new weather event are added to their row in place;
+* any other update or a delete recomputes just the affected row(s), because
+  min and max cannot be subtracted out: season rows from crop_seasons, field
+  and crop rows from the season rollup.
+
+The dashboard therefore reads a few hundred rollup rows however many years
+of history are on record, and mean, variance and standard deviation come
+straight from the moments (see _moments()).
+"""
+
+import math
+import sqlite3
+
+from database.migrations import execute_script
+
+FIELD_REPORT_LIMIT = 50
+
+STAT_PREFIXES = ('yield', 'quality')
+
+# Columns shared by the season, field and crop rollups
+ROLLUP_STATS = ('seasons, '
+                'yield_count, yield_sum, yield_sumsq, yield_min, yield_max, '
+                'quality_count, quality_sum, quality_sumsq, quality_min, quality_max, '
+                'growth_days_count, growth_days_sum')
+
+WEATHER_COLUMNS = ('weather_type, events, insurance_claims, '
+                   'damage_count, damage_sum, damage_sumsq, damage_min, damage_max, '
+                   'impact_count, impact_sum, impact_sumsq, impact_min, impact_max')
+
+
+# Count, sum, sum of squares, min and max of one nullable column
+def _stat_columns(prefix):
+    return f'''
+        {prefix}_count INTEGER NOT NULL DEFAULT 0,
+        {prefix}_sum REAL NOT NULL DEFAULT 0,
+        {prefix}_sumsq REAL NOT NULL DEFAULT 0,
+        {prefix}_min REAL,
+        {prefix}_max REAL'''
+
+
+def _stat_select(expr):
+    return (f'COUNT({expr}), COALESCE(SUM({expr}), 0), COALESCE(SUM({expr} * {expr}), 0), '
+            f'MIN({expr}), MAX({expr})')
+
+
+def _stat_values(expr):
+    return f'{expr} IS NOT NULL, COALESCE({expr}, 0), COALESCE({expr} * {expr}, 0), {expr}, {expr}'
+
+
+def _stat_merge(prefix):
+    # Scalar MIN()/MAX() return NULL if either side is NULL, so fall back to the other side
+    return f'''
+            {prefix}_count = {prefix}_count + excluded.{prefix}_count,
+            {prefix}_sum = {prefix}_sum + excluded.{prefix}_sum,
+            {prefix}_sumsq = {prefix}_sumsq + excluded.{prefix}_sumsq,
+            {prefix}_min = MIN(COALESCE({prefix}_min, excluded.{prefix}_min), COALESCE(excluded.{prefix}_min, {prefix}_min)),
+            {prefix}_max = MAX(COALESCE({prefix}_max, excluded.{prefix}_max), COALESCE(excluded.{prefix}_max, {prefix}_max))'''
+
+
+def _rollup_merge():
+    return ('seasons = seasons + excluded.seasons,'
+            + ','.join(_stat_merge(prefix) for prefix in STAT_PREFIXES) + ''',
+            growth_days_count = growth_days_count + excluded.growth_days_count,
+            growth_days_sum = growth_days_sum + excluded.growth_days_sum''')
+
+
+def _is_extreme(column):
+    return column.endswith(('_min', '_max'))
+
+
+ROLLUP_TABLE_COLUMNS = ('''
+        seasons INTEGER NOT NULL DEFAULT 0,''' + ','.join(_stat_columns(p) for p in STAT_PREFIXES) + ''',
+        growth_days_count INTEGER NOT NULL DEFAULT 0,
+        growth_days_sum REAL NOT NULL DEFAULT 0''')
+
+
+# =====================================================
+# SEASON ROLLUP (from crop_seasons)
+# =====================================================
+
+def _season_group_sql(where):
+    return f'''
+        INSERT INTO report_season_rollup (field_id, crop_type, crop_year, {ROLLUP_STATS})
+        SELECT field_id, crop_type, crop_year, COUNT(*),
+               {_stat_select('yield_tonnes_per_ha')},
+               {_stat_select('quality_percent')},
+               COUNT(growth_days), COALESCE(SUM(growth_days), 0)
+        FROM crop_seasons
+        WHERE yield_tonnes_per_ha IS NOT NULL {where}
+        GROUP BY field_id, crop_type, crop_year'''
+
+
+def _season_recompute(row):
+    key = f'field_id = {row}.field_id AND crop_type = {row}.crop_type AND crop_year = {row}.crop_year'
+    return f'''
+        DELETE FROM report_season_rollup WHERE {key};
+        {_season_group_sql(f'AND {key}')};'''
+
+
+_SEASON_ADD_NEW = f'''
+        INSERT INTO report_season_rollup (field_id, crop_type, crop_year, {ROLLUP_STATS})
+        VALUES (NEW.field_id, NEW.crop_type, NEW.crop_year, 1,
+                {_stat_values('NEW.yield_tonnes_per_ha')},
+                {_stat_values('NEW.quality_percent')},
+                NEW.growth_days IS NOT NULL, COALESCE(NEW.growth_days, 0))
+        ON CONFLICT (field_id, crop_type, crop_year) DO UPDATE SET {_rollup_merge()};'''
+
+# A season being harvested: it had no yield, so it is not in the rollup yet
+_SEASON_HARVESTED = '''
+        OLD.yield_tonnes_per_ha IS NULL
+        AND OLD.field_id IS NEW.field_id AND OLD.crop_type IS NEW.crop_type AND OLD.crop_year IS NEW.crop_year'''
+
+
+# =====================================================
+# FIELD AND CROP ROLLUPS (from report_season_rollup)
+# =====================================================
+
+LEVELS = (('report_field_rollup', 'field_id'), ('report_crop_rollup', 'crop_type'))
+
+
+def _level_group_sql(table, key, where=''):
+    aggregates = ', '.join((f'MIN({column})' if column.endswith('_min') else f'MAX({column})')
+                           if _is_extreme(column) else f'SUM({column})'
+                           for column in ROLLUP_STATS.split(', '))
+    return f'''
+        INSERT INTO {table} ({key}, {ROLLUP_STATS})
+        SELECT {key}, {aggregates}
+        FROM report_season_rollup
+        {where}
+        GROUP BY {key}'''
+
+
+def _level_add(table, key, delta):
+    """Upsert a season row's contribution (delta() of each additive column) into its field / crop row"""
+    values = ', '.join(f'NEW.{column}' if _is_extreme(column) else delta(column)
+                       for column in ROLLUP_STATS.split(', '))
+    return f'''
+        INSERT INTO {table} ({key}, {ROLLUP_STATS})
+        VALUES (NEW.{key}, {values})
+        ON CONFLICT ({key}) DO UPDATE SET {_rollup_merge()};'''
+
+
+def _level_recompute(table, key):
+    return f'''
+        DELETE FROM {table} WHERE {key} = OLD.{key};
+        {_level_group_sql(table, key, f'WHERE {key} = OLD.{key}')};'''
+
+
+def _level_triggers():
+    inserted = ''.join(_level_add(table, key, lambda column: f'NEW.{column}') for table, key in LEVELS)
+    # Season rows are only updated in place by the upserts above, which only
+    # ever add to them, so NEW - OLD is exactly the added contribution
+    updated = ''.join(_level_add(table, key, lambda column: f'NEW.{column} - OLD.{column}')
+                      for table, key in LEVELS)
+    deleted = ''.join(_level_recompute(table, key) for table, key in LEVELS)
+    return f'''
+    CREATE TRIGGER IF NOT EXISTS trg_report_level_insert
+    AFTER INSERT ON report_season_rollup
+    BEGIN{inserted}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_report_level_update
+    AFTER UPDATE ON report_season_rollup
+    BEGIN{updated}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_report_level_delete
+    AFTER DELETE ON report_season_rollup
+    BEGIN{deleted}
+    END;
+'''
+
+
+# =====================================================
+# WEATHER ROLLUP (from weather_events)
+# =====================================================
+
+def _weather_group_sql(where):
+    return f'''
+        INSERT INTO report_weather_rollup ({WEATHER_COLUMNS})
+        SELECT weather_type, COUNT(*), COALESCE(SUM(insurance_claim IS 1), 0),
+               {_stat_select('damage_percent')},
+               {_stat_select('yield_impact_percent')}
+        FROM weather_events
+        {where}
+        GROUP BY weather_type'''
+
+
+def _weather_recompute(row):
+    return f'''
+        DELETE FROM report_weather_rollup WHERE weather_type = {row}.weather_type;
+        {_weather_group_sql(f'WHERE weather_type = {row}.weather_type')};'''
+
+
+ROLLUP_SCHEMA = f'''
+    CREATE TABLE IF NOT EXISTS report_season_rollup (
+        field_id TEXT NOT NULL,
+        crop_type TEXT NOT NULL,
+        crop_year INTEGER NOT NULL,{ROLLUP_TABLE_COLUMNS},
+        PRIMARY KEY (field_id, crop_type, crop_year)
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_report_season_crop ON report_season_rollup (crop_type);
+
+    CREATE TABLE IF NOT EXISTS report_field_rollup (
+        field_id TEXT PRIMARY KEY,{ROLLUP_TABLE_COLUMNS}
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS report_crop_rollup (
+        crop_type TEXT PRIMARY KEY,{ROLLUP_TABLE_COLUMNS}
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS report_weather_rollup (
+        weather_type TEXT PRIMARY KEY,
+        events INTEGER NOT NULL DEFAULT 0,
+        insurance_claims INTEGER NOT NULL DEFAULT 0,{_stat_columns('damage')},{_stat_columns('impact')}
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER IF NOT EXISTS trg_report_season_insert
+    AFTER INSERT ON crop_seasons
+    WHEN NEW.yield_tonnes_per_ha IS NOT NULL
+    BEGIN{_SEASON_ADD_NEW}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_report_season_harvest
+    AFTER UPDATE OF field_id, crop_type, crop_year, yield_tonnes_per_ha, quality_percent, growth_days
+    ON crop_seasons
+    WHEN NEW.yield_tonnes_per_ha IS NOT NULL AND {_SEASON_HARVESTED}
+    BEGIN{_SEASON_ADD_NEW}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_report_season_update
+    AFTER UPDATE OF field_id, crop_type, crop_year, yield_tonnes_per_ha, quality_percent, growth_days
+    ON crop_seasons
+    WHEN NOT (NEW.yield_tonnes_per_ha IS NOT NULL AND {_SEASON_HARVESTED})
+         AND (OLD.yield_tonnes_per_ha IS NOT NULL OR NEW.yield_tonnes_per_ha IS NOT NULL)
+    BEGIN{_season_recompute('OLD')}{_season_recompute('NEW')}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_report_season_delete
+    AFTER DELETE ON crop_seasons
+    WHEN OLD.yield_tonnes_per_ha IS NOT NULL
+    BEGIN{_season_recompute('OLD')}
+    END;
+{_level_triggers()}
+    CREATE TRIGGER IF NOT EXISTS trg_report_weather_insert
+    AFTER INSERT ON weather_events
+    BEGIN
+        INSERT INTO report_weather_rollup ({WEATHER_COLUMNS})
+        VALUES (NEW.weather_type, 1, NEW.insurance_claim IS 1,
+                {_stat_values('NEW.damage_percent')},
+                {_stat_values('NEW.yield_impact_percent')})
+        ON CONFLICT (weather_type) DO UPDATE SET
+            events = events + 1,
+            insurance_claims = insurance_claims + excluded.insurance_claims,{_stat_merge('damage')},{_stat_merge('impact')};
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_report_weather_update
+    AFTER UPDATE OF weather_type, damage_percent, yield_impact_percent, insurance_claim ON weather_events
+    BEGIN{_weather_recompute('OLD')}{_weather_recompute('NEW')}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_report_weather_delete
+    AFTER DELETE ON weather_events
+    BEGIN{_weather_recompute('OLD')}
+    END;
+'''
+
+
+def rebuild_rollups(conn):
+    """Create the rollup tables and triggers if needed and recompute them from the base tables"""
+    execute_script(conn, ROLLUP_SCHEMA)
+    # Refilling the season rollup would fire the level triggers once per row;
+    # the level tables are recomputed from it in one pass instead
+    conn.execute('DROP TRIGGER trg_report_level_insert')
+    conn.execute('DROP TRIGGER trg_report_level_delete')
+    conn.execute('DELETE FROM report_season_rollup')
+    conn.execute(_season_group_sql(''))
+    for table, key in LEVELS:
+        conn.execute(f'DELETE FROM {table}')
+        conn.execute(_level_group_sql(table, key))
+    execute_script(conn, _level_triggers())
+
+    conn.execute('DELETE FROM report_weather_rollup')
+    conn.execute(_weather_group_sql(''))
+
+
+# =====================================================
+# DASHBOARD QUERIES
+# =====================================================
+
+def _moments(count, total, sumsq):
+    """(mean, sample variance, standard deviation) from count, sum and sum of squares"""
+    if not count:
+        return None, None, None
+    mean = total / count
+    if count < 2:
+        return mean, None, None
+    variance = max((sumsq - total * total / count) / (count - 1), 0.0)  # clamp float cancellation
+    return mean, variance, math.sqrt(variance)
+
+
+def _with_moments(row, *prefixes):
+    result = dict(row)
+    for prefix in prefixes:
+        mean, variance, stddev = _moments(result[f'{prefix}_count'], result[f'{prefix}_sum'],
+                                          result[f'{prefix}_sumsq'])
+        result[f'avg_{prefix}'] = mean
+        result[f'{prefix}_variance'] = variance
+        result[f'{prefix}_stddev'] = stddev
+    return result
+
+
+def _read(conn, sql, params=()):
+    try:
+        return conn.execute(sql, params).fetchall()
+    except sqlite3.OperationalError:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'report_season_rollup'").fetchone():
+            raise
+        rebuild_rollups(conn)  # not created yet
+        conn.commit()
+        return conn.execute(sql, params).fetchall()
+
+
+def field_performance(conn, limit=FIELD_REPORT_LIMIT):
+    """Best fields by average yield: harvested seasons, yield / quality moments and total production"""
+    rows = _read(conn, '''
+        SELECT r.*, f.field_name, f.size_hectares,
+               r.seasons as total_seasons,
+               r.yield_min as min_yield, r.yield_max as max_yield,
+               r.yield_sum * f.size_hectares as total_production
+        FROM report_field_rollup r
+        JOIN fields f ON f.field_id = r.field_id
+        ORDER BY r.yield_sum / r.yield_count DESC
+        LIMIT ?
+    ''', (limit,))
+    return [_with_moments(row, 'yield', 'quality') for row in rows]
+
+
+def crop_performance(conn):
+    """Per crop type: harvested seasons, yield / quality moments and average growth days"""
+    rows = _read(conn, '''
+        SELECT *,
+               seasons as total_seasons,
+               yield_min as min_yield, yield_max as max_yield,
+               growth_days_sum / NULLIF(growth_days_count, 0) as avg_growth_days
+        FROM report_crop_rollup
+        ORDER BY yield_sum / yield_count DESC
+    ''')
+    return [_with_moments(row, 'yield', 'quality') for row in rows]
+
+
+def weather_summary(conn):
+    """Per weather type: events, insurance claims and damage / yield impact moments"""
+    rows = _read(conn, '''
+        SELECT * FROM report_weather_rollup
+        ORDER BY impact_sum / NULLIF(impact_count, 0) DESC
+    ''')
+    return [_with_moments(row, 'damage', 'impact') for row in rows]
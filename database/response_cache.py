@@ -0,0 +1,299 @@
+# Response cache
+"""
+Cache for rendered pages and query results, invalidated by table versions.
+
+    @app.route('/fields')
+    @response_cache.cached('fields', 'crop_seasons')
+    def fields_list(): ...
+
+    @response_cache.memoize('crop_storage')
+    def query_storage_overview(conn): ...
+
+Entries are keyed by route (or function) and arguments and stamped with the
+table_versions counters of the tables they were built from. Every write to
+those tables bumps a counter through triggers, so a stale entry can never
+be served; it is replaced on the next request. A hit returns the stored
+response without running the view, so it opens no pooled connection and
+renders no template. The only database work is a PRAGMA data_version on
+the VersionWatcher's private connection.
+
+The in-process store is an LRU bounded by entry count and bytes. Setting
+RESPONSE_CACHE_PATH (or FS25_RESPONSE_CACHE_PATH) adds a SQLite file that
+every worker on the host reads on a memory miss and writes on a store.
+
+Pages are not cached, nor served from cache, while the session has pending
+flash messages, since those are rendered into the page. Anything but a
+plain 200 is not stored either.
+"""
+
+import functools
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import has_app_context, make_response, request, session
+
+from database import table_versions
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_MB = 64
+
+# Headers worth replaying on a hit; Set-Cookie and timing headers are per response
+STORED_HEADERS = ('Content-Type', 'Content-Language', 'Vary')
+
+
+class LRUStore:
+    """Thread-safe LRU of key -> (stamp, value, size) bounded by count and total size"""
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, stamp, value, size):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (stamp, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def usage(self):
+        with self._lock:
+            return len(self._entries), self._bytes
+
+
+class DiskStore:
+    """SQLite-backed second level shared by the workers on one host"""
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode = WAL')
+        self._conn.execute('PRAGMA synchronous = OFF')  # losing the cache loses nothing
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                cache_key TEXT PRIMARY KEY,
+                stamp TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                stored_at REAL NOT NULL
+            )
+        ''')
+
+    def get(self, key, stamp):
+        with self._lock:
+            row = self._conn.execute('SELECT stamp, payload FROM cache_entries WHERE cache_key = ?',
+                                     (repr(key),)).fetchone()
+        if row is None or row[0] != repr(stamp):
+            return None
+        return pickle.loads(row[1])
+
+    def put(self, key, stamp, payload):
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?)',
+                               (repr(key), repr(stamp), payload, time.time()))
+            self._conn.execute('''
+                DELETE FROM cache_entries WHERE cache_key NOT IN (
+                    SELECT cache_key FROM cache_entries ORDER BY stored_at DESC LIMIT ?
+                )
+            ''', (self.max_entries,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM cache_entries')
+
+
+class ResponseCache:
+    """Version-stamped page and query result cache; configure with init_response_cache()"""
+
+    def __init__(self):
+        self.enabled = False
+        self.watcher = None
+        self.memory = LRUStore(DEFAULT_MAX_ENTRIES, DEFAULT_MAX_MB * 1024 * 1024)
+        self.disk = None
+        self._counts = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'stale': 0, 'stores': 0, 'bypassed': 0}
+
+    def configure(self, database_path, max_entries, max_bytes, disk_path=None):
+        self.watcher = table_versions.watcher(database_path)
+        self.memory = LRUStore(max_entries, max_bytes)
+        self.disk = DiskStore(disk_path, max_entries * 4) if disk_path else None
+        self.enabled = True
+
+    def _count(self, name):
+        self._counts[name] += 1  # GIL-atomic enough for statistics
+
+    def _stamp(self, tables):
+        versions = self.watcher.current() if self.enabled else None
+        if versions is None:
+            return None
+        return tuple(versions.get(table) for table in tables)
+
+    def lookup(self, key, stamp):
+        entry = self.memory.get(key)
+        if entry is not None:
+            if entry[0] == stamp:
+                self._count('hits')
+                return entry[1]
+            self._count('stale')
+        if self.disk is not None:
+            value = self.disk.get(key, stamp)
+            if value is not None:
+                self._count('disk_hits')
+                self.memory.put(key, stamp, value, _size(value))
+                return value
+        self._count('misses')
+        return None
+
+    def store(self, key, stamp, value):
+        size = _size(value)
+        if size > self.memory.max_bytes // 4:
+            return  # one huge page would flush everything else
+        self._count('stores')
+        self.memory.put(key, stamp, value, size)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, stamp, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+            except (pickle.PicklingError, TypeError, sqlite3.Error):
+                pass  # the memory copy still serves this worker
+
+    def cached(self, *tables):
+        """Cache a GET view's 200 responses until one of `tables` changes"""
+        def decorate(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                stamp = None
+                if request.method == 'GET' and not session.get('_flashes'):
+                    stamp = self._stamp(tables)
+                if stamp is None:
+                    self._count('bypassed')
+                    return view(*args, **kwargs)
+
+                key = ('view', request.endpoint, tuple(sorted(kwargs.items())),
+                       tuple(sorted(request.args.items(multi=True))))
+                value = self.lookup(key, stamp)
+                if value is not None:
+                    status, headers, body = value
+                    response = make_response(body, status, headers)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed and not session.modified:
+                    headers = [(name, response.headers[name]) for name in STORED_HEADERS
+                               if name in response.headers]
+                    self.store(key, stamp, (response.status_code, headers, response.get_data()))
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorate
+
+    def memoize(self, *tables):
+        """Cache a query function of (conn, *args) until one of `tables` changes.
+
+        Results are shared between callers, so treat them as read-only.
+        """
+        def decorate(function):
+            name = f'{function.__module__}.{function.__qualname__}'
+
+            @functools.wraps(function)
+            def wrapper(conn, *args, **kwargs):
+                stamp = self._stamp(tables) if has_app_context() else None
+                if stamp is None:
+                    return function(conn, *args, **kwargs)
+                key = ('query', name, args, tuple(sorted(kwargs.items())))
+                value = self.lookup(key, stamp)
+                if value is None:
+                    value = function(conn, *args, **kwargs)
+                    self.store(key, stamp, value)
+                return value
+            return wrapper
+        return decorate
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        entries, size = self.memory.usage()
+        counts = dict(self._counts)
+        lookups = counts['hits'] + counts['disk_hits'] + counts['misses']
+        counts.update(
+            enabled=self.enabled,
+            entries=entries,
+            bytes=size,
+            max_entries=self.memory.max_entries,
+            max_bytes=self.memory.max_bytes,
+            evictions=self.memory.evictions,
+            hit_rate=round((counts['hits'] + counts['disk_hits']) / lookups, 4) if lookups else None,
+            disk_path=self.disk.path if self.disk else None,
+        )
+        return counts
+
+    def metric_series(self):
+        stats = self.stats()
+        yield ('fs25_response_cache_requests_total', 'counter', 'Response cache lookups by result',
+               [({'result': result}, stats[key]) for result, key in
+                (('hit', 'hits'), ('disk_hit', 'disk_hits'), ('miss', 'misses'), ('bypass', 'bypassed'))])
+        yield ('fs25_response_cache_stale_total', 'counter', 'Entries replaced because a table changed',
+               [({}, stats['stale'])])
+        yield ('fs25_response_cache_evictions_total', 'counter', 'Entries evicted by the LRU',
+               [({}, stats['evictions'])])
+        yield ('fs25_response_cache_entries', 'gauge', 'Entries in the in-process cache',
+               [({}, stats['entries'])])
+        yield ('fs25_response_cache_bytes', 'gauge', 'Approximate size of the in-process cache',
+               [({}, stats['bytes'])])
+
+
+def _size(value):
+    if isinstance(value, tuple) and len(value) == 3 and isinstance(value[2], bytes):
+        return len(value[2]) + 256  # a page: body plus headers
+    try:
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except (pickle.PicklingError, TypeError):
+        return 1024
+
+
+response_cache = ResponseCache()
+
+
+def init_response_cache(app):
+    """Configure the shared cache for this app's database; returns whether enabled"""
+    enabled = app.config.get('RESPONSE_CACHE')
+    if enabled is None:
+        enabled = os.environ.get('FS25_RESPONSE_CACHE', '1').lower() not in ('0', 'false', 'off', 'no')
+    if not enabled:
+        return False
+
+    response_cache.configure(
+        app.config['DATABASE_PATH'],
+        max_entries=int(app.config.get('RESPONSE_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+        max_bytes=int(app.config.get('RESPONSE_CACHE_MAX_MB', DEFAULT_MAX_MB)) * 1024 * 1024,
+        disk_path=app.config.get('RESPONSE_CACHE_PATH') or os.environ.get('FS25_RESPONSE_CACHE_PATH'),
+    )
+    app.extensions['response_cache'] = response_cache
+    return True
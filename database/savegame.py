@@ -0,0 +1,428 @@
+# Savegame ingestion
+"""
+Sync farm state from an FS25 savegame directory.
+
+    python -m database.savegame "~/Documents/My Games/FarmingSimulator2025/savegame1"
+    python -m database.savegame path/to/savegame1 --farm-id 1 --dry-run
+
+Three files are read, each streamed with iterparse and cleared element by
+element, so a 50 MB placeables.xml never sits in memory as a tree:
+
+    farmland.xml    <farmland id farmId>            -> fields
+    fields.xml      <field id farmlandId fruitType growthState>
+                                                    -> fields, planting_records
+    placeables.xml  <placeable farmId> ... <storage farmId>
+                        <node fillType fillLevel>   -> crop_storage
+
+Fields are matched to farmlands by number (field_id is the farmland
+number, as in the dashboard). Existing fields get the savegame's state:
+savegame_owned (1 if the farm owns the farmland, 0 if it was sold or never
+bought), savegame_crop and savegame_growth_state. Farmlands the farm owns
+that have no field yet are listed in the report for the user to add with
+their size (a field without one would give every harvest on it a yield of
+0 per hectare). A field with a crop growing gets an Active planting of
+that crop unless it already has one; an Active planting of another crop
+on it is closed as Cleared, since the savegame cannot tell whether it was
+harvested (a harvest recorded for it with the harvest form marks it
+Harvested). Silo fill levels are summed per crop, converted from litres
+to tonnes and written to crop_storage.quantity_stored where they differ;
+crops the savegame tracks but no silo holds go to 0.
+
+Every change is diffed against the database first and applied in one
+transaction. The size, mtime and sha256 of each file synced are kept in
+savegame_files: a file with the same size and mtime is skipped without
+being read, one with new metadata but the same hash without being parsed,
+so re-syncing an unchanged savegame is a few stat() calls. Plantings are
+matched against the fields table, so a farmland added as a field since
+the last save of fields.xml gets its planting the next time the game
+writes fields.xml (which it does on every save).
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+import xml.etree.ElementTree as ET
+from datetime import date, datetime
+
+from database import migrations
+from database.connection import begin_immediate
+from database.init_crop_storage import FS25_CROPS
+
+DEFAULT_DATABASE_PATH = migrations.DEFAULT_DATABASE_PATH
+
+# The player's farm in single player
+DEFAULT_FARM_ID = 1
+
+FARMLAND_FILE = 'farmland.xml'
+FIELDS_FILE = 'fields.xml'
+PLACEABLES_FILE = 'placeables.xml'
+# In sync order
+SAVEGAME_FILES = (FARMLAND_FILE, FIELDS_FILE, PLACEABLES_FILE)
+
+HASH_CHUNK_BYTES = 1 << 20
+MAX_REPORTED_UNMAPPED = 20
+
+# Game fill / fruit type -> (crop_storage crop name, approximate bulk density in t per 1000 l)
+FILL_TYPES = {
+    'WHEAT': ('Wheat', 0.78),
+    'BARLEY': ('Barley', 0.65),
+    'OAT': ('Oat', 0.45),
+    'CANOLA': ('Canola', 0.68),
+    'SUNFLOWER': ('Sunflower', 0.42),
+    'SOYBEAN': ('Soybean', 0.75),
+    'MAIZE': ('Corn', 0.72),
+    'SORGHUM': ('Sorghum', 0.74),
+    'RICE': ('Rice', 0.60),
+    'RICELONGGRAIN': ('Rice', 0.60),
+    'POTATO': ('Potato', 0.70),
+    'SUGARBEET': ('Sugar Beet', 0.65),
+    'SPINACH': ('Spinach', 0.30),
+    'GREENBEAN': ('Green Beans', 0.55),
+    'PEA': ('Peas', 0.75),
+    'GRASS_WINDROW': ('Grass', 0.25),
+    'DRYGRASS_WINDROW': ('Hay', 0.15),
+    'SILAGE': ('Silage', 0.70),
+    'STRAW': ('Straw', 0.10),
+    'WOODCHIPS': ('Wood Chips', 0.30),
+    'MILK': ('Milk', 1.03),
+}
+# Fruits planted in fields that are not fill types of the same name
+FRUIT_TYPES = {'GRASS': 'Grass'}
+
+CROP_CATEGORIES = {crop[0]: crop[1] for crop in FS25_CROPS}
+
+# Quantities closer than this are equal (t)
+QUANTITY_TOLERANCE = 0.0005
+
+FILES_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS savegame_files (
+        savegame TEXT NOT NULL,
+        file_name TEXT NOT NULL,
+        size_bytes INTEGER NOT NULL,
+        modified_ns INTEGER NOT NULL,
+        sha256 TEXT NOT NULL,
+        synced_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (savegame, file_name)
+    )
+'''
+
+
+class SavegameError(ValueError):
+    """A savegame that cannot be read (missing directory, malformed XML)"""
+
+
+def ensure_table(conn):
+    conn.execute(FILES_TABLE_SQL)
+
+
+# =====================================================
+# PARSERS
+# =====================================================
+
+def _records(path, tag):
+    """(event, element) pairs of one file; the tree is cleared after each `tag` element"""
+    try:
+        context = ET.iterparse(path, events=('start', 'end'))
+        _, root = next(context)
+        for event, element in context:
+            yield event, element
+            if event == 'end' and element.tag == tag:
+                root.clear()
+    except ET.ParseError as e:
+        raise SavegameError(f'{os.path.basename(path)}: {e}') from None
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_farmland(path):
+    """{farmland number (as field id): owning farm id}; 0 is unowned"""
+    return {element.get('id'): _int(element.get('farmId')) or 0 for event, element in _records(path, 'farmland')
+            if event == 'start' and element.tag == 'farmland' and element.get('id')}
+
+
+def parse_fields(path, unmapped):
+    """{field id: (crop or None, growth state)} by farmland; crop is set only while one is growing"""
+    state = {}
+    for event, element in _records(path, 'field'):
+        if event != 'start' or element.tag != 'field':
+            continue
+        field_id = element.get('farmlandId') or element.get('id')
+        if not field_id:
+            continue
+        fruit = (element.get('fruitType') or '').upper()
+        growth_state = _int(element.get('growthState')) or 0
+        crop = None
+        if fruit and fruit not in ('NONE', 'UNKNOWN') and growth_state > 0:
+            crop = FRUIT_TYPES.get(fruit) or FILL_TYPES.get(fruit, (None,))[0]
+            if crop is None:
+                unmapped.add(fruit)
+        # A farmland with several fields: the first with a crop growing stands for it
+        if field_id not in state or (crop and state[field_id][0] is None):
+            state[field_id] = (crop, growth_state if crop else 0)
+    return state
+
+
+def parse_storage(path, farm_id=DEFAULT_FARM_ID, unmapped=None):
+    """{crop name: tonnes} held in the farm's storages"""
+    totals = {crop: 0.0 for crop, _ in FILL_TYPES.values()}
+    placeable_farm = storage_farm = None
+    for event, element in _records(path, 'placeable'):
+        tag = element.tag
+        if event == 'start':
+            if tag == 'placeable':
+                placeable_farm = _int(element.get('farmId'))
+            elif tag == 'storage':
+                storage_farm = _int(element.get('farmId') or placeable_farm)
+            elif tag == 'node' and storage_farm == farm_id:
+                fill_type = (element.get('fillType') or '').upper()
+                try:
+                    litres = float(element.get('fillLevel') or 0)
+                except ValueError:
+                    continue
+                if fill_type not in FILL_TYPES:
+                    if unmapped is not None and litres > 0:
+                        unmapped.add(fill_type)
+                    continue
+                crop, density = FILL_TYPES[fill_type]
+                totals[crop] += litres / 1000 * density
+        elif tag == 'storage':
+            storage_farm = None
+    return {crop: round(tonnes, 3) for crop, tonnes in totals.items()}
+
+
+# =====================================================
+# FILE STATE
+# =====================================================
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as stream:
+        for chunk in iter(lambda: stream.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def changed_files(conn, directory, force=False):
+    """{file name: (size, mtime_ns, sha256)} of the savegame files whose content changed.
+
+    Files whose metadata alone changed have it refreshed in savegame_files;
+    the caller commits.
+    """
+    savegame = os.path.realpath(directory)
+    known = {row[0]: (row[1], row[2], row[3]) for row in conn.execute(
+        'SELECT file_name, size_bytes, modified_ns, sha256 FROM savegame_files WHERE savegame = ?', (savegame,))}
+
+    changed = {}
+    for name in SAVEGAME_FILES:
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        previous = known.get(name)
+        if not force and previous and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+            continue
+        digest = file_hash(path)
+        if not force and previous and previous[2] == digest:
+            conn.execute('''
+                UPDATE savegame_files SET size_bytes = ?, modified_ns = ?
+                WHERE savegame = ? AND file_name = ?
+            ''', (stat.st_size, stat.st_mtime_ns, savegame, name))
+            continue
+        changed[name] = (stat.st_size, stat.st_mtime_ns, digest)
+    return changed
+
+
+def _record_files(conn, directory, files):
+    conn.executemany('''
+        INSERT INTO savegame_files (savegame, file_name, size_bytes, modified_ns, sha256, synced_date)
+        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (savegame, file_name) DO UPDATE SET
+            size_bytes = excluded.size_bytes, modified_ns = excluded.modified_ns,
+            sha256 = excluded.sha256, synced_date = excluded.synced_date
+    ''', [(os.path.realpath(directory), name, *state) for name, state in files.items()])
+
+
+# =====================================================
+# DIFF AND APPLY
+# =====================================================
+
+def _update_ownership(conn, owners, farm_id, now):
+    """(fields updated, owned farmlands with no field) from farmland.xml's owners"""
+    existing = {row[0]: row[1] for row in conn.execute('SELECT field_id, savegame_owned FROM fields')}
+    updates = [(int(owner == farm_id), now, field_id) for field_id, owner in owners.items()
+               if field_id in existing and existing[field_id] != int(owner == farm_id)]
+    conn.executemany('UPDATE fields SET savegame_owned = ?, savegame_synced_date = ? WHERE field_id = ?', updates)
+
+    unknown = [field_id for field_id, owner in owners.items() if owner == farm_id and field_id not in existing]
+    unknown.sort(key=lambda field_id: (_int(field_id) is None, _int(field_id), field_id))
+    return len(updates), unknown
+
+
+def _update_field_state(conn, state, now):
+    """Number of fields whose crop or growth state in fields.xml changed"""
+    existing = {row[0]: (row[1], row[2]) for row in conn.execute(
+        'SELECT field_id, savegame_crop, savegame_growth_state FROM fields')}
+    updates = [(crop, growth_state, now, field_id) for field_id, (crop, growth_state) in state.items()
+               if field_id in existing and existing[field_id] != (crop, growth_state)]
+    conn.executemany('''
+        UPDATE fields SET savegame_crop = ?, savegame_growth_state = ?, savegame_synced_date = ?
+        WHERE field_id = ?
+    ''', updates)
+    return len(updates)
+
+
+def _add_plantings(conn, growing, saved):
+    """(plantings added, plantings closed) for the crops growing, one Active planting per field"""
+    fields = {row[0]: row[1] for row in conn.execute('SELECT field_id, size_hectares FROM fields')}
+    active = {}
+    for planting_id, field_id, crop in conn.execute(
+            "SELECT planting_id, field_id, crop_type FROM planting_records WHERE status = 'Active'"):
+        active.setdefault(field_id, []).append((planting_id, crop))
+
+    new, closed = [], []
+    for field_id, crop in sorted(growing.items()):
+        if field_id not in fields:
+            continue
+        current = active.get(field_id, [])
+        if any(active_crop == crop for _, active_crop in current):
+            continue
+        closed.extend((f'Closed by savegame sync: {crop} growing on {saved}', planting_id)
+                      for planting_id, _ in current)
+        new.append((field_id, crop, saved, fields[field_id] or None, 'Savegame', 'Added from savegame'))
+
+    conn.executemany('''
+        UPDATE planting_records
+        SET status = 'Cleared',
+            notes = CASE WHEN COALESCE(notes, '') = '' THEN ?1 ELSE notes || char(10) || ?1 END,
+            updated_date = CURRENT_TIMESTAMP
+        WHERE planting_id = ?2
+    ''', closed)
+    conn.executemany('''
+        INSERT INTO planting_records (field_id, crop_type, planting_date, planted_area_ha,
+                                      planting_method, notes, status)
+        VALUES (?, ?, ?, ?, ?, ?, 'Active')
+    ''', new)
+    return len(new), len(closed)
+
+
+def _update_storage(conn, quantities, now):
+    stored = {row[0]: row[1] or 0 for row in conn.execute('SELECT crop_name, quantity_stored FROM crop_storage')}
+    updates = [(tonnes, now, crop) for crop, tonnes in quantities.items()
+               if crop in stored and abs(stored[crop] - tonnes) > QUANTITY_TOLERANCE]
+    inserts = [(crop, CROP_CATEGORIES.get(crop), tonnes) for crop, tonnes in quantities.items()
+               if crop not in stored and tonnes > 0]
+    conn.executemany('UPDATE crop_storage SET quantity_stored = ?, updated_date = ? WHERE crop_name = ?', updates)
+    conn.executemany('INSERT INTO crop_storage (crop_name, crop_category, quantity_stored) VALUES (?, ?, ?)',
+                     inserts)
+    return len(updates) + len(inserts)
+
+
+def sync(conn, directory, farm_id=DEFAULT_FARM_ID, force=False, dry_run=False):
+    """Apply the changes in a savegame directory; returns the report dict.
+
+    Only files whose content changed since the last sync are parsed (all of
+    them with force). With dry_run the changes are computed and rolled
+    back. Raises SavegameError if the directory has none of SAVEGAME_FILES
+    or a file is not well-formed XML, and TransactionOpenError if the
+    connection has uncommitted changes.
+    """
+    started = time.perf_counter()
+    if not os.path.isdir(directory) or not any(
+            os.path.exists(os.path.join(directory, name)) for name in SAVEGAME_FILES):
+        raise SavegameError(f"Not a savegame directory: {directory} (expected {', '.join(SAVEGAME_FILES)})")
+
+    ensure_table(conn)
+    begin_immediate(conn)
+    report = {'files_changed': [], 'fields_updated': 0, 'unknown_farmlands': [], 'plantings_added': 0,
+              'plantings_closed': 0, 'storage_updated': 0}
+    unmapped = set()
+    try:
+        changed = changed_files(conn, directory, force)
+        now = datetime.now()
+
+        def path_of(name):
+            return os.path.join(directory, name)
+
+        def saved(name):
+            return date.fromtimestamp(changed[name][1] / 1e9).isoformat()
+
+        if FARMLAND_FILE in changed:
+            report['fields_updated'], report['unknown_farmlands'] = _update_ownership(
+                conn, parse_farmland(path_of(FARMLAND_FILE)), farm_id, now)
+        if FIELDS_FILE in changed:
+            state = parse_fields(path_of(FIELDS_FILE), unmapped)
+            report['fields_updated'] += _update_field_state(conn, state, now)
+            growing = {field_id: crop for field_id, (crop, _) in state.items() if crop}
+            report['plantings_added'], report['plantings_closed'] = _add_plantings(
+                conn, growing, saved(FIELDS_FILE))
+        if PLACEABLES_FILE in changed:
+            report['storage_updated'] = _update_storage(
+                conn, parse_storage(path_of(PLACEABLES_FILE), farm_id, unmapped), now)
+
+        _record_files(conn, directory, changed)
+        report['files_changed'] = sorted(changed)
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    report['rows_changed'] = (report['fields_updated'] + report['plantings_added'] + report['plantings_closed']
+                              + report['storage_updated'])
+    report['unmapped_types'] = sorted(unmapped)[:MAX_REPORTED_UNMAPPED]
+    report['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    report['dry_run'] = dry_run
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sync fields, plantings and storage from an FS25 savegame')
+    parser.add_argument('savegame', help='savegame directory, e.g. .../FarmingSimulator2025/savegame1')
+    parser.add_argument('--db', default=DEFAULT_DATABASE_PATH)
+    parser.add_argument('--farm-id', type=int, default=DEFAULT_FARM_ID)
+    parser.add_argument('--force', action='store_true', help='parse every file even if unchanged')
+    parser.add_argument('--dry-run', action='store_true', help='report the changes without writing them')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    conn.row_factory = sqlite3.Row  # as pooled connections; the dashboard hooks expect it
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA foreign_keys = ON')
+    migrations.migrate(conn)
+
+    try:
+        report = sync(conn, os.path.expanduser(args.savegame), args.farm_id, args.force, args.dry_run)
+    except SavegameError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    if not report['files_changed']:
+        print(f"✅ Savegame unchanged since the last sync ({report['duration_ms']} ms)")
+        return
+    prefix = 'Would change' if args.dry_run else 'Synced'
+    print(f"✅ {prefix} {', '.join(report['files_changed'])}: {report['fields_updated']} fields updated, "
+          f"{report['plantings_added']} plantings added, {report['plantings_closed']} closed, "
+          f"{report['storage_updated']} storage rows updated "
+          f"({report['duration_ms']} ms)")
+    if report['unknown_farmlands']:
+        print(f"   Owned farmlands with no field (add them on the Fields page): "
+              f"{', '.join(report['unknown_farmlands'])}")
+    if report['unmapped_types']:
+        print(f"   Unknown fill / fruit types skipped: {', '.join(report['unmapped_types'])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,409 @@
+# Savegame watcher
+"""
+Keeps the dashboard in step with a savegame folder while the game autosaves.
+
+    FS25_SAVEGAME_DIR="$HOME/.../FarmingSimulator2025/savegame1" python app.py
+    curl http://localhost:5000/savegame/status
+
+With SAVEGAME_DIR (or FS25_SAVEGAME_DIR) set, the serving process of
+`python app.py` (or, behind a WSGI server, a `flask --app app
+watch-savegame` process of its own) starts a daemon thread that syncs the
+savegame once at startup and then waits for the game to write farmland.xml,
+fields.xml or placeables.xml. On Linux it is woken by inotify
+(close-after-write and rename into the folder); elsewhere, or if inotify
+cannot be set up, it compares the folder's file sizes and mtimes every
+POLL_SECONDS.
+
+A save rewrites several files over a few seconds, so a change starts a
+quiet period: the sync runs once DEBOUNCE_SECONDS pass without a write to
+any file in the folder, vehicles.xml and the rest of the save included
+(or MAX_DEBOUNCE_SECONDS after the first, if the writes never stop).
+database.savegame.sync() then hashes the files whose size or mtime moved
+and parses only those whose content changed, so an autosave that changed
+nothing but the timestamps writes nothing.
+
+status() - served at /savegame/status - reports the last sync: when it
+ran, what triggered it, how long it took, which files changed and how many
+rows it wrote, or its error. Each sync also writes the status to
+savegame_sync_status, where stored_status() reads it, so web workers of a
+WSGI deployment report the syncs of the watcher process too.
+
+Only one process watches a database: the watcher holds an exclusive lock
+on <database>.savegame-watcher.lock while it runs, and a second one
+started against the same database stands down.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import sqlite3
+import struct
+import threading
+import time
+from datetime import datetime
+
+from database import savegame
+from monitoring.logger import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEBOUNCE_SECONDS = 2.0
+MAX_DEBOUNCE_SECONDS = 30.0
+POLL_SECONDS = 5.0
+
+LOCK_SUFFIX = '.savegame-watcher.lock'
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+# The watched folder itself went away (the game may replace it on save)
+FOLDER_GONE = IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+log = get_logger('savegame')
+
+
+class InotifySource:
+    """Savegame file names written since the last wait(), from inotify.
+
+    wait() returns None if nothing in the folder was written before the
+    timeout, and a set - empty if only other files were - otherwise.
+    """
+
+    mode = 'inotify'
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.directory = directory
+        self.fd = fd
+        self.wd = None
+        self._watch()
+
+    def _watch(self):
+        """Watch the folder if it exists; returns whether it is watched"""
+        wd = self._add_watch(self.fd, os.fsencode(self.directory), WATCH_MASK)
+        self.wd = wd if wd >= 0 else None
+        return self.wd is not None
+
+    def wait(self, timeout):
+        if self.wd is None:
+            # Folder missing: look for it again after the timeout, and treat
+            # its reappearance as a change to every file
+            time.sleep(timeout)
+            return set(savegame.SAVEGAME_FILES) if self._watch() else None
+
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return None
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return None
+
+        changed, offset = set(), 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            if mask & FOLDER_GONE:
+                if wd == self.wd:
+                    self.wd = None
+            elif name in savegame.SAVEGAME_FILES:
+                changed.add(name)
+        if self.wd is None and self._watch():
+            changed.update(savegame.SAVEGAME_FILES)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingSource:
+    """Savegame file names whose size or mtime changed since the last wait().
+
+    Every file in the folder is compared, so like InotifySource.wait(),
+    wait() returns None if none changed and a set - empty if only other
+    files did - otherwise.
+    """
+
+    mode = 'polling'
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._seen = self._snapshot()
+
+    def _snapshot(self):
+        state = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            stat = entry.stat()
+                            state[entry.name] = (stat.st_size, stat.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return state
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+        current = self._snapshot()
+        changed = {name for name in set(current) | set(self._seen) if current.get(name) != self._seen.get(name)}
+        self._seen = current
+        if not changed:
+            return None
+        return changed & set(savegame.SAVEGAME_FILES)
+
+    def close(self):
+        pass
+
+
+class SavegameWatcher:
+    """Daemon thread syncing one savegame folder into the database on change"""
+
+    def __init__(self, pool, directory, farm_id=savegame.DEFAULT_FARM_ID,
+                 debounce_seconds=DEBOUNCE_SECONDS, poll_seconds=POLL_SECONDS, use_inotify=True,
+                 owner_lock=None):
+        self.pool = pool
+        self.owner_lock = owner_lock
+        self.directory = directory
+        self.farm_id = farm_id
+        self.debounce_seconds = debounce_seconds
+        self.poll_seconds = poll_seconds
+        self.source = None
+        if use_inotify:
+            try:
+                self.source = InotifySource(directory)
+            except (OSError, AttributeError) as e:
+                # not Linux, or out of inotify instances / watches
+                log.warning('savegame inotify unavailable, polling', error=str(e))
+        if self.source is None:
+            self.source = PollingSource(directory)
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._status = {
+            'savegame': directory,
+            'farm_id': farm_id,
+            'mode': self.source.mode,
+            'started_at': None,
+            'syncs': 0,
+            'failed_syncs': 0,
+            'rows_changed_total': 0,
+            'pending_files': [],
+            'last_sync': None,
+        }
+
+    def start(self):
+        self._status['started_at'] = datetime.now().isoformat(timespec='seconds')
+        self._thread = threading.Thread(target=self._run, name='savegame-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def join(self, timeout=None):
+        """Wait for the thread to end; returns whether it is still running"""
+        if self._thread is None:
+            return False
+        self._thread.join(timeout)
+        return self._thread.is_alive()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.source.close()
+        if self.owner_lock is not None:
+            # Closing the file releases the lock
+            self.owner_lock.close()
+            self.owner_lock = None
+
+    def _run(self):
+        self.sync_now('startup')
+        while not self._stop.is_set():
+            try:
+                changed = self.source.wait(self.poll_seconds)
+                if changed is None:
+                    continue
+
+                # Let the rest of the save land before reading any of it;
+                # a write to any file restarts the quiet period
+                deadline = time.monotonic() + MAX_DEBOUNCE_SECONDS
+                with self._lock:
+                    self._status['pending_files'] = sorted(changed)
+                while not self._stop.is_set() and time.monotonic() < deadline:
+                    more = self.source.wait(self.debounce_seconds)
+                    if more is None:
+                        break
+                    changed |= more
+                    with self._lock:
+                        self._status['pending_files'] = sorted(changed)
+                if changed and not self._stop.is_set():
+                    self.sync_now('change', changed)
+            except Exception as e:
+                # Keep watching; the next save gets another try
+                log.error('savegame watcher error', error=str(e))
+                self._stop.wait(self.poll_seconds)
+
+    def sync_now(self, trigger='manual', files_seen=()):
+        """Run one sync and record it in the status; returns the status entry"""
+        started_at = datetime.now()
+        started = time.perf_counter()
+        entry = {'trigger': trigger, 'files_seen': sorted(files_seen),
+                 'started_at': started_at.isoformat(timespec='seconds')}
+        conn = None
+        try:
+            conn = self.pool.acquire()
+            report = savegame.sync(conn, self.directory, self.farm_id)
+            entry.update(error=None, **{key: report[key] for key in (
+                'files_changed', 'rows_changed', 'fields_updated', 'unknown_farmlands', 'plantings_added',
+                'plantings_closed', 'storage_updated', 'unmapped_types')})
+            if report['rows_changed']:
+                log.info('savegame synced', trigger=trigger, files=report['files_changed'],
+                         rows_changed=report['rows_changed'])
+        except Exception as e:
+            entry.update(error=str(e), files_changed=[], rows_changed=0)
+            log.warning('savegame sync failed', trigger=trigger, error=str(e))
+        finally:
+            if conn is not None:
+                conn.close()
+        entry['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+        with self._lock:
+            self._status['syncs'] += 1
+            self._status['failed_syncs'] += entry['error'] is not None
+            self._status['rows_changed_total'] += entry['rows_changed']
+            self._status['pending_files'] = []
+            self._status['last_sync'] = entry
+        self._record()
+        return entry
+
+    def _record(self):
+        """Store the status for processes without the watcher (a failure only loses this copy)"""
+        with self._lock:
+            status = {key: value for key, value in self._status.items() if key != 'pending_files'}
+        conn = None
+        try:
+            conn = self.pool.acquire()
+            record_status(conn, self.directory, status)
+            conn.commit()
+        except sqlite3.Error as e:
+            log.warning('savegame status not recorded', error=str(e))
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def status(self):
+        with self._lock:
+            status = dict(self._status)
+        status['running'] = self._thread is not None and self._thread.is_alive()
+        return status
+
+    def metric_series(self):
+        return status_metric_series(self.status())
+
+
+def status_metric_series(status):
+    """Metric series of a watcher status, live or stored"""
+    if not status or 'syncs' not in status:
+        return
+    last = status['last_sync'] or {}
+    yield ('fs25_savegame_syncs_total', 'counter', 'Savegame syncs by result',
+           [({'result': 'ok'}, status['syncs'] - status['failed_syncs']),
+            ({'result': 'error'}, status['failed_syncs'])])
+    yield ('fs25_savegame_rows_changed_total', 'counter', 'Rows written by savegame syncs',
+           [({}, status['rows_changed_total'])])
+    yield ('fs25_savegame_last_sync_duration_ms', 'gauge', 'Duration of the last savegame sync',
+           [({}, last.get('duration_ms', 0))])
+
+
+def record_status(conn, directory, status):
+    conn.execute('''
+        INSERT INTO savegame_sync_status (savegame, status, updated_date)
+        VALUES (?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (savegame) DO UPDATE SET status = excluded.status, updated_date = excluded.updated_date
+    ''', (os.path.realpath(directory), json.dumps(status)))
+
+
+def stored_status(pool, directory):
+    """The status the watcher of `directory` last recorded, in whichever process it runs; None if none"""
+    conn = pool.acquire()
+    try:
+        row = conn.execute('SELECT status, updated_date FROM savegame_sync_status WHERE savegame = ?',
+                           (os.path.realpath(directory),)).fetchone()
+    except sqlite3.OperationalError:
+        return None  # not migrated yet
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return {**json.loads(row[0]), 'recorded_at': row[1]}
+
+
+def acquire_owner_lock(path):
+    """Open and exclusively lock `path`; returns the open file, or None if another process holds it"""
+    stream = open(path, 'a+')
+    try:
+        if fcntl is not None:
+            fcntl.flock(stream.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            stream.seek(0)
+            msvcrt.locking(stream.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        stream.close()
+        return None
+    return stream
+
+
+def savegame_directory(app):
+    return app.config.get('SAVEGAME_DIR') or os.environ.get('FS25_SAVEGAME_DIR')
+
+
+def init_savegame_watcher(app, pool):
+    """Start watching the configured savegame folder.
+
+    Returns the watcher, or None if no folder is configured or another
+    process already watches this database. Call it from the process that
+    should own the watcher, not at import: every WSGI worker, reloader
+    parent and `flask` command imports the app.
+    """
+    directory = savegame_directory(app)
+    if not directory:
+        return None
+
+    lock_path = app.config['DATABASE_PATH'] + LOCK_SUFFIX
+    owner_lock = acquire_owner_lock(lock_path)
+    if owner_lock is None:
+        log.info('savegame watcher running in another process', lock=lock_path)
+        return None
+
+    watcher = SavegameWatcher(
+        pool,
+        os.path.expanduser(directory),
+        farm_id=int(app.config.get('SAVEGAME_FARM_ID', os.environ.get('FS25_SAVEGAME_FARM_ID',
+                                                                      savegame.DEFAULT_FARM_ID))),
+        debounce_seconds=float(app.config.get('SAVEGAME_DEBOUNCE_SECONDS', DEBOUNCE_SECONDS)),
+        poll_seconds=float(app.config.get('SAVEGAME_POLL_SECONDS', POLL_SECONDS)),
+        use_inotify=app.config.get('SAVEGAME_INOTIFY', True),
+        owner_lock=owner_lock,
+    )
+    app.extensions['savegame_watcher'] = watcher.start()
+    return watcher
@@ -0,0 +1,244 @@
+# Full-text search
+"""
+One FTS5 index over the free-text columns of every table that has them:
+notes, weather conditions, lessons learned, pest notes, product names and
+so on, with the field, planting and date each row belongs to.
+
+search_index has one row per source record with any text. Its rowid is
+the source rowid * 8 + the source's code, so the triggers that keep it in
+sync replace or delete an entry by rowid lookup rather than by scanning
+the index for (kind, id). Records whose text columns are all empty are
+not indexed.
+
+search() turns what the user typed into a safe MATCH expression (every
+word quoted, the last one as a prefix, "quoted phrases" kept), ranks by
+bm25 - or lists newest first when a search matches too much of the index
+to rank quickly - and returns snippets with the matches marked, so a
+search across years of notes reads a few index pages instead of
+LIKE-scanning every table.
+"""
+
+import re
+
+from markupsafe import Markup, escape
+
+from database.migrations import execute_script
+
+# (kind, table, key column, date column, title columns, text columns) - append only:
+# the position is the kind's code in search_index rowids
+SOURCES = (
+    ('field', 'fields', 'field_id', None, ('field_name',),
+     ('field_name', 'soil_type', 'notes')),
+    ('season', 'crop_seasons', 'season_id', 'planting_date', ('crop_type', 'crop_year'),
+     ('season_name', 'variety_name', 'weather_impact', 'disease_pest_notes', 'notes')),
+    ('planting', 'planting_records', 'planting_id', 'planting_date', ('crop_type',),
+     ('variety', 'planting_method', 'weather_conditions', 'notes')),
+    ('operation', 'field_operations', 'operation_id', 'operation_date', ('operation_type',),
+     ('operator_name', 'weather_conditions', 'notes')),
+    ('maintenance', 'field_maintenance', 'maintenance_id', 'maintenance_date', ('maintenance_type',),
+     ('operation_details', 'equipment_used', 'product_used', 'weather_conditions', 'soil_conditions', 'notes')),
+    ('harvest', 'harvest_records', 'harvest_id', 'harvest_date', ('quality_grade',),
+     ('buyer_name', 'harvest_method', 'weather_conditions', 'notes')),
+    ('weather', 'weather_events', 'event_id', 'event_date', ('weather_type',),
+     ('severity', 'crop_stage', 'mitigation_used', 'lessons_learned')),
+)
+KIND_CODES = {source[0]: code for code, source in enumerate(SOURCES, start=1)}
+CODE_SPAN = 8
+
+# Tables whose rows belong to a planting
+PLANTING_TABLES = ('planting_records', 'field_maintenance', 'harvest_records')
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# Searches with more matches than this are listed newest first rather than ranked
+RANK_WINDOW = 500
+# Longest prefix the index keeps doclists for (the fts5 prefix option)
+PREFIX_INDEX_MAX = 4
+
+# Snippet match markers; replaced by <mark> after the text is HTML-escaped
+MATCH_START, MATCH_END = '\x02', '\x03'
+
+INDEX_COLUMNS = 'rowid, body, kind, record_id, field_id, planting_id, record_date, title'
+
+INDEX_SCHEMA = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        body,
+        kind UNINDEXED,
+        record_id UNINDEXED,
+        field_id UNINDEXED,
+        planting_id UNINDEXED,
+        record_date UNINDEXED,
+        title UNINDEXED,
+        tokenize = 'porter unicode61 remove_diacritics 2',
+        prefix = '2 3 4'
+    );
+'''
+
+
+def _joined(columns, row):
+    return 'trim(' + " || ' ' || ".join(f"COALESCE({row}{column}, '')" for column in columns) + ')'
+
+
+def _entry_select(source, row=''):
+    """SELECT of the search_index values of one source row (NEW. / OLD. prefix) or table"""
+    kind, table, key, date_column, title_columns, columns = source
+    code = KIND_CODES[kind]
+    planting = f'{row}planting_id' if table in PLANTING_TABLES else 'NULL'
+    record_date = f'{row}{date_column}' if date_column else 'NULL'
+    return f'''
+        SELECT {row}rowid * {CODE_SPAN} + {code} AS entry_id, {_joined(columns, row)} AS body,
+               '{kind}', {row}{key}, {row}field_id, {planting}, {record_date}, {_joined(title_columns, row)}'''
+
+
+def _triggers(source):
+    kind, table, key, date_column, title_columns, columns = source
+    code = KIND_CODES[kind]
+    watched = dict.fromkeys((key, 'field_id', *columns, *title_columns))
+    if date_column:
+        watched[date_column] = None
+    if table in PLANTING_TABLES:
+        watched['planting_id'] = None
+    insert = f'''
+        INSERT INTO search_index ({INDEX_COLUMNS})
+        SELECT * FROM ({_entry_select(source, 'NEW.')}) AS entry WHERE entry.body <> '';'''
+    return f'''
+    CREATE TRIGGER IF NOT EXISTS trg_search_{table}_insert
+    AFTER INSERT ON {table}
+    BEGIN{insert}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_search_{table}_update
+    AFTER UPDATE OF {', '.join(watched)} ON {table}
+    BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.rowid * {CODE_SPAN} + {code};{insert}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_search_{table}_delete
+    AFTER DELETE ON {table}
+    BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.rowid * {CODE_SPAN} + {code};
+    END;
+'''
+
+
+def rebuild_index(conn):
+    """Create the index and its triggers if needed and refill it from the source tables"""
+    execute_script(conn, INDEX_SCHEMA + ''.join(_triggers(source) for source in SOURCES))
+    conn.execute('DELETE FROM search_index')
+    for source in SOURCES:
+        conn.execute(f'''
+            INSERT INTO search_index ({INDEX_COLUMNS})
+            SELECT * FROM ({_entry_select(source)} FROM {source[1]}) AS entry
+            WHERE entry.body <> ''
+        ''')
+    conn.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+
+
+# =====================================================
+# QUERIES
+# =====================================================
+
+def to_match(text, prefix=True):
+    """FTS5 MATCH expression for user input, or None if it has nothing to search for.
+
+    Words are quoted so FTS5 operators and punctuation in the input are
+    taken literally; "quoted phrases" stay phrases; with prefix, the last
+    word is a prefix unless the input ends with a space, for
+    search-as-you-type.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|([^\s"]+)', text or ''):
+        words = re.findall(r'\w+', phrase or word)
+        if words:
+            terms.append((' '.join(words), bool(phrase)))
+    if not terms:
+        return None
+
+    parts = [f'"{words}"' for words, _ in terms]
+    last_words, last_is_phrase = terms[-1]
+    # Prefixes of 2-4 characters are read from the prefix index; longer ones
+    # merge the doclists of every matching term, and one letter would match
+    # most of the vocabulary
+    if prefix and not last_is_phrase and len(last_words) >= 2 and not text.endswith((' ', '"')):
+        parts[-1] += ' *'
+    return ' '.join(parts)
+
+
+def highlight(snippet):
+    """Snippet as HTML: the text escaped, the matches wrapped in <mark>"""
+    return Markup(str(escape(snippet)).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>'))
+
+
+def search(conn, text, kinds=None, limit=DEFAULT_LIMIT, offset=0):
+    """(results, has_more) for user input.
+
+    Each result has kind, record_id, field_id, field_name, planting_id,
+    record_date, title, snippet (HTML) and score. kinds restricts the
+    search to some of SOURCES' kinds; unknown kinds raise ValueError.
+
+    Up to RANK_WINDOW matches are ordered by bm25, best first. bm25 weighs
+    every term by how many rows contain it, which means reading the term's
+    whole doclist, so a term found in a large part of the index (a weather
+    word, say) would cost tens of milliseconds to rank; such searches list
+    the newest matches first instead, with score None.
+    """
+    match = to_match(text)
+    if match is None:
+        return [], False
+    limit = max(1, min(int(limit), MAX_LIMIT))
+
+    # A prefix longer than the prefix index merges the doclists of every term
+    # it starts, which for a common word costs more than the whole search
+    # should. Once the last word is complete enough to match on its own,
+    # search for it as typed.
+    long_prefix = re.search(r'"([^"]*)" \*$', match)
+    if long_prefix and len(long_prefix.group(1)) > PREFIX_INDEX_MAX:
+        exact = to_match(text, prefix=False)
+        if conn.execute('SELECT 1 FROM search_index WHERE search_index MATCH ? LIMIT 1',
+                        (exact,)).fetchone():
+            match = exact
+
+    where, params = ['search_index MATCH ?'], [match]
+    if kinds:
+        unknown = [kind for kind in kinds if kind not in KIND_CODES]
+        if unknown:
+            raise ValueError(f"Unknown search kind(s): {', '.join(unknown)}")
+        codes = [KIND_CODES[kind] for kind in kinds]
+        where.append(f"(rowid % {CODE_SPAN}) IN ({', '.join('?' * len(codes))})")
+        params.extend(codes)
+    where = ' AND '.join(where)
+
+    # Newest-first walks the doclists from the end and stops early
+    common = conn.execute(f'''
+        SELECT 1 FROM search_index WHERE {where}
+        ORDER BY rowid DESC LIMIT 1 OFFSET {RANK_WINDOW}
+    ''', params).fetchone() is not None
+    order, sort_key, score = ('rowid DESC', '-rowid', 'NULL') if common else ('rank', 'rank', 'rank')
+
+    rows = conn.execute(f'''
+        SELECT hit.*, f.field_name
+        FROM (
+            SELECT kind, record_id, field_id, planting_id, record_date, title,
+                   snippet(search_index, 0, '{MATCH_START}', '{MATCH_END}', '…', 16) AS snippet,
+                   {score} AS score, {sort_key} AS sort_key
+            FROM search_index
+            WHERE {where}
+            ORDER BY {order}
+            LIMIT ? OFFSET ?
+        ) AS hit
+        LEFT JOIN fields f ON f.field_id = hit.field_id
+        ORDER BY hit.sort_key
+    ''', params + [limit + 1, max(0, int(offset))]).fetchall()
+
+    results = [{
+        'kind': row['kind'],
+        'record_id': row['record_id'],
+        'field_id': row['field_id'],
+        'field_name': row['field_name'],
+        'planting_id': row['planting_id'],
+        'record_date': row['record_date'],
+        'title': row['title'],
+        'snippet': highlight(row['snippet']),
+        'score': row['score'],
+    } for row in rows[:limit]]
+    return results, len(rows) > limit
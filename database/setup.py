@@ -1,16 +1,22 @@
 # Database creation
 import sqlite3
 import os
-from datetime import datetime
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import migrations
+
+DATABASE_PATH = os.environ.get('FS25_DATABASE_PATH', migrations.DEFAULT_DATABASE_PATH)
 
 def create_database():
     """Create the FS25 farming database with all tables"""
     
     # Ensure data directory exists
-    os.makedirs('../data', exist_ok=True)
+    os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
     
     # Connect to database (creates file if doesn't exist)
-    conn = sqlite3.connect('../data/fs25_farming.db')
+    conn = sqlite3.connect(DATABASE_PATH)
     cursor = conn.cursor()
     
     # Enable foreign key support
@@ -18,124 +24,9 @@ def create_database():
     
     print("🌾 Creating FS25 Farming Database...")
     
-    # Fields table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS fields (
-            field_id TEXT PRIMARY KEY,
-            field_name TEXT NOT NULL,
-            size_hectares REAL NOT NULL,
-            soil_type TEXT,
-            soil_ph REAL,
-            organic_matter_percent REAL,
-            drainage_rating TEXT,
-            slope_percent REAL,
-            gps_latitude REAL,
-            gps_longitude REAL,
-            purchase_price REAL,
-            purchase_date DATE,
-            current_value REAL,
-            stone_percent REAL,
-            notes TEXT,
-            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    print("✅ Fields table created")
-    
-    # Equipment table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS equipment (
-            equipment_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            equipment_name TEXT NOT NULL,
-            brand TEXT,
-            model TEXT,
-            category TEXT,
-            purchase_price REAL,
-            purchase_date DATE,
-            current_value REAL,
-            fuel_consumption_per_hour REAL,
-            maintenance_cost_per_hour REAL,
-            total_hours REAL DEFAULT 0,
-            notes TEXT,
-            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    print("✅ Equipment table created")
-    
-    # Crop seasons table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS crop_seasons (
-            season_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            field_id TEXT NOT NULL,
-            crop_year INTEGER NOT NULL,
-            season_name TEXT,
-            crop_type TEXT NOT NULL,
-            variety_name TEXT,
-            planting_date DATE,
-            harvest_date DATE,
-            growth_days INTEGER,
-            yield_tonnes_per_ha REAL,
-            quality_percent REAL,
-            weather_impact TEXT,
-            disease_pest_notes TEXT,
-            rotation_benefit_percent REAL,
-            notes TEXT,
-            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (field_id) REFERENCES fields (field_id)
-        )
-    ''')
-    print("✅ Crop seasons table created")
-    
-    # Field operations table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS field_operations (
-            operation_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            field_id TEXT NOT NULL,
-            season_id INTEGER,
-            operation_date DATE NOT NULL,
-            operation_type TEXT NOT NULL,
-            equipment_id INTEGER,
-            operator_name TEXT,
-            hours_worked REAL,
-            fuel_used_liters REAL,
-            average_speed_kmh REAL,
-            weather_conditions TEXT,
-            soil_moisture_percent REAL,
-            compaction_risk TEXT,
-            quality_rating INTEGER CHECK (quality_rating BETWEEN 1 AND 10),
-            notes TEXT,
-            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (field_id) REFERENCES fields (field_id),
-            FOREIGN KEY (season_id) REFERENCES crop_seasons (season_id),
-            FOREIGN KEY (equipment_id) REFERENCES equipment (equipment_id)
-        )
-    ''')
-    print("✅ Field operations table created")
-    
-    # Weather events table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS weather_events (
-            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            field_id TEXT NOT NULL,
-            season_id INTEGER,
-            event_date DATE NOT NULL,
-            weather_type TEXT NOT NULL,
-            severity TEXT,
-            crop_stage TEXT,
-            damage_percent REAL,
-            yield_impact_percent REAL,
-            quality_impact_percent REAL,
-            recovery_time_days INTEGER,
-            insurance_claim BOOLEAN DEFAULT 0,
-            insurance_amount REAL,
-            mitigation_used TEXT,
-            lessons_learned TEXT,
-            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (field_id) REFERENCES fields (field_id),
-            FOREIGN KEY (season_id) REFERENCES crop_seasons (season_id)
-        )
-    ''')
-    print("✅ Weather events table created")
+    # Tables, indexes and triggers all come from the migrations
+    for version, name in migrations.migrate(conn):
+        print(f"✅ Migration {version:04d}: {name}")
     
     # Insert sample data
     sample_fields = [
@@ -148,7 +39,7 @@ def create_database():
     ]
     
     cursor.executemany('''
-        INSERT INTO fields (field_id, field_name, size_hectares, soil_type, soil_ph, 
+        INSERT OR IGNORE INTO fields (field_id, field_name, size_hectares, soil_type, soil_ph, 
                            organic_matter_percent, drainage_rating, slope_percent, 
                            gps_latitude, gps_longitude, purchase_price, purchase_date, 
                            current_value, stone_percent, notes)
@@ -160,7 +51,7 @@ def create_database():
     conn.close()
     
     print("\n🎉 Database setup complete!")
-    print("📂 Database location: data/fs25_farming.db")
+    print(f"📂 Database location: {DATABASE_PATH}")
     print("🚀 Ready to run your Flask app!")
 
 if __name__ == "__main__":
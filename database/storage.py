@@ -0,0 +1,225 @@
+# Crop storage queries
+"""
+Filtering, sorting and keyset pagination for the crop storage dashboard,
+and its inline edits.
+
+All of it happens in SQL, so the work and the payload per request scale with
+the page size rather than with the number of fill types in the catalog.
+"""
+
+import json
+import math
+
+from database.pagination import bind_cursor, decode_cursor, encode_cursor, seek_condition
+from database.response_cache import response_cache
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Same defaults the dashboard always applied in Python
+_NORMALIZED_STORAGE = '''
+    SELECT
+        crop_name,
+        COALESCE(crop_category, 'Other') AS crop_category,
+        COALESCE(quantity_stored, 0.0) AS quantity_stored,
+        CASE WHEN COALESCE(storage_capacity, 1000.0) <= 0 THEN 1000.0
+             ELSE COALESCE(storage_capacity, 1000.0) END AS storage_capacity,
+        COALESCE(current_market_price, 0.0) AS current_market_price,
+        COALESCE(NULLIF(sale_location, ''), 'Local Elevator') AS sale_location
+    FROM crop_storage
+'''
+
+_STORAGE_ROWS = f'''
+    SELECT *,
+           quantity_stored * current_market_price AS total_value,
+           ROUND(quantity_stored / storage_capacity * 100, 1) AS capacity_used
+    FROM ({_NORMALIZED_STORAGE})
+'''
+
+# sort key -> (column, direction); crop_name breaks ties so the key is unique
+SORT_OPTIONS = {
+    'name': ('crop_name', 'ASC'),
+    'category': ('crop_category', 'ASC'),
+    'quantity': ('quantity_stored', 'DESC'),
+    'value': ('total_value', 'DESC'),
+    'capacity': ('capacity_used', 'DESC'),
+}
+
+STATUS_FILTERS = {
+    'empty': 'quantity_stored <= 0',
+    'low': 'capacity_used < 25',
+    'medium': 'capacity_used BETWEEN 25 AND 75',
+    'high': 'capacity_used > 75 AND capacity_used <= 100',
+    'full': 'capacity_used > 100',
+}
+
+
+def _filter_clause(search=None, category=None, status=None):
+    conditions, params = [], []
+
+    if search:
+        escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        conditions.append("crop_name LIKE ? ESCAPE '\\'")
+        params.append(f'%{escaped}%')
+
+    if category:
+        conditions.append('crop_category = ?')
+        params.append(category)
+
+    if status:
+        if status not in STATUS_FILTERS:
+            raise ValueError(f'Unknown storage status: {status}')
+        conditions.append(STATUS_FILTERS[status])
+
+    return conditions, params
+
+
+def query_crop_page(conn, search=None, category=None, status=None, sort='name',
+                    cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Return (crops, next_cursor) for one page of the filtered, sorted storage list"""
+    if sort not in SORT_OPTIONS:
+        raise ValueError(f'Unknown sort option: {sort}')
+    column, direction = SORT_OPTIONS[sort]
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    conditions, params = _filter_clause(search, category, status)
+
+    if cursor:
+        seek_sql, bind_order = seek_condition((column, 'crop_name'), (direction, 'ASC'))
+        conditions.append(seek_sql)
+        params.extend(bind_cursor(decode_cursor(cursor, 2), bind_order))
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    rows = conn.execute(f'''
+        SELECT * FROM ({_STORAGE_ROWS})
+        {where}
+        ORDER BY {column} {direction}, crop_name ASC
+        LIMIT ?
+    ''', (*params, limit + 1)).fetchall()
+
+    crops = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = crops[-1]
+        next_cursor = encode_cursor(last[column], last['crop_name'])
+
+    return crops, next_cursor
+
+
+@response_cache.memoize('crop_storage')
+def query_filtered_summary(conn, search=None, category=None, status=None):
+    """Count and total value of everything matching the filters"""
+    conditions, params = _filter_clause(search, category, status)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    row = conn.execute(f'''
+        SELECT COUNT(*) AS crop_count, COALESCE(SUM(total_value), 0) AS total_value
+        FROM ({_STORAGE_ROWS})
+        {where}
+    ''', params).fetchone()
+    return dict(row)
+
+
+@response_cache.memoize('crop_storage')
+def query_storage_overview(conn):
+    """Dashboard header totals and the category list, in a single pass"""
+    row = conn.execute(f'''
+        SELECT COUNT(*) AS crop_count,
+               COALESCE(SUM(quantity_stored * current_market_price), 0) AS total_value,
+               COALESCE(SUM(storage_capacity), 0) AS total_capacity,
+               COALESCE(SUM(quantity_stored), 0) AS total_stored,
+               json_group_array(DISTINCT crop_category) AS categories
+        FROM ({_NORMALIZED_STORAGE})
+    ''').fetchone()
+
+    overview = dict(row)
+    overview['categories'] = sorted(json.loads(row['categories']))
+    return overview
+
+
+# =====================================================
+# INLINE EDITS
+# =====================================================
+
+# Columns the dashboard may edit inline, and which of them are numbers
+EDITABLE_FIELDS = ('quantity_stored', 'storage_capacity', 'current_market_price', 'sale_location', 'notes')
+NUMERIC_FIELDS = ('quantity_stored', 'storage_capacity', 'current_market_price')
+MAX_BATCH_CHANGES = 500
+
+
+def validate_changes(changes):
+    """Return ([(crop_name, field_name, value), ...], errors) for a batch of {crop_name, field_name, value}"""
+    if not isinstance(changes, list) or not changes:
+        return [], [{'index': None, 'error': 'Expected a non-empty list of changes'}]
+    if len(changes) > MAX_BATCH_CHANGES:
+        return [], [{'index': None, 'error': f'At most {MAX_BATCH_CHANGES} changes per batch'}]
+
+    valid, errors = [], []
+    for index, change in enumerate(changes):
+        if not isinstance(change, dict):
+            errors.append({'index': index, 'error': 'Expected an object'})
+            continue
+        crop_name = change.get('crop_name')
+        field_name = change.get('field_name')
+        value = change.get('value')
+        if not isinstance(crop_name, str) or not crop_name:
+            errors.append({'index': index, 'error': 'Missing crop_name'})
+            continue
+        if field_name not in EDITABLE_FIELDS:
+            errors.append({'index': index, 'error': 'Invalid field'})
+            continue
+        if field_name in NUMERIC_FIELDS:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                errors.append({'index': index, 'error': 'Invalid numeric value'})
+                continue
+            if not math.isfinite(value):
+                errors.append({'index': index, 'error': 'Invalid numeric value'})
+                continue
+        elif value is not None:
+            value = str(value)
+        valid.append((crop_name, field_name, value))
+    return valid, errors
+
+
+def apply_changes(conn, changes, now):
+    """Write validated changes and return {crop_name: recomputed values}; the caller commits.
+
+    One executemany per edited column plus one for price_history, whatever
+    the batch size. Changes to the same cell apply in order, and every price
+    that differs from the one before it gets a history row, as in
+    update_storage_field(). Raises KeyError for crops that do not exist.
+    """
+    crop_names = list(dict.fromkeys(crop_name for crop_name, _, _ in changes))
+    placeholders = ', '.join('?' * len(crop_names))
+    prices = dict(conn.execute(f'''
+        SELECT crop_name, current_market_price FROM crop_storage WHERE crop_name IN ({placeholders})
+    ''', crop_names).fetchall())
+    missing = [crop_name for crop_name in crop_names if crop_name not in prices]
+    if missing:
+        raise KeyError(missing)
+
+    final = {}
+    history = []
+    for crop_name, field_name, value in changes:
+        if field_name == 'current_market_price' and prices[crop_name] != value:
+            history.append((crop_name, value, now.date()))
+            prices[crop_name] = value
+        final[(crop_name, field_name)] = value
+
+    if history:
+        conn.executemany('INSERT INTO price_history (crop_name, price, price_date) VALUES (?, ?, ?)',
+                         history)
+    for field_name in EDITABLE_FIELDS:
+        rows = [(value, now, crop_name) for (crop_name, name), value in final.items() if name == field_name]
+        if rows:
+            conn.executemany(f'UPDATE crop_storage SET {field_name} = ?, updated_date = ? WHERE crop_name = ?',
+                             rows)
+
+    rows = conn.execute(f'''
+        SELECT crop_name, quantity_stored, storage_capacity, current_market_price,
+               (quantity_stored * current_market_price) as total_value,
+               ROUND((quantity_stored / storage_capacity * 100), 1) as capacity_used
+        FROM crop_storage WHERE crop_name IN ({placeholders})
+    ''', crop_names).fetchall()
+    return {row['crop_name']: dict(row, formatted_value=f"${row['total_value'] or 0:,.0f}") for row in rows}
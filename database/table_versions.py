@@ -0,0 +1,174 @@
+# Table data versions
+"""
+A change counter per data table, bumped by triggers on every insert, update
+and delete, so anything derived from a table can be cached until the table
+actually changes: one indexed read of table_versions tells whether a cached
+result is still current.
+
+Versions only ever go up; compare them for equality, never order. The same
+triggers stamp changed_at (UTC, to the second), which is what HTTP
+Last-Modified headers are built from (database/conditional.py).
+"""
+
+import pathlib
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from database.migrations import add_column, column_names, execute_script
+
+VERSIONED_TABLES = (
+    'fields', 'equipment', 'crop_seasons', 'field_operations', 'weather_events',
+    'crop_storage', 'sale_locations', 'price_history',
+    'planting_records', 'field_maintenance', 'harvest_records',
+)
+
+# Schema versions, each installed by a migration that names it, so a
+# shipped one is never edited: 1 = version counters (migration 9),
+# 2 = plus changed_at, stamped by the same triggers (migration 10)
+SCHEMA_VERSION = 2
+
+TABLE_SQL = {
+    1: '''
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''',
+    2: '''
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    ''',
+}
+
+TRIGGER_SET_SQL = {
+    1: 'version = version + 1',
+    2: 'version = version + 1, changed_at = CURRENT_TIMESTAMP',
+}
+
+
+def _triggers(table, schema=SCHEMA_VERSION):
+    return ''.join(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_version_{table}_{event.lower()}
+    AFTER {event} ON {table}
+    BEGIN
+        UPDATE table_versions SET {TRIGGER_SET_SQL[schema]}
+        WHERE table_name = '{table}';
+    END;
+''' for event in ('INSERT', 'UPDATE', 'DELETE'))
+
+
+def install(conn, tables=VERSIONED_TABLES, replace_triggers=False, schema=SCHEMA_VERSION):
+    """Create the version table and its triggers of one schema version if needed"""
+    conn.execute(TABLE_SQL[schema])
+    if schema >= 2 and 'changed_at' not in column_names(conn, 'table_versions'):  # schema 1 table
+        add_column(conn, 'table_versions', 'changed_at', 'TIMESTAMP')
+        conn.execute('UPDATE table_versions SET changed_at = CURRENT_TIMESTAMP')
+    conn.executemany('INSERT OR IGNORE INTO table_versions (table_name) VALUES (?)',
+                     [(table,) for table in tables])
+    for table in tables:
+        if replace_triggers:
+            for event in ('insert', 'update', 'delete'):
+                conn.execute(f'DROP TRIGGER IF EXISTS trg_version_{table}_{event}')
+        execute_script(conn, _triggers(table, schema))
+
+
+def bump(conn, tables=VERSIONED_TABLES):
+    """Mark tables as changed by writes the triggers did not see (bulk loads with triggers dropped)"""
+    conn.executemany('UPDATE table_versions SET version = version + 1, changed_at = CURRENT_TIMESTAMP '
+                     'WHERE table_name = ?',
+                     [(table,) for table in tables])
+
+
+def get_versions(conn):
+    """(database file, {table: version}) in one statement"""
+    rows = conn.execute('''
+        SELECT (SELECT file FROM pragma_database_list WHERE name = 'main'), table_name, version
+        FROM table_versions
+    ''').fetchall()
+    database = rows[0][0] if rows else None
+    return database, {row[1]: row[2] for row in rows}
+
+
+def get_change_times(conn):
+    """{table: changed_at} as stored, 'YYYY-MM-DD HH:MM:SS' in UTC"""
+    return dict(conn.execute('SELECT table_name, changed_at FROM table_versions'))
+
+
+class VersionWatcher:
+    """Current table versions of one database file, re-read only after some connection commits.
+
+    Holds a private read-only connection and checks PRAGMA data_version on
+    it, which changes whenever any other connection (in this process or
+    another) has committed, and costs no page reads. So as long as nothing
+    was written, current() does not touch table_versions at all.
+    """
+
+    def __init__(self, database_path):
+        self.database_path = database_path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._versions = None
+        self._changed_at = None
+
+    def _refresh(self):
+        """Re-read table_versions if some connection committed since the last call"""
+        if self._conn is None:
+            uri = pathlib.Path(self.database_path).resolve().as_uri() + '?mode=ro'
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version != self._data_version or self._versions is None:
+            self._versions = get_versions(self._conn)[1]
+            self._changed_at = get_change_times(self._conn)
+            self._data_version = data_version
+
+    def current(self):
+        """{table: version}, or None if the database or table_versions does not exist yet"""
+        with self._lock:
+            try:
+                self._refresh()
+            except sqlite3.Error:
+                self.close()
+                return None
+            return self._versions or None
+
+    def last_changed(self, tables):
+        """Latest changed_at of `tables` as a UTC datetime, or None if unknown"""
+        with self._lock:
+            try:
+                self._refresh()
+            except sqlite3.Error:
+                self.close()
+                return None
+            stamps = [self._changed_at.get(table) for table in tables]
+        if not stamps or None in stamps:
+            return None
+        try:
+            return datetime.strptime(max(stamps), '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+        except (TypeError, ValueError):
+            return None
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+        self._conn = None
+        self._data_version = None
+        self._versions = None
+        self._changed_at = None
+
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def watcher(database_path):
+    """The process-wide VersionWatcher for a database file"""
+    key = str(pathlib.Path(database_path).resolve())
+    with _watchers_lock:
+        if key not in _watchers:
+            _watchers[key] = VersionWatcher(database_path)
+        return _watchers[key]
@@ -0,0 +1,158 @@
+# Structured logging
+"""
+Structured, sampled application logging.
+
+Log calls take an event name plus keyword fields. A call costs a level check
+and nothing more unless its level is enabled and the current route's sample
+rate lets it through. Callable field values are only evaluated for entries
+that are actually emitted, so expensive diagnostics can be passed as lambdas.
+Emitted entries go to stderr as JSON lines and into an in-memory ring buffer
+that /storage/debug reads.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+import traceback
+from collections import deque
+
+from flask import has_request_context, request
+
+ROOT_LOGGER = 'fs25'
+DEFAULT_RING_BUFFER_SIZE = 500
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the most recent structured entries in memory"""
+
+    def __init__(self, capacity=DEFAULT_RING_BUFFER_SIZE):
+        super().__init__()
+        self._entries = deque(maxlen=capacity)
+        self._entries_lock = threading.Lock()
+
+    def emit(self, record):
+        entry = _record_to_entry(record)
+        with self._entries_lock:
+            self._entries.append(entry)
+
+    def recent(self, limit=100, min_level=logging.NOTSET, logger=None):
+        with self._entries_lock:
+            entries = list(self._entries)
+        entries = [e for e in entries
+                   if e['levelno'] >= min_level and (logger is None or e['logger'].startswith(logger))]
+        return entries[-limit:]
+
+    def clear(self):
+        with self._entries_lock:
+            self._entries.clear()
+
+
+class JsonLineFormatter(logging.Formatter):
+    def format(self, record):
+        entry = _record_to_entry(record)
+        entry.pop('levelno')
+        return json.dumps(entry, default=str)
+
+
+def _record_to_entry(record):
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)),
+        'level': record.levelname,
+        'levelno': record.levelno,
+        'logger': record.name,
+        'event': record.getMessage(),
+        'endpoint': getattr(record, 'endpoint', None),
+        'fields': getattr(record, 'fields', {}),
+    }
+
+
+class StructuredLogger:
+    """Thin wrapper over a stdlib logger: log.debug('event', key=value, ...)"""
+
+    def __init__(self, name):
+        self._logger = logging.getLogger(name)
+
+    def _log(self, level, event, fields):
+        if not self._logger.isEnabledFor(level):
+            return
+
+        endpoint = request.endpoint if has_request_context() else None
+        if level < logging.WARNING:
+            rate = sample_rates.get(endpoint, default_sample_rate)
+            if rate <= 0 or (rate < 1 and random.random() >= rate):
+                return
+
+        fields = {key: value() if callable(value) else value for key, value in fields.items()}
+        self._logger.log(level, event, extra={'fields': fields, 'endpoint': endpoint})
+
+    def is_enabled(self, level=logging.DEBUG):
+        return self._logger.isEnabledFor(level)
+
+    def debug(self, event, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event, **fields):
+        self._log(logging.ERROR, event, fields)
+
+    def exception(self, event, **fields):
+        fields.setdefault('traceback', _format_current_exception)
+        self._log(logging.ERROR, event, fields)
+
+
+def _format_current_exception():
+    return traceback.format_exc()
+
+
+# endpoint name -> fraction of DEBUG/INFO entries kept; WARNING and above are never sampled
+sample_rates = {}
+default_sample_rate = 1.0
+ring_buffer = RingBufferHandler()
+
+
+def get_logger(name):
+    return StructuredLogger(f'{ROOT_LOGGER}.{name}')
+
+
+def parse_sample_rates(spec):
+    """'storage_dashboard=0.1,index=0' -> {'storage_dashboard': 0.1, 'index': 0.0}"""
+    rates = {}
+    for item in (spec or '').split(','):
+        if '=' in item:
+            endpoint, rate = item.split('=', 1)
+            rates[endpoint.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+def init_logging(app):
+    """Configure level, sampling and handlers from app.config / environment"""
+    global default_sample_rate
+
+    level = app.config.get('LOG_LEVEL') or os.environ.get('FS25_LOG_LEVEL', 'INFO')
+    sample_rates.clear()
+    sample_rates.update(app.config.get('LOG_SAMPLE_RATES')
+                        or parse_sample_rates(os.environ.get('FS25_LOG_SAMPLE_RATES')))
+    default_sample_rate = float(app.config.get('LOG_DEFAULT_SAMPLE_RATE',
+                                               os.environ.get('FS25_LOG_DEFAULT_SAMPLE_RATE', 1.0)))
+
+    capacity = int(app.config.get('LOG_RING_BUFFER_SIZE', DEFAULT_RING_BUFFER_SIZE))
+    if ring_buffer._entries.maxlen != capacity:
+        ring_buffer._entries = deque(ring_buffer._entries, maxlen=capacity)
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    root.propagate = False
+    if not root.handlers:
+        stream = logging.StreamHandler()
+        stream.setFormatter(JsonLineFormatter())
+        root.addHandler(stream)
+        root.addHandler(ring_buffer)
+    return root
@@ -0,0 +1,237 @@
+# Prometheus metrics
+"""
+Request, database, template and process metrics in the Prometheus text
+exposition format, served from /metrics.
+
+Recording never takes a lock: every thread updates its own ThreadMetrics and
+the scrape merges them. Threads that have exited are folded into a retired
+total on the next scrape, so the werkzeug thread-per-request server does not
+grow the list without bound.
+
+Per-endpoint DB time, query and row counts come from the SQL instrumentation
+(database/instrumentation.py) and are only exported when it is enabled.
+Other modules (e.g. caches) add their own series with register_collector().
+"""
+
+import bisect
+import os
+import resource
+import threading
+import time
+from collections import defaultdict
+
+from flask import before_render_template, g, request, request_finished, template_rendered
+
+# Histogram upper bounds in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_HELP = {
+    'fs25_http_requests_total': ('counter', 'HTTP requests by endpoint, method and status'),
+    'fs25_http_request_duration_seconds': ('histogram', 'Time from request start to response, by endpoint'),
+    'fs25_db_request_duration_seconds': ('histogram', 'SQL time per request, by endpoint'),
+    'fs25_db_queries_total': ('counter', 'SQL statements executed, by endpoint'),
+    'fs25_db_rows_total': ('counter', 'Rows returned or affected by SQL statements, by endpoint'),
+    'fs25_template_render_duration_seconds': ('histogram', 'Jinja template render time, by template'),
+}
+
+
+class ThreadMetrics:
+    """Counters and histograms owned by one thread"""
+
+    def __init__(self):
+        self.counters = defaultdict(float)  # (name, labels) -> value
+        self.histograms = {}                # (name, labels) -> [bucket counts..., +Inf, sum]
+
+    def inc(self, name, labels, amount=1):
+        self.counters[(name, labels)] += amount
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        histogram[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        histogram[-1] += value
+
+    def merge_into(self, target):
+        for key, value in list(self.counters.items()):
+            target.counters[key] += value
+        for key, histogram in list(self.histograms.items()):
+            merged = target.histograms.get(key)
+            if merged is None:
+                target.histograms[key] = list(histogram)
+            else:
+                for i, value in enumerate(histogram):
+                    merged[i] += value
+
+
+_local = threading.local()
+_threads = []  # (thread, ThreadMetrics); appended once per thread
+_threads_lock = threading.Lock()
+_retired = ThreadMetrics()
+_collectors = []
+
+
+def thread_metrics():
+    metrics = getattr(_local, 'metrics', None)
+    if metrics is None:
+        metrics = _local.metrics = ThreadMetrics()
+        with _threads_lock:
+            _threads.append((threading.current_thread(), metrics))
+    return metrics
+
+
+def register_collector(collect):
+    """collect() -> iterable of (name, type, help, [(labels dict, value), ...]) added to every scrape"""
+    _collectors.append(collect)
+
+
+def _snapshot():
+    """Fold exited threads into the retired total and merge the live ones"""
+    with _threads_lock:
+        live = []
+        for thread, metrics in _threads:
+            if thread.is_alive():
+                live.append((thread, metrics))
+            else:
+                metrics.merge_into(_retired)
+        _threads[:] = live
+
+        merged = ThreadMetrics()
+        _retired.merge_into(merged)
+        for _, metrics in live:
+            metrics.merge_into(merged)
+    return merged
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def process_rss_bytes():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # peak, on Linux in KiB
+
+
+def _pool_series(pool):
+    stats = pool.stats()
+    yield ('fs25_db_pool_connections', 'gauge', 'Pooled SQLite connections by state',
+           [({'state': 'idle'}, stats['idle']), ({'state': 'in_use'}, stats['in_use'])])
+    yield ('fs25_db_pool_events_total', 'counter', 'Connection pool events',
+           [({'event': event}, stats[event])
+            for event in ('created', 'reused', 'released', 'discarded', 'health_failures')])
+
+
+def _process_series():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    yield ('fs25_process_resident_memory_bytes', 'gauge', 'Resident set size', [({}, process_rss_bytes())])
+    yield ('fs25_process_cpu_seconds_total', 'counter', 'User and system CPU time',
+           [({}, usage.ru_utime + usage.ru_stime)])
+    yield ('fs25_process_threads', 'gauge', 'Live Python threads', [({}, threading.active_count())])
+
+
+def render(pool=None):
+    """The full scrape body"""
+    merged = _snapshot()
+    lines = []
+
+    by_name = defaultdict(list)
+    for (name, labels), value in merged.counters.items():
+        by_name[name].append((labels, value))
+    for (name, labels), histogram in merged.histograms.items():
+        by_name[name].append((labels, histogram))
+
+    for name in sorted(by_name):
+        kind, help_text = METRIC_HELP.get(name, ('untyped', name))
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(by_name[name], key=lambda item: item[0]):
+            if kind != 'histogram':
+                lines.append(f'{name}{_labels(labels)} {_format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_format_value(value[-1])}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+
+    series = list(_process_series())
+    if pool is not None:
+        series.extend(_pool_series(pool))
+    for collect in _collectors:
+        series.extend(collect())
+    for name, kind, help_text, samples in series:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in samples:
+            lines.append(f'{name}{_labels(tuple(sorted(labels.items())))} {_format_value(value)}')
+
+    return '\n'.join(lines) + '\n'
+
+
+# =====================================================
+# FLASK HOOKS
+# =====================================================
+
+def _request_started():
+    g._metrics_started = time.perf_counter()
+
+
+def _request_finished(sender, response, **extra):
+    started = g.get('_metrics_started')
+    if started is None:
+        return
+    endpoint = request.endpoint or '<unmatched>'
+    metrics = thread_metrics()
+    metrics.inc('fs25_http_requests_total', (('endpoint', endpoint), ('method', request.method),
+                                             ('status', response.status_code)))
+    metrics.observe('fs25_http_request_duration_seconds', (('endpoint', endpoint),),
+                    time.perf_counter() - started)
+
+    summary = g.get('sql_summary')
+    if summary is not None:
+        labels = (('endpoint', endpoint),)
+        metrics.observe('fs25_db_request_duration_seconds', labels, summary['db_ms'] / 1000)
+        metrics.inc('fs25_db_queries_total', labels, summary['queries'])
+        metrics.inc('fs25_db_rows_total', labels, summary['rows'])
+
+
+def _template_starting(sender, template, context, **extra):
+    g.setdefault('_metrics_templates', []).append(time.perf_counter())
+
+
+def _template_finished(sender, template, context, **extra):
+    starts = g.get('_metrics_templates')
+    if starts:
+        thread_metrics().observe('fs25_template_render_duration_seconds',
+                                 (('template', template.name or '<string>'),),
+                                 time.perf_counter() - starts.pop())
+
+
+def init_metrics(app):
+    """Record request and template metrics for this app; returns whether enabled"""
+    enabled = app.config.get('METRICS')
+    if enabled is None:
+        enabled = os.environ.get('FS25_METRICS', '1').lower() not in ('0', 'false', 'off', 'no')
+    if not enabled:
+        return False
+
+    app.before_request(_request_started)
+    request_finished.connect(_request_finished, app)
+    before_render_template.connect(_template_starting, app)
+    template_rendered.connect(_template_finished, app)
+    return True